@@ -1,8 +1,9 @@
-from flask import Flask, request, abort
-import json
+from flask import Flask, request, abort, jsonify
+import os
 from functools import wraps
 from jose import jwt
-from urllib.request import urlopen
+
+from keys import KeyStore, KeyStoreError
 
 
 app = Flask(__name__)
@@ -10,6 +11,12 @@ app = Flask(__name__)
 AUTH0_DOMAIN = @TODO_REPLACE_WITH_YOUR_DOMAIN
 ALGORITHMS = ['RS256']
 API_AUDIENCE = @TODO_REPLACE_WITH_YOUR_API_AUDIENCE
+# a URL or file path, e.g. a local jwks.json to run without Auth0
+JWKS_URL = os.environ.get(
+    'JWKS_URL', f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
+
+# the signing keys, fetched once and refreshed in the background
+key_store = KeyStore(JWKS_URL)
 
 
 class AuthError(Exception):
@@ -52,25 +59,20 @@ def get_token_auth_header():
 
 
 def verify_decode_jwt(token):
-    jsonurl = urlopen(f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
-    jwks = json.loads(jsonurl.read())
     unverified_header = jwt.get_unverified_header(token)
-    rsa_key = {}
     if 'kid' not in unverified_header:
         raise AuthError({
             'code': 'invalid_header',
             'description': 'Authorization malformed.'
         }, 401)
 
-    for key in jwks['keys']:
-        if key['kid'] == unverified_header['kid']:
-            rsa_key = {
-                'kty': key['kty'],
-                'kid': key['kid'],
-                'use': key['use'],
-                'n': key['n'],
-                'e': key['e']
-            }
+    try:
+        rsa_key = key_store.get(unverified_header['kid'])
+    except KeyStoreError:
+        raise AuthError({
+            'code': 'jwks_unavailable',
+            'description': 'Unable to fetch the signing keys.'
+        }, 503)
     if rsa_key:
         try:
             payload = jwt.decode(
@@ -111,12 +113,21 @@ def requires_auth(f):
         token = get_token_auth_header()
         try:
             payload = verify_decode_jwt(token)
-        except:
+        except AuthError:
+            # keeps its status code, e.g. 503 when the keys are unavailable
+            raise
+        except Exception:
             abort(401)
         return f(payload, *args, **kwargs)
 
     return wrapper
 
+
+@app.errorhandler(AuthError)
+def auth_error(error):
+    return jsonify(error.error), error.status_code
+
+
 @app.route('/headers')
 @requires_auth
 def headers(payload):
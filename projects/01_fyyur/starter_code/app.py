@@ -2,13 +2,11 @@
 # Imports
 #----------------------------------------------------------------------------#
 
+import io
 import sys
 import json
-import dateutil.parser
-import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for
+from flask import Flask, render_template, request, Response, flash, redirect, url_for, abort, jsonify
 from flask_moment import Moment
-from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import aliased
 from sqlalchemy import func
 import logging
@@ -17,6 +15,15 @@ from flask_wtf import Form
 from forms import *
 from flask_migrate import Migrate
 from werkzeug.datastructures import MultiDict
+from models import db, Venue, Artist, Show
+from directory import venue_directory
+from timeline import venue_timeline, artist_timeline
+from show_feed import shows_page
+from search import search
+from filters import format_datetime
+from cache import ResponseCache
+from flask_perf import Profiler
+from bulk_import import IMPORTERS, IMPORT_CHUNK_SIZE, FORMATS, read_rows, import_rows, import_command
 
 #----------------------------------------------------------------------------#
 # App Config.
@@ -25,71 +32,34 @@ from werkzeug.datastructures import MultiDict
 app = Flask(__name__)
 moment = Moment(app)
 app.config.from_object('config')
-db = SQLAlchemy(app)
+db.init_app(app)
 
 #  connect to a local postgresql database
 app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql://shakthivel@localhost:5432/fyyurapp'
 migrate = Migrate(app, db)
+cache = ResponseCache(app)
+profiler = Profiler(app)
+app.cli.add_command(import_command)
 
 #----------------------------------------------------------------------------#
-# Models.
+# Filters.
 #----------------------------------------------------------------------------#
 
-class Show(db.Model):
-  __tablename__ = 'Show'
-  venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), primary_key=True)
-  artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), primary_key=True)
-  start_time = db.Column(db.DateTime(), primary_key=True)
-  venue = db.relationship("Venue", back_populates="venue_shows")
-  artist = db.relationship("Artist", back_populates="artist_show")
-
-class Venue(db.Model):
-  __tablename__ = 'Venue'
-
-  id = db.Column(db.Integer, primary_key=True)
-  name = db.Column(db.String)
-  city = db.Column(db.String(120))
-  state = db.Column(db.String(120))
-  address = db.Column(db.String(120))
-  phone = db.Column(db.String(120))
-  image_link = db.Column(db.String(500))
-  facebook_link = db.Column(db.String(120))
-  # new fields added
-  website = db.Column(db.String(200))
-  seeking_talent = db.Column(db.Boolean)
-  seeking_description = db.Column(db.String(3000))
-  genres = db.Column(db.ARRAY(db.String(20)))
-  venue_shows = db.relationship('Show', back_populates='venue')   
-
-class Artist(db.Model):
-  __tablename__ = 'Artist'
-
-  id = db.Column(db.Integer, primary_key=True)
-  name = db.Column(db.String)
-  city = db.Column(db.String(120))
-  state = db.Column(db.String(120))
-  phone = db.Column(db.String(120))
-  image_link = db.Column(db.String(500))
-  facebook_link = db.Column(db.String(120))
-  # new fields added
-  genres = db.Column(db.ARRAY(db.String(20)))
-  website = db.Column(db.String(200))
-  seeking_venue = db.Column(db.Boolean)
-  seeking_description = db.Column(db.String(3000))
-  artist_show = db.relationship('Show', back_populates='artist')   
+app.jinja_env.filters['datetime'] = format_datetime
+
 #----------------------------------------------------------------------------#
-# Filters.
+# Cache invalidation.
 #----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
-  if format == 'full':
-      format="EEEE MMMM, d, y 'at' h:mma"
-  elif format == 'medium':
-      format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format)
+# cached pages that show a venue: the directory, its own page, the shows
+# feed and the pages of every artist booked there (and the same for artists)
+def venue_pages(venue_id):
+  artist_ids = db.session.query(Show.artist_id).filter(Show.venue_id == venue_id).distinct()
+  return ['venues', 'venue:%s' % venue_id, 'shows'] + ['artist:%d' % a for (a,) in artist_ids]
 
-app.jinja_env.filters['datetime'] = format_datetime
+def artist_pages(artist_id):
+  venue_ids = db.session.query(Show.venue_id).filter(Show.artist_id == artist_id).distinct()
+  return ['artists', 'artist:%s' % artist_id, 'shows'] + ['venue:%d' % v for (v,) in venue_ids]
 
 #----------------------------------------------------------------------------#
 # Controllers.
@@ -104,60 +74,27 @@ def index():
 #  ----------------------------------------------------------------
 
 @app.route('/venues')
+@cache.cached('venues')
 def venues(): # DONE
+  return render_template('pages/venues.html', areas=venue_directory())
 
-  cities = db.session.query(Venue.city, Venue.state).distinct().all()
-  
-  data = []
-  for c in cities:
-    city_data = {}
-    city_data["city"] = c.city
-    city_data["state"] = c.state
-    city_data["venues"] = []
-    city_venues = Venue.query.filter(Venue.city==c.city, Venue.state==c.state).all()
-    for city_venue in city_venues:
-      venue_data = {}
-      venue_data["id"] = city_venue.id
-      venue_data["name"] = city_venue.name
-      venue_data["num_upcoming_shows"] = Show.query.filter(Show.venue_id== city_venue.id, Show.start_time > datetime.now()).count()
-      city_data["venues"].append(venue_data)
-
-    data.append(city_data)
-  
-  return render_template('pages/venues.html', areas=data)
-
-@app.route('/venues/search', methods=['POST'])
+@app.route('/venues/search', methods=['GET', 'POST'])
 def search_venues(): # DONE
 
-  search_term = request.form.get('search_term',"")
-  print(type(search_term))
-  res = Venue.query.filter(func.lower(Venue.name).contains(search_term.lower(),autoescape = True)).all()
-  print(len(res))
-  
-  response = {"count":len(res),"data":res}
+  # the form posts the term, the paging links carry it in the query string
+  search_term = request.values.get('search_term', '')
+  response = search(Venue, search_term, page=request.values.get('page', 1, type=int))
 
-  return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
+  return render_template('pages/search_venues.html', results=response, search_term=search_term)
 
 @app.route('/venues/<int:venue_id>')
+@cache.cached('venue:{venue_id}')
 def show_venue(venue_id): # DONE
 
   res = Venue.query.filter(Venue.id == venue_id).first()
 
-  past_shows = []
-  upcoming_shows = []
-
-  for s in res.venue_shows:
-    d = {}
-    d["start_time"] = s.start_time.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-    d["artist_id"] = s.artist.id
-    d["artist_name"] = s.artist.name
-    d["artist_image_link"] = s.artist.image_link
+  past_shows, upcoming_shows = venue_timeline(venue_id)
 
-    if s.start_time <= datetime.now():
-      past_shows.append(d)
-    else:
-      upcoming_shows.append(d)
-  
   res.past_shows = past_shows
   res.upcoming_shows = upcoming_shows
   
@@ -177,11 +114,8 @@ def create_venue_form():
 @app.route('/venues/create', methods=['POST'])
 def create_venue_submission(): # DONE
 
-  id = db.session.execute("SELECT MAX(id) FROM \"Venue\" ").scalar() + 1
-
   try:
     venue = Venue( 
-    id = id,
     name = request.form.get("name",""),
     city = request.form.get('city',""),
     state = request.form.get('state',""),
@@ -197,6 +131,7 @@ def create_venue_submission(): # DONE
 
     db.session.add(venue)
     db.session.commit()
+    cache.invalidate('venues')
     flash('Venue ' + venue.name + ' was successfully listed!')
   except:
     db.session.rollback()
@@ -212,8 +147,10 @@ def delete_venue(venue_id): # DONE
 
   try:
     venue = Venue.query.filter(Venue.id == venue_id).first()
+    pages = venue_pages(venue_id)
     db.session.delete(venue)
     db.session.commit()
+    cache.invalidate(*pages)
     flash('Venue was successfully deleted!')
   except:
     db.session.rollback()
@@ -228,42 +165,29 @@ def delete_venue(venue_id): # DONE
 #  Artists
 #  ----------------------------------------------------------------
 @app.route('/artists')  # DONE
+@cache.cached('artists')
 def artists():
   res = db.session.query(Artist.id, Artist.name)
 
   return render_template('pages/artists.html', artists=res)
 
-@app.route('/artists/search', methods=['POST'])
+@app.route('/artists/search', methods=['GET', 'POST'])
 def search_artists():  # DONE
 
-  search_term = request.form.get('search_term',"")
-  print(type(search_term))
-  res = Artist.query.filter(func.lower(Artist.name).contains(search_term.lower(),autoescape = True)).all()
-  print(len(res))
-  
-  response = {"count":len(res),"data":res}
+  # the form posts the term, the paging links carry it in the query string
+  search_term = request.values.get('search_term', '')
+  response = search(Artist, search_term, page=request.values.get('page', 1, type=int))
 
-  return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
+  return render_template('pages/search_artists.html', results=response, search_term=search_term)
 
 @app.route('/artists/<int:artist_id>')
+@cache.cached('artist:{artist_id}')
 def show_artist(artist_id):  # DONE
 
   res = Artist.query.filter(Artist.id == artist_id).first()
 
-  past_shows = []
-  upcoming_shows = []
-
-  for s in res.artist_show:
-    d = {}
-    d["start_time"] = s.start_time.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-    d["venue_id"] = s.venue.id
-    d["venue_name"] = s.venue.name
-    d["venue_image_link"] = s.venue.image_link
-    if s.start_time <= datetime.now():
-      past_shows.append(d)
-    else:
-      upcoming_shows.append(d)
-  
+  past_shows, upcoming_shows = artist_timeline(artist_id)
+
   res.past_shows = past_shows
   res.upcoming_shows = upcoming_shows
   
@@ -304,6 +228,7 @@ def edit_artist_submission(artist_id):
     artist.genres = request.form.getlist('genres')
     
     db.session.commit()
+    cache.invalidate(*artist_pages(artist_id))
   except:
     db.session.rollback()
     print(sys.exc_info())
@@ -346,6 +271,7 @@ def edit_venue_submission(venue_id):
     venue.genres = request.form.getlist('genres'),
     
     db.session.commit()
+    cache.invalidate(*venue_pages(venue_id))
   except:
     db.session.rollback()
     print(sys.exc_info())
@@ -366,11 +292,8 @@ def create_artist_form():
 @app.route('/artists/create', methods=['POST'])
 def create_artist_submission(): # DONE
 
-  id = db.session.execute("SELECT MAX(id) FROM \"Artist\" ").scalar() + 1
-
   try:
     artist = Artist( 
-    id = id,
     name = request.form.get("name",""),
     city = request.form.get('city',""),
     state = request.form.get('state',""),
@@ -384,6 +307,7 @@ def create_artist_submission(): # DONE
     )
     db.session.add(artist)
     db.session.commit()
+    cache.invalidate('artists')
     flash('Artist ' + artist.name + ' was successfully listed!')
   except:
     db.session.rollback()
@@ -399,22 +323,29 @@ def create_artist_submission(): # DONE
 #  ----------------------------------------------------------------
 
 @app.route('/shows')
+@cache.cached('shows')
 def shows(): # DONE
 
-  res = Show.query.all()
-  data = []
-
-  for r in res:
-    d = {}
-    d["venue_id"] = r.venue.id 
-    d["venue_name"] = r.venue.name
-    d["artist_id"] = r.artist.id 
-    d["artist_name"] = r.artist.name
-    d["artist_image_link"] = r.artist.image_link
-    d["start_time"] = r.start_time.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-    data.append(d)
-  
-  return render_template('pages/shows.html', shows=data)
+  try:
+    data, next_page = shows_page(after=request.args.get('after'))
+  except ValueError:
+    abort(400)
+
+  return render_template('pages/shows.html', shows=data, next_page=next_page)
+
+@app.route('/shows/feed')
+@cache.cached('shows')
+def shows_feed():
+
+  try:
+    data, next_page = shows_page(after=request.args.get('after'))
+  except ValueError:
+    abort(400)
+
+  for d in data:
+    d["start_time"] = d["start_time"].strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+  return jsonify({"shows": data, "next": next_page})
 
 @app.route('/shows/create')
 def create_shows():
@@ -435,6 +366,8 @@ def create_show_submission(): # DONE
 
     db.session.add(show)
     db.session.commit()
+    cache.invalidate('shows', 'venues',
+      'venue:%d' % int(request.form.get("venue_id")), 'artist:%d' % int(request.form.get("artist_id")))
     flash('Show was successfully listed!')
   except:
     db.session.rollback()
@@ -445,6 +378,38 @@ def create_show_submission(): # DONE
 
   return render_template('pages/home.html')
 
+#  Bulk import
+#  ----------------------------------------------------------------
+
+@app.route('/import/<kind>', methods=['POST'])
+def bulk_import(kind):
+  # the body is read as a stream, one chunk of rows in memory at a time
+  if kind not in IMPORTERS:
+    abort(404)
+
+  format = request.args.get('format')
+  if format is None:
+    format = 'csv' if request.mimetype == 'text/csv' else 'ndjson'
+  if format not in FORMATS:
+    abort(400)
+
+  chunk_size = request.args.get('chunk_size', IMPORT_CHUNK_SIZE, type=int)
+  stream = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+  report = import_rows(kind, read_rows(stream, format), chunk_size=max(chunk_size, 1))
+
+  return jsonify(report.format())
+
+# the diagnostics show which pages are visited and the SQL the app sends,
+# they are served only while profiling is enabled
+if profiler.enabled:
+  @app.route('/__cache')
+  def cache_stats():
+    return jsonify(cache.stats())
+
+  @app.route('/__perf')
+  def perf_stats():
+    return jsonify(profiler.stats())
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
@@ -463,6 +428,10 @@ if not app.debug:
     file_handler.setLevel(logging.INFO)
     app.logger.addHandler(file_handler)
     app.logger.info('errors')
+    # one JSON line per request from the profiler (see flask_perf)
+    perf_logger = logging.getLogger('perf')
+    perf_logger.setLevel(logging.INFO)
+    perf_logger.addHandler(file_handler)
 
 #----------------------------------------------------------------------------#
 # Launch.
@@ -0,0 +1,72 @@
+#----------------------------------------------------------------------------#
+# Benchmark helpers.
+#
+# Run the benchmarks from the starter_code directory, e.g.
+#   $ export FYYUR_BENCH_DATABASE_URL=postgresql://localhost:5432/fyyur_bench
+#   $ python -m benchmarks.venue_directory
+#
+# The benchmark database is dropped and recreated on every run, never point
+# it at the real fyyurapp database.
+#----------------------------------------------------------------------------#
+
+import os
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app import app
+from models import db
+
+database_path = os.environ.get(
+  'FYYUR_BENCH_DATABASE_URL', 'postgresql://localhost:5432/fyyur_bench')
+
+'''
+setup_bench_db()
+    points the app at the benchmark database, recreates the schema and
+    returns the app with an app context pushed
+'''
+def setup_bench_db():
+  app.config['SQLALCHEMY_DATABASE_URI'] = database_path
+  app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+  app.config['WTF_CSRF_ENABLED'] = False
+  app.app_context().push()
+  db.drop_all()
+  db.create_all()
+  return app
+
+class QueryCounter(object):
+  def __init__(self):
+    self.count = 0
+
+  def __call__(self, conn, cursor, statement, parameters, context, executemany):
+    self.count += 1
+
+'''
+count_queries()
+    context manager yielding a QueryCounter that counts every statement
+    sent to the database while the block runs
+'''
+@contextmanager
+def count_queries():
+  counter = QueryCounter()
+  engine = db.get_engine()
+  event.listen(engine, 'before_cursor_execute', counter)
+  try:
+    yield counter
+  finally:
+    event.remove(engine, 'before_cursor_execute', counter)
+
+'''
+timed(fn, repeat=5)
+    calls fn repeat times and returns the best wall clock time in seconds
+'''
+def timed(fn, repeat=5):
+  best = None
+  for _ in range(repeat):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    if best is None or elapsed < best:
+      best = elapsed
+  return best
@@ -0,0 +1,77 @@
+#----------------------------------------------------------------------------#
+# Bulk import: rows per second and peak memory of bulk_import.import_rows at
+# several chunk sizes, against one ORM add + commit per venue (what the
+# create form does).
+#
+#   $ python -m benchmarks.bulk_import
+#----------------------------------------------------------------------------#
+
+import json
+import os
+import resource
+import tempfile
+import time
+
+from benchmarks import setup_bench_db
+from bulk_import import import_rows, read_rows
+from models import db, Venue
+
+NUM_ROWS = 100000
+PER_ROW_SAMPLE = 2000
+CHUNK_SIZES = [100, 1000, 5000]
+
+def write_seed_file(path, num_rows):
+  with open(path, 'w') as f:
+    for i in range(num_rows):
+      f.write(json.dumps({
+        "name": "Venue %d" % i,
+        "city": "San Francisco",
+        "state": "CA",
+        "address": "%d Mission St" % i,
+        "phone": "415-000-%04d" % (i % 10000),
+        "genres": ["Jazz", "Folk"],
+        "facebook_link": "https://www.facebook.com/venue%d" % i
+      }) + "\n")
+
+def peak_rss_mb():
+  return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+def reset():
+  db.session.execute('TRUNCATE "Venue" RESTART IDENTITY CASCADE')
+  db.session.commit()
+
+def per_row(path, limit):
+  start = time.perf_counter()
+  with open(path) as f:
+    for i, row in enumerate(read_rows(f, 'ndjson')):
+      if i == limit:
+        break
+      db.session.add(Venue(**row))
+      db.session.commit()
+  return limit / (time.perf_counter() - start)
+
+def main():
+  setup_bench_db()
+  fd, path = tempfile.mkstemp(suffix='.ndjson')
+  os.close(fd)
+  try:
+    write_seed_file(path, NUM_ROWS)
+    print("seed file: %d rows, %.1f MB" % (NUM_ROWS, os.path.getsize(path) / 1e6))
+    print("%16s %12s %12s %14s" % ("strategy", "imported", "rows/s", "peak rss MB"))
+
+    reset()
+    print("%16s %12d %12.0f %14.1f" % (
+      "per-row commit", PER_ROW_SAMPLE, per_row(path, PER_ROW_SAMPLE), peak_rss_mb()))
+
+    for chunk_size in CHUNK_SIZES:
+      reset()
+      with open(path) as f:
+        report = import_rows('venues', read_rows(f, 'ndjson'), chunk_size=chunk_size)
+      assert report.imported == NUM_ROWS, report.format()
+      print("%16s %12d %12.0f %14.1f" % (
+        "chunk %d" % chunk_size, report.imported, report.rows_per_second, peak_rss_mb()))
+  finally:
+    os.remove(path)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,72 @@
+#----------------------------------------------------------------------------#
+# Concurrent venue inserts: the old SELECT MAX(id) + 1 allocation against
+# letting the Venue_id_seq sequence assign ids. Reports primary key
+# collisions and inserts per second, and fails if the sequence path ever
+# collides or loses a row.
+#
+#   $ python -m benchmarks.concurrent_inserts
+#----------------------------------------------------------------------------#
+
+import threading
+import time
+
+from sqlalchemy.exc import IntegrityError
+
+from benchmarks import setup_bench_db
+from models import db, Venue
+
+WORKERS = 8
+INSERTS_PER_WORKER = 250
+
+def max_plus_one_insert(i):
+  id = db.session.execute('SELECT MAX(id) FROM "Venue"').scalar() or 0
+  db.session.add(Venue(id=id + 1, name="Venue %d" % i))
+  db.session.commit()
+
+def sequence_insert(i):
+  db.session.add(Venue(name="Venue %d" % i))
+  db.session.commit()
+
+def run(app, insert):
+  collisions = []
+
+  def worker(n):
+    with app.app_context():
+      for i in range(INSERTS_PER_WORKER):
+        try:
+          insert(n * INSERTS_PER_WORKER + i)
+        except IntegrityError:
+          db.session.rollback()
+          collisions.append(1)
+      db.session.remove()
+
+  db.session.execute('TRUNCATE "Venue" RESTART IDENTITY CASCADE')
+  db.session.commit()
+
+  threads = [threading.Thread(target=worker, args=(n,)) for n in range(WORKERS)]
+  start = time.perf_counter()
+  for t in threads:
+    t.start()
+  for t in threads:
+    t.join()
+  elapsed = time.perf_counter() - start
+
+  rows = Venue.query.count()
+  return len(collisions), rows, rows / elapsed
+
+def main():
+  app = setup_bench_db()
+  attempts = WORKERS * INSERTS_PER_WORKER
+
+  print("%d workers x %d inserts" % (WORKERS, INSERTS_PER_WORKER))
+  print("%16s %12s %10s %14s" % ("strategy", "collisions", "rows", "inserts/s"))
+  results = {}
+  for name, insert in (("max(id) + 1", max_plus_one_insert), ("sequence", sequence_insert)):
+    results[name] = run(app, insert)
+    print("%16s %12d %10d %14.0f" % ((name,) + results[name]))
+
+  collisions, rows, _ = results["sequence"]
+  assert collisions == 0 and rows == attempts, "sequence ids collided"
+
+if __name__ == '__main__':
+  main()
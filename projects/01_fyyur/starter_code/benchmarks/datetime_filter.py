@@ -0,0 +1,73 @@
+#----------------------------------------------------------------------------#
+# The "datetime" Jinja filter on the shows.html and show_venue.html render
+# paths: the old filter (ISO string -> dateutil -> babel on every call)
+# against filters.format_datetime on datetime objects. Needs no database.
+#
+#   $ python -m benchmarks.datetime_filter
+#----------------------------------------------------------------------------#
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import babel.dates
+import dateutil.parser
+from flask import render_template
+
+from app import app
+from benchmarks import timed
+from filters import format_datetime
+
+NUM_SHOWS = [100, 1000, 5000]
+# shows cluster on a few nights, as they do on a busy venue page
+NUM_DISTINCT_TIMES = 200
+
+def legacy_format_datetime(value, format='medium'):
+  date = dateutil.parser.parse(value)
+  if format == 'full':
+      format="EEEE MMMM, d, y 'at' h:mma"
+  elif format == 'medium':
+      format="EE MM, dd, y h:mma"
+  return babel.dates.format_datetime(date, format)
+
+def make_shows(n, as_string):
+  start = datetime(2030, 1, 1, 20, 0)
+  shows = []
+  for i in range(n):
+    start_time = start + timedelta(days=i % NUM_DISTINCT_TIMES)
+    if as_string:
+      start_time = start_time.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    shows.append({
+      "venue_id": 1, "venue_name": "The Musical Hop",
+      "artist_id": i, "artist_name": "Artist %d" % i, "artist_image_link": "",
+      "start_time": start_time
+    })
+  return shows
+
+def render_paths(shows):
+  venue = SimpleNamespace(
+    id=1, name="The Musical Hop", genres=["Jazz"], city="San Francisco",
+    state="CA", address="", phone="", website="", facebook_link="",
+    seeking_talent=False, seeking_description="", image_link="",
+    past_shows=shows[::2], upcoming_shows=shows[1::2],
+    past_shows_count=len(shows[::2]), upcoming_shows_count=len(shows[1::2]))
+  return (
+    lambda: render_template('pages/shows.html', shows=shows, next_page=None),
+    lambda: render_template('pages/show_venue.html', venue=venue),
+  )
+
+def main():
+  print("%8s %12s %12s %12s %12s" % (
+    "shows", "shows old", "shows new", "venue old", "venue new"))
+  with app.test_request_context():
+    for n in NUM_SHOWS:
+      results = []
+      for filter, as_string in ((legacy_format_datetime, True), (format_datetime, False)):
+        app.jinja_env.filters['datetime'] = filter
+        results.append([timed(path) * 1000 for path in render_paths(make_shows(n, as_string))])
+      app.jinja_env.filters['datetime'] = format_datetime
+      (shows_old, venue_old), (shows_new, venue_new) = results
+      print("%8d %10.1fms %10.1fms %10.1fms %10.1fms" % (
+        n, shows_old, shows_new, venue_old, venue_new))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,85 @@
+#----------------------------------------------------------------------------#
+# Response cache: latency of the read pages uncached and cached, for both
+# backends, and a check that creating a show is visible on every page it
+# touches straight away.
+#
+#   $ python -m benchmarks.response_cache
+#----------------------------------------------------------------------------#
+
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+from benchmarks import setup_bench_db, timed
+from cache import ResponseCache
+from models import db, Venue, Artist, Show
+
+import app as fyyur
+
+NUM_VENUES = 500
+SHOWS_PER_VENUE = 4
+PAGES = ['/venues', '/artists', '/shows', '/venues/1', '/artists/1']
+
+def seed():
+  now = datetime.now()
+  db.session.bulk_insert_mappings(Venue, [
+    {"id": i, "name": "Venue %d" % i, "city": "San Francisco", "state": "CA", "genres": []}
+    for i in range(1, NUM_VENUES + 1)])
+  db.session.bulk_insert_mappings(Artist, [
+    {"id": i, "name": "Artist %d" % i, "genres": []} for i in range(1, NUM_VENUES + 1)])
+  db.session.bulk_insert_mappings(Show, [
+    {"venue_id": v, "artist_id": (v + n) % NUM_VENUES + 1,
+     "start_time": now + timedelta(days=n - 1)}
+    for v in range(1, NUM_VENUES + 1) for n in range(SHOWS_PER_VENUE)])
+  db.session.commit()
+
+def use_backend(app, backend, directory=None):
+  app.config['CACHE_BACKEND'] = backend
+  app.config['CACHE_DIR'] = directory
+  cache = ResponseCache()
+  cache.init_app(app)
+  # swap the backend under the decorators that are already installed
+  fyyur.cache.backend = cache.backend
+  fyyur.cache.hits.clear()
+  fyyur.cache.misses.clear()
+
+def check_invalidation(client):
+  for url in ('/venues', '/venues/1', '/artists/400', '/shows'):
+    client.get(url)
+  client.post('/shows/create', data={
+    "venue_id": "1", "artist_id": "400", "start_time": "2099-12-31 20:00:00"})
+  # pages are not cached while a flash message is pending, consume it
+  client.get('/')
+  venue_page = client.get('/venues/1').get_data(as_text=True)
+  artist_page = client.get('/artists/400').get_data(as_text=True)
+  assert "Artist 400" in venue_page.split("Past")[0], "stale /venues/1"
+  assert "December, 31, 2099" in artist_page, "stale /artists/400"
+  db.session.query(Show).filter(Show.start_time > datetime(2099, 1, 1)).delete()
+  db.session.commit()
+  fyyur.cache.invalidate('shows', 'venues', 'venue:1', 'artist:400')
+
+def main():
+  app = setup_bench_db()
+  client = app.test_client()
+  seed()
+  directory = tempfile.mkdtemp(prefix='fyyur-cache-bench')
+
+  try:
+    print("%12s %10s %10s %12s" % ("page", "backend", "ms", "hit rate"))
+    for backend in (None, 'memory', 'filesystem'):
+      use_backend(app, backend, directory)
+      for url in PAGES:
+        ms = timed(lambda: client.get(url), repeat=20) * 1000
+        stats = fyyur.cache.stats()
+        name = url.strip('/').split('/')[0]
+        if '/' in url.strip('/'):
+          name = name[:-1]
+        rate = stats.get(name, {}).get("hit_rate", 0.0)
+        print("%12s %10s %10.2f %12.2f" % (url, backend, ms, rate))
+      if backend is not None:
+        check_invalidation(client)
+  finally:
+    shutil.rmtree(directory)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,64 @@
+#----------------------------------------------------------------------------#
+# GET /shows and /shows/feed: latency of the first and the deepest page as
+# the Show table grows.
+#
+#   $ python -m benchmarks.show_feed
+#----------------------------------------------------------------------------#
+
+from datetime import datetime, timedelta
+
+from benchmarks import setup_bench_db, count_queries, timed
+from models import db, Venue, Artist, Show
+
+SIZES = [1000, 10000, 100000]
+NUM_VENUES = 100
+NUM_ARTISTS = 100
+
+def seed(num_shows, first_id):
+  start = datetime(2020, 1, 1)
+  shows = [{
+    "venue_id": i % NUM_VENUES + 1,
+    "artist_id": i // NUM_VENUES % NUM_ARTISTS + 1,
+    "start_time": start + timedelta(minutes=i)
+  } for i in range(first_id, first_id + num_shows)]
+  db.session.bulk_insert_mappings(Show, shows)
+  db.session.commit()
+
+def main():
+  app = setup_bench_db()
+  client = app.test_client()
+  db.session.bulk_insert_mappings(Venue, [
+    {"id": i, "name": "Venue %d" % i} for i in range(1, NUM_VENUES + 1)])
+  db.session.bulk_insert_mappings(Artist, [
+    {"id": i, "name": "Artist %d" % i, "image_link": ""} for i in range(1, NUM_ARTISTS + 1)])
+  db.session.commit()
+
+  print("%10s %10s %12s %12s %14s" % (
+    "shows", "queries", "first ms", "last ms", "html first ms"))
+  total = 0
+  for size in SIZES:
+    seed(size - total, total)
+    total = size
+
+    # walk the feed to its end, the last cursor is the deepest page
+    cursor = None
+    last = None
+    while True:
+      url = '/shows/feed' + ('?after=' + cursor if cursor else '')
+      page = client.get(url).get_json()
+      if page["next"] is None:
+        last = url
+        break
+      cursor = page["next"]
+
+    with count_queries() as counter:
+      response = client.get(last)
+    assert response.status_code == 200
+
+    first_ms = timed(lambda: client.get('/shows/feed')) * 1000
+    last_ms = timed(lambda: client.get(last)) * 1000
+    html_ms = timed(lambda: client.get('/shows')) * 1000
+    print("%10d %10d %12.1f %12.1f %14.1f" % (size, counter.count, first_ms, last_ms, html_ms))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,57 @@
+#----------------------------------------------------------------------------#
+# GET /venues/<id> and /artists/<id>: round trips and latency as a popular
+# venue / artist accumulates shows.
+#
+#   $ python -m benchmarks.show_timelines
+#----------------------------------------------------------------------------#
+
+from datetime import datetime, timedelta
+
+from benchmarks import setup_bench_db, count_queries, timed
+from models import db, Venue, Artist, Show
+
+SIZES = [10, 100, 1000, 5000]
+
+def seed(num_shows, first_id):
+  now = datetime.now()
+  artists = []
+  venues = []
+  shows = []
+  for i in range(first_id, first_id + num_shows):
+    # every show pairs the popular venue 1 / artist 1 with a distinct partner
+    artists.append({"id": i + 1, "name": "Artist %d" % i, "image_link": ""})
+    venues.append({"id": i + 1, "name": "Venue %d" % i, "image_link": ""})
+    start_time = now + timedelta(hours=i if i % 2 else -i)
+    shows.append({"venue_id": 1, "artist_id": i + 1, "start_time": start_time})
+    shows.append({"venue_id": i + 1, "artist_id": 1, "start_time": start_time})
+  db.session.bulk_insert_mappings(Artist, artists)
+  db.session.bulk_insert_mappings(Venue, venues)
+  db.session.bulk_insert_mappings(Show, shows)
+  db.session.commit()
+
+def main():
+  app = setup_bench_db()
+  client = app.test_client()
+  db.session.add(Venue(id=1, name="Popular Venue", city="San Francisco", state="CA", genres=[]))
+  db.session.add(Artist(id=1, name="Popular Artist", city="San Francisco", state="CA", genres=[]))
+  db.session.commit()
+
+  print("%10s %16s %12s %16s %12s" % (
+    "shows", "venue queries", "venue ms", "artist queries", "artist ms"))
+  total = 0
+  for size in SIZES:
+    seed(size - total, total + 1)
+    total = size
+
+    results = []
+    for url in ('/venues/1', '/artists/1'):
+      with count_queries() as counter:
+        response = client.get(url)
+      assert response.status_code == 200
+      results.append(counter.count)
+      results.append(timed(lambda: client.get(url)) * 1000)
+
+    print("%10d %16d %12.1f %16d %12.1f" % tuple([size] + results))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,52 @@
+#----------------------------------------------------------------------------#
+# GET /venues: round trips and latency as the number of venues grows.
+#
+#   $ python -m benchmarks.venue_directory
+#----------------------------------------------------------------------------#
+
+from datetime import datetime, timedelta
+
+from benchmarks import setup_bench_db, count_queries, timed
+from models import db, Venue, Artist, Show
+
+SIZES = [10, 100, 1000, 5000]
+CITIES = [('San Francisco', 'CA'), ('New York', 'NY'), ('Austin', 'TX'),
+          ('Seattle', 'WA'), ('Chicago', 'IL')]
+SHOWS_PER_VENUE = 4
+
+def seed(num_venues, first_id):
+  now = datetime.now()
+  venues = []
+  shows = []
+  for i in range(first_id, first_id + num_venues):
+    city, state = CITIES[i % len(CITIES)]
+    venues.append({"id": i, "name": "Venue %d" % i, "city": city, "state": state})
+    for n in range(SHOWS_PER_VENUE):
+      # half of the shows are in the past, half upcoming
+      offset = timedelta(days=(n - SHOWS_PER_VENUE // 2) * 7 + 1)
+      shows.append({"venue_id": i, "artist_id": 1, "start_time": now + offset})
+  db.session.bulk_insert_mappings(Venue, venues)
+  db.session.bulk_insert_mappings(Show, shows)
+  db.session.commit()
+
+def main():
+  app = setup_bench_db()
+  client = app.test_client()
+  db.session.add(Artist(id=1, name="Bench Artist"))
+  db.session.commit()
+
+  print("%10s %10s %12s" % ("venues", "queries", "best ms"))
+  total = 0
+  for size in SIZES:
+    seed(size - total, total + 1)
+    total = size
+
+    with count_queries() as counter:
+      response = client.get('/venues')
+    assert response.status_code == 200
+
+    best = timed(lambda: client.get('/venues'))
+    print("%10d %10d %12.1f" % (size, counter.count, best * 1000))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,54 @@
+#----------------------------------------------------------------------------#
+# Venue search: the old LOWER(name) LIKE '%term%' path against the indexed
+# full text search in search.py, at 10k, 100k and 1M venues.
+#
+#   $ python -m benchmarks.venue_search
+#----------------------------------------------------------------------------#
+
+from sqlalchemy import func, text
+
+from benchmarks import setup_bench_db, timed
+from models import db, Venue
+from search import search
+
+SIZES = [10000, 100000, 1000000]
+# a word that ends up in one name in a thousand, and one in every tenth
+TERMS = ['harbor', 'blue']
+
+SEED = text("""
+INSERT INTO "Venue" (id, name, city, state, genres)
+SELECT g,
+       (ARRAY['Blue', 'Red', 'Golden', 'Silver', 'Electric', 'Velvet', 'Neon',
+              'Crystal', 'Rusty', 'Wild'])[g % 10 + 1] || ' ' ||
+       (ARRAY['Room', 'Hall', 'Lounge', 'Club', 'Tavern', 'Stage', 'Cellar',
+              'Garden', 'Bar', 'Loft'])[g / 10 % 10 + 1] || ' ' ||
+       CASE WHEN g % 1000 = 0 THEN 'Harbor' ELSE 'No. ' || g END,
+       (ARRAY['San Francisco', 'New York', 'Austin', 'Seattle'])[g % 4 + 1],
+       (ARRAY['CA', 'NY', 'TX', 'WA'])[g % 4 + 1],
+       ARRAY[(ARRAY['Jazz', 'Rock n Roll', 'Folk', 'Blues', 'Pop'])[g % 5 + 1]]
+FROM generate_series(:first, :last) AS g
+""")
+
+def like_search(term):
+  res = Venue.query.filter(func.lower(Venue.name).contains(term.lower(), autoescape=True)).all()
+  return {"count": len(res), "data": res}
+
+def main():
+  setup_bench_db()
+
+  print("%10s %8s %10s %10s %10s" % ("venues", "term", "matches", "like ms", "fts ms"))
+  total = 0
+  for size in SIZES:
+    db.session.execute(SEED, {"first": total + 1, "last": size})
+    db.session.commit()
+    db.session.execute(text('ANALYZE "Venue"'))
+    total = size
+
+    for term in TERMS:
+      matches = search(Venue, term)["count"]
+      like_ms = timed(lambda: like_search(term), repeat=3) * 1000
+      fts_ms = timed(lambda: search(Venue, term), repeat=3) * 1000
+      print("%10d %8s %10d %10.1f %10.1f" % (size, term, matches, like_ms, fts_ms))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,257 @@
+#----------------------------------------------------------------------------#
+# Bulk import.
+#----------------------------------------------------------------------------#
+
+import csv
+import json
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy.exc import DBAPIError
+from werkzeug.datastructures import MultiDict
+
+from forms import VenueForm, ArtistForm, ShowForm
+from models import db, Venue, Artist, Show
+
+IMPORT_CHUNK_SIZE = 1000
+# only the first few rejected rows are kept, so a bad multi-GB file cannot
+# grow the report without bound
+MAX_REPORTED_ERRORS = 100
+FORMATS = ('csv', 'ndjson')
+
+'''
+read_rows(stream, format)
+    lazily yields one dict per record of a text stream, either a CSV file
+    with a header line or newline delimited JSON. In CSV, list fields such
+    as genres are separated with ";". A line that is not valid JSON
+    yields None so the caller can reject it and carry on.
+'''
+def read_rows(stream, format):
+  if format == 'csv':
+    for row in csv.DictReader(stream):
+      if row.get('genres'):
+        row['genres'] = [g.strip() for g in row['genres'].split(';') if g.strip()]
+      yield row
+  elif format == 'ndjson':
+    for line in stream:
+      if line.strip():
+        try:
+          yield json.loads(line)
+        except ValueError:
+          yield None
+  else:
+    raise ValueError('unknown import format: %r' % format)
+
+def _formdata(row):
+  items = []
+  for key, value in row.items():
+    if isinstance(value, list):
+      items.extend((key, str(v)) for v in value)
+    elif value is not None:
+      items.append((key, str(value)))
+  return MultiDict(items)
+
+def _flag(value):
+  return str(value).strip().lower() in ('1', 'true', 'yes', 'y')
+
+def _optional_id(row):
+  return {"id": int(row["id"])} if row.get("id") not in (None, "") else {}
+
+def _venue(form, row):
+  return dict(_optional_id(row),
+    name=form.name.data,
+    city=form.city.data,
+    state=form.state.data,
+    address=form.address.data,
+    phone=form.phone.data,
+    facebook_link=form.facebook_link.data,
+    genres=form.genres.data,
+    image_link=form.image_link.data or "",
+    website=row.get("website") or "",
+    seeking_talent=_flag(row.get("seeking_talent")),
+    seeking_description=row.get("seeking_description") or ""
+  )
+
+def _artist(form, row):
+  return dict(_optional_id(row),
+    name=form.name.data,
+    city=form.city.data,
+    state=form.state.data,
+    phone=form.phone.data,
+    facebook_link=form.facebook_link.data,
+    genres=form.genres.data,
+    image_link=form.image_link.data or "",
+    website=row.get("website") or "",
+    seeking_venue=_flag(row.get("seeking_venue")),
+    seeking_description=row.get("seeking_description") or ""
+  )
+
+def _show(form, row):
+  # ShowForm defaults start_time to now, a seed row has to carry its own
+  if not row.get("start_time"):
+    raise ValueError("start_time is required")
+  return {
+    "venue_id": int(form.venue_id.data),
+    "artist_id": int(form.artist_id.data),
+    "start_time": form.start_time.data
+  }
+
+# kind -> (form validating a row, model written to, row -> insert params)
+IMPORTERS = {
+  'venues': (VenueForm, Venue, _venue),
+  'artists': (ArtistForm, Artist, _artist),
+  'shows': (ShowForm, Show, _show),
+}
+
+class ImportReport(object):
+  def __init__(self, kind):
+    self.kind = kind
+    self.rows = 0
+    self.imported = 0
+    self.rejected = 0
+    self.errors = []
+    self.started = time.perf_counter()
+    self.seconds = 0.0
+
+  def reject(self, line, error):
+    self.rejected += 1
+    if len(self.errors) < MAX_REPORTED_ERRORS:
+      self.errors.append({"row": line, "error": error})
+
+  @property
+  def rows_per_second(self):
+    return self.rows / self.seconds if self.seconds else 0.0
+
+  def format(self):
+    return {
+      "kind": self.kind,
+      "rows": self.rows,
+      "imported": self.imported,
+      "rejected": self.rejected,
+      "seconds": round(self.seconds, 3),
+      "rows_per_second": round(self.rows_per_second, 1),
+      "errors": self.errors
+    }
+
+'''
+import_rows(kind, rows, chunk_size=IMPORT_CHUNK_SIZE)
+    validates every row with the form the create page uses for that kind
+    and inserts the valid ones chunk_size at a time, one executemany
+    statement and one commit per chunk. Only the current chunk is held in
+    memory. A chunk the database rejects (e.g. a show pointing at a missing
+    venue, or a value too long for its column) is retried row by row so
+    only the offending rows are dropped. Returns an ImportReport.
+'''
+def import_rows(kind, rows, chunk_size=IMPORT_CHUNK_SIZE):
+  form_class, model, to_params = IMPORTERS[kind]
+  report = ImportReport(kind)
+  chunk = []
+  explicit_ids = False
+  # binding a form's fields costs more than validating them, so bind once
+  # and re-process the same form for every row
+  form = form_class(formdata=None, meta={'csrf': False})
+
+  for line, row in enumerate(rows, start=1):
+    report.rows += 1
+    if not isinstance(row, dict):
+      report.reject(line, 'malformed record')
+      continue
+    form.process(_formdata(row))
+    if not form.validate():
+      report.reject(line, form.errors)
+      continue
+    try:
+      params = to_params(form, row)
+    except (TypeError, ValueError) as e:
+      report.reject(line, str(e))
+      continue
+
+    explicit_ids = explicit_ids or 'id' in params
+    # executemany needs the same columns on every row of a batch
+    if chunk and chunk[-1][1].keys() != params.keys():
+      _write_chunk(model, chunk, report)
+      chunk = []
+    chunk.append((line, params))
+    if len(chunk) >= chunk_size:
+      _write_chunk(model, chunk, report)
+      chunk = []
+
+  if chunk:
+    _write_chunk(model, chunk, report)
+
+  if explicit_ids:
+    # rows carrying their own ids bypass the id sequence, move it past them
+    table = model.__tablename__
+    db.session.execute(
+      "SELECT setval(pg_get_serial_sequence('\"%s\"', 'id'), "
+      "COALESCE((SELECT MAX(id) FROM \"%s\"), 0) + 1, false)" % (table, table))
+    db.session.commit()
+
+  # imported rows can show up on any page, the write handlers' targeted
+  # invalidation does not apply here
+  cache = current_app.extensions.get('response_cache')
+  if cache is not None and report.imported:
+    cache.clear()
+
+  report.seconds = time.perf_counter() - report.started
+  return report
+
+def _write_chunk(model, chunk, report):
+  # under DEBUG Flask-SQLAlchemy keeps every statement and its parameters
+  # on the app context, give each chunk its own so that list is dropped
+  with current_app.app_context():
+    _insert_chunk(model, chunk, report)
+
+def _insert_chunk(model, chunk, report):
+  insert = model.__table__.insert()
+  try:
+    db.session.execute(insert, [params for _, params in chunk])
+    db.session.commit()
+    report.imported += len(chunk)
+    return
+  except DBAPIError:
+    db.session.rollback()
+
+  for line, params in chunk:
+    try:
+      db.session.execute(insert, params)
+      db.session.commit()
+      report.imported += 1
+    except DBAPIError as e:
+      db.session.rollback()
+      report.reject(line, str(e.orig).strip())
+
+'''
+flask import <kind> <path> [--format csv|ndjson] [--chunk-size N]
+    streams a seed file into the database, e.g.
+        $ FLASK_APP=app flask import venues venues.ndjson --chunk-size 5000
+'''
+@click.command('import')
+@click.argument('kind', type=click.Choice(sorted(IMPORTERS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', type=click.Choice(FORMATS),
+              help='File format, guessed from the extension by default.')
+@click.option('--chunk-size', default=IMPORT_CHUNK_SIZE, show_default=True,
+              help='Rows per insert batch and transaction.')
+@with_appcontext
+def import_command(kind, path, format, chunk_size):
+  """Stream a CSV or NDJSON file of venues, artists or shows into the database.
+
+  Running servers drop their cached pages when CACHE_BACKEND is
+  'filesystem'. With 'memory' they keep serving them until
+  CACHE_DEFAULT_TTL expires them; POST /import/<kind> clears its own
+  worker's cache.
+  """
+  if format is None:
+    format = 'csv' if path.lower().endswith('.csv') else 'ndjson'
+
+  with open(path, newline='', encoding='utf-8') as f:
+    report = import_rows(kind, read_rows(f, format), chunk_size=chunk_size)
+
+  click.echo('%s: %d rows, %d imported, %d rejected in %.1fs (%.0f rows/s)' % (
+    kind, report.rows, report.imported, report.rejected, report.seconds,
+    report.rows_per_second))
+  for error in report.errors:
+    click.echo('  row %(row)d: %(error)s' % error, err=True)
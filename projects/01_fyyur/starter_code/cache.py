@@ -0,0 +1,248 @@
+#----------------------------------------------------------------------------#
+# Response cache.
+#----------------------------------------------------------------------------#
+
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, make_response, request, session
+
+'''
+InProcessBackend(max_entries)
+    a thread safe LRU dict local to one worker process. Entries carry
+    their own expiry time. Namespace versions live outside the LRU so they
+    are never evicted.
+'''
+class InProcessBackend(object):
+  def __init__(self, max_entries=1024):
+    self.max_entries = max_entries
+    self._entries = OrderedDict()
+    self._versions = {}
+    self._lock = threading.Lock()
+
+  def get(self, key):
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        return None
+      expires, value = entry
+      if expires is not None and expires < time.time():
+        del self._entries[key]
+        return None
+      self._entries.move_to_end(key)
+      return value
+
+  def set(self, key, value, ttl=None):
+    expires = time.time() + ttl if ttl else None
+    with self._lock:
+      self._entries[key] = (expires, value)
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+
+  def version(self, namespace):
+    return self._versions.get(namespace, 0)
+
+  def bump(self, namespace):
+    with self._lock:
+      self._versions[namespace] = self._versions.get(namespace, 0) + 1
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+
+'''
+FileSystemBackend(directory, max_entries)
+    one pickle file per key in a directory every worker on the host can
+    see, standing in for a shared cache server such as memcached or redis.
+    Writes go through a temp file and os.replace so readers never see a
+    partial entry. Least recently used files are evicted past max_entries.
+    A namespace version is the size of a file under versions/ that bump()
+    appends one byte to; O_APPEND writes are atomic, so concurrent bumps
+    from several workers are never lost.
+'''
+class FileSystemBackend(object):
+  def __init__(self, directory=None, max_entries=4096):
+    self.directory = directory or os.path.join(tempfile.gettempdir(), 'fyyur-cache')
+    self.versions = os.path.join(self.directory, 'versions')
+    self.max_entries = max_entries
+    os.makedirs(self.versions, exist_ok=True)
+
+  def _name(self, key):
+    return hashlib.sha1(key.encode()).hexdigest()
+
+  def _path(self, key):
+    return os.path.join(self.directory, self._name(key))
+
+  def _entry_names(self):
+    return [n for n in os.listdir(self.directory)
+            if n != 'versions' and not n.startswith('.tmp')]
+
+  def get(self, key):
+    path = self._path(key)
+    try:
+      with open(path, 'rb') as f:
+        expires, value = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+      return None
+    if expires is not None and expires < time.time():
+      self._remove(path)
+      return None
+    # reads refresh the mtime, which is what eviction orders by; another
+    # worker may have evicted the entry since it was read
+    try:
+      os.utime(path)
+    except OSError:
+      pass
+    return value
+
+  def set(self, key, value, ttl=None):
+    expires = time.time() + ttl if ttl else None
+    fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+      pickle.dump((expires, value), f, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, self._path(key))
+    self._evict()
+
+  def version(self, namespace):
+    try:
+      return os.path.getsize(os.path.join(self.versions, self._name(namespace)))
+    except OSError:
+      return 0
+
+  def bump(self, namespace):
+    path = os.path.join(self.versions, self._name(namespace))
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    try:
+      os.write(fd, b'.')
+    finally:
+      os.close(fd)
+
+  def clear(self):
+    for name in self._entry_names():
+      self._remove(os.path.join(self.directory, name))
+
+  def _remove(self, path):
+    try:
+      os.remove(path)
+    except OSError:
+      pass
+
+  def _evict(self):
+    names = self._entry_names()
+    if len(names) <= self.max_entries:
+      return
+    paths = [os.path.join(self.directory, n) for n in names]
+    paths.sort(key=lambda p: os.path.getmtime(p) if os.path.exists(p) else 0)
+    for path in paths[:len(paths) - self.max_entries]:
+      self._remove(path)
+
+# the namespace clear() bumps
+ALL_PAGES = '*'
+
+BACKENDS = {
+  'memory': InProcessBackend,
+  'filesystem': FileSystemBackend,
+}
+
+'''
+ResponseCache(app=None)
+    caches whole responses of read-only views under a namespace, e.g.
+
+        @app.route('/venues/<int:venue_id>')
+        @cache.cached('venue:{venue_id}')
+        def show_venue(venue_id): ...
+
+    and lets write handlers drop exactly the namespaces they touched with
+    cache.invalidate('venues', 'venue:%d' % venue_id). Every namespace has
+    a version stored in the backend and the version is part of the cache
+    key, so invalidating is one bump whichever backend is used and
+    however many query string variants of a page were cached; the stale
+    entries simply age out of the LRU. clear() bumps ALL_PAGES, a version
+    every key carries, so with a shared backend it drops the pages of
+    every worker.
+
+    Config: CACHE_BACKEND ('memory', 'filesystem' or None to disable),
+    CACHE_DEFAULT_TTL (seconds), CACHE_MAX_ENTRIES, CACHE_DIR.
+'''
+class ResponseCache(object):
+  def __init__(self, app=None):
+    self.backend = None
+    self.ttl = None
+    self.hits = {}
+    self.misses = {}
+    self._lock = threading.Lock()
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    app.extensions['response_cache'] = self
+    backend = app.config.setdefault('CACHE_BACKEND', 'memory')
+    self.ttl = app.config.setdefault('CACHE_DEFAULT_TTL', 300)
+    max_entries = app.config.setdefault('CACHE_MAX_ENTRIES', 1024)
+    if backend == 'filesystem':
+      self.backend = FileSystemBackend(app.config.get('CACHE_DIR'), max_entries)
+    elif backend is not None:
+      self.backend = BACKENDS[backend](max_entries=max_entries)
+
+  def _count(self, counters, namespace):
+    prefix = namespace.split(':', 1)[0]
+    with self._lock:
+      counters[prefix] = counters.get(prefix, 0) + 1
+
+  def cached(self, namespace, ttl=None):
+    def decorator(f):
+      @wraps(f)
+      def wrapper(*args, **kwargs):
+        # a pending flash message would be rendered into the page
+        if self.backend is None or '_flashes' in session:
+          return f(*args, **kwargs)
+
+        name = namespace.format(**kwargs)
+        key = 'page:%s:%d:%d:%s' % (name, self.backend.version(name),
+                                    self.backend.version(ALL_PAGES), request.full_path)
+        entry = self.backend.get(key)
+        if entry is not None:
+          self._count(self.hits, name)
+          body, status, mimetype = entry
+          return Response(body, status, mimetype=mimetype)
+
+        self._count(self.misses, name)
+        response = make_response(f(*args, **kwargs))
+        if response.status_code == 200 and not response.direct_passthrough:
+          self.backend.set(key, (response.get_data(), 200, response.mimetype),
+                           ttl or self.ttl)
+        return response
+      return wrapper
+    return decorator
+
+  def invalidate(self, *namespaces):
+    if self.backend is None:
+      return
+    for namespace in namespaces:
+      self.backend.bump(namespace)
+
+  def clear(self):
+    if self.backend is not None:
+      self.backend.bump(ALL_PAGES)
+      self.backend.clear()
+
+  def stats(self):
+    with self._lock:
+      names = sorted(set(self.hits) | set(self.misses))
+      stats = {}
+      for name in names:
+        hits = self.hits.get(name, 0)
+        misses = self.misses.get(name, 0)
+        stats[name] = {
+          "hits": hits,
+          "misses": misses,
+          "hit_rate": round(hits / (hits + misses), 3)
+        }
+      return stats
@@ -11,3 +11,21 @@ DEBUG = True
 
 # TODO IMPLEMENT DATABASE URL
 SQLALCHEMY_DATABASE_URI = 'postgresql://shakthivel@localhost:5432/fyyurapp'
+
+# Send executemany() inserts (see bulk_import.py) as multi-row VALUES
+# statements instead of one INSERT per row.
+SQLALCHEMY_ENGINE_OPTIONS = {'executemany_mode': 'values'}
+
+# Response cache for the read pages (see cache.py): 'memory' keeps pages in
+# each worker, 'filesystem' shares them between workers through CACHE_DIR,
+# None turns caching off.
+CACHE_BACKEND = 'memory'
+CACHE_DEFAULT_TTL = 300
+CACHE_MAX_ENTRIES = 1024
+
+# Request profiling (see flask_perf): per request query count, database and
+# render time in response headers and the "perf" log, totals at /__perf.
+# Off unless PERF_ENABLED=true is set in the environment, /__perf shows the
+# SQL the app sends. /__cache is served under the same switch.
+PERF_SLOW_STATEMENTS = 5
+PERF_QUERY_WARNING = 20
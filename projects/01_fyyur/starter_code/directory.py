@@ -0,0 +1,49 @@
+#----------------------------------------------------------------------------#
+# Venue directory.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime
+from itertools import groupby
+
+from sqlalchemy import and_, func
+
+from models import db, Venue, Show
+
+'''
+venue_directory(now=None)
+    returns the areas -> venues -> num_upcoming_shows tree rendered by
+    pages/venues.html, built from a single grouped query: every venue is
+    LEFT JOINed to its upcoming shows only and those are counted per
+    venue, so the number of round trips does not depend on the number of
+    cities or venues.
+'''
+def venue_directory(now=None):
+  if now is None:
+    now = datetime.now()
+
+  num_upcoming_shows = func.count(Show.venue_id)
+
+  rows = db.session.query(
+      Venue.city,
+      Venue.state,
+      Venue.id,
+      Venue.name,
+      num_upcoming_shows.label('num_upcoming_shows')
+    ).outerjoin(Show, and_(Show.venue_id == Venue.id, Show.start_time > now)) \
+    .group_by(Venue.id) \
+    .order_by(Venue.state, Venue.city, Venue.id) \
+    .all()
+
+  areas = []
+  for (city, state), venues in groupby(rows, key=lambda r: (r.city, r.state)):
+    areas.append({
+      "city": city,
+      "state": state,
+      "venues": [{
+        "id": v.id,
+        "name": v.name,
+        "num_upcoming_shows": v.num_upcoming_shows
+      } for v in venues]
+    })
+
+  return areas
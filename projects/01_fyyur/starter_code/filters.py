@@ -0,0 +1,44 @@
+#----------------------------------------------------------------------------#
+# Filters.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime
+from functools import lru_cache
+
+import babel.dates
+import dateutil.parser
+from babel import Locale
+from babel.dates import parse_pattern
+
+DATETIME_FORMATS = {
+  'full': "EEEE MMMM, d, y 'at' h:mma",
+  'medium': "EE MM, dd, y h:mma",
+}
+# babel's own named formats are resolved per locale, leave those to babel
+BABEL_NAMED_FORMATS = ('long', 'short')
+
+# distinct timestamps kept formatted, show pages repeat the same few a lot
+FORMATTED_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=64)
+def _compiled_format(format, locale):
+  return parse_pattern(DATETIME_FORMATS.get(format, format)), Locale.parse(locale)
+
+@lru_cache(maxsize=FORMATTED_CACHE_SIZE)
+def _format_datetime(value, format, locale):
+  if format in BABEL_NAMED_FORMATS:
+    return babel.dates.format_datetime(value, format, locale=locale)
+  pattern, locale = _compiled_format(format, locale)
+  return pattern.apply(value, locale)
+
+'''
+format_datetime(value, format='medium')
+    the "datetime" Jinja filter. Views pass datetime objects straight from
+    the database; ISO strings are still parsed for older callers. Patterns
+    are compiled once per (format, locale) and formatted values are kept
+    in a bounded LRU, since show pages repeat the same timestamps.
+'''
+def format_datetime(value, format='medium', locale=None):
+  if not isinstance(value, datetime):
+    value = dateutil.parser.parse(value)
+  return _format_datetime(value, format, locale or babel.dates.LC_TIME)
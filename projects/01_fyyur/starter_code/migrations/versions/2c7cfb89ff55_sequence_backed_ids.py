@@ -0,0 +1,33 @@
+"""sequence backed ids
+
+Revision ID: 2c7cfb89ff55
+Revises: d0785976f9a5
+Create Date: 2026-10-18 05:44:51.197450
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c7cfb89ff55'
+down_revision = 'd0785976f9a5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ids used to be allocated with SELECT MAX(id) + 1 and rows were seeded
+    # with explicit ids, so the id column may have no sequence behind it or
+    # one that lags behind the table. Make sure both tables draw ids from an
+    # owned sequence positioned after the largest existing id.
+    for table in ('Venue', 'Artist'):
+        sequence = '{}_id_seq'.format(table)
+        op.execute('CREATE SEQUENCE IF NOT EXISTS "{0}" OWNED BY "{1}".id'.format(sequence, table))
+        op.execute('ALTER TABLE "{0}" ALTER COLUMN id SET DEFAULT nextval(\'"{1}"\')'.format(table, sequence))
+        op.execute('SELECT setval(\'"{0}"\', COALESCE((SELECT MAX(id) FROM "{1}"), 0) + 1, false)'.format(sequence, table))
+
+
+def downgrade():
+    # the sequences also back the initial schema's serial columns, leave them
+    pass
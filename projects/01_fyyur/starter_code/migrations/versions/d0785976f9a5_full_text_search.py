@@ -0,0 +1,49 @@
+"""full text search
+
+Revision ID: d0785976f9a5
+Revises: 71a2c91297dd
+Create Date: 2026-10-18 05:42:36.067671
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'd0785976f9a5'
+down_revision = '71a2c91297dd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+    CREATE OR REPLACE FUNCTION search_vector_update() RETURNS trigger AS $$
+    BEGIN
+      NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('simple', concat_ws(' ', NEW.city, NEW.state)), 'B') ||
+        setweight(to_tsvector('simple', coalesce(array_to_string(NEW.genres, ' '), '')), 'C');
+      RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """)
+
+    for table in ('Artist', 'Venue'):
+        op.add_column(table, sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+        op.execute(
+            'CREATE TRIGGER search_vector_update BEFORE INSERT OR UPDATE ON "{}" '
+            'FOR EACH ROW EXECUTE PROCEDURE search_vector_update()'.format(table))
+        # backfill existing rows through the trigger
+        op.execute('UPDATE "{}" SET search_vector = NULL'.format(table))
+        op.create_index('ix_{}_search_vector'.format(table), table, ['search_vector'],
+                        unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    for table in ('Venue', 'Artist'):
+        op.drop_index('ix_{}_search_vector'.format(table), table_name=table)
+        op.execute('DROP TRIGGER search_vector_update ON "{}"'.format(table))
+        op.drop_column(table, 'search_vector')
+
+    op.execute('DROP FUNCTION search_vector_update()')
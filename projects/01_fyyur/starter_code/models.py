@@ -0,0 +1,100 @@
+#----------------------------------------------------------------------------#
+# Models.
+#----------------------------------------------------------------------------#
+
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import DDL, event
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+db = SQLAlchemy()
+
+class Show(db.Model):
+  __tablename__ = 'Show'
+  venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), primary_key=True)
+  artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), primary_key=True)
+  start_time = db.Column(db.DateTime(), primary_key=True)
+  venue = db.relationship("Venue", back_populates="venue_shows")
+  artist = db.relationship("Artist", back_populates="artist_show")
+
+  # the primary key leads with venue_id, these cover the artist pages and
+  # upcoming / chronological access across all venues (the /shows feed
+  # orders by the full key)
+  __table_args__ = (
+    db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+    db.Index('ix_Show_start_time', 'start_time', 'venue_id', 'artist_id'),
+  )
+
+class Venue(db.Model):
+  __tablename__ = 'Venue'
+
+  id = db.Column(db.Integer, primary_key=True)
+  name = db.Column(db.String)
+  city = db.Column(db.String(120))
+  state = db.Column(db.String(120))
+  address = db.Column(db.String(120))
+  phone = db.Column(db.String(120))
+  image_link = db.Column(db.String(500))
+  facebook_link = db.Column(db.String(120))
+  # new fields added
+  website = db.Column(db.String(200))
+  seeking_talent = db.Column(db.Boolean)
+  seeking_description = db.Column(db.String(3000))
+  genres = db.Column(db.ARRAY(db.String(20)))
+  # maintained by the search_vector_update trigger below
+  search_vector = db.Column(TSVECTOR)
+  venue_shows = db.relationship('Show', back_populates='venue')
+
+  __table_args__ = (
+    db.Index('ix_Venue_search_vector', 'search_vector', postgresql_using='gin'),
+  )
+
+class Artist(db.Model):
+  __tablename__ = 'Artist'
+
+  id = db.Column(db.Integer, primary_key=True)
+  name = db.Column(db.String)
+  city = db.Column(db.String(120))
+  state = db.Column(db.String(120))
+  phone = db.Column(db.String(120))
+  image_link = db.Column(db.String(500))
+  facebook_link = db.Column(db.String(120))
+  # new fields added
+  genres = db.Column(db.ARRAY(db.String(20)))
+  website = db.Column(db.String(200))
+  seeking_venue = db.Column(db.Boolean)
+  seeking_description = db.Column(db.String(3000))
+  # maintained by the search_vector_update trigger below
+  search_vector = db.Column(TSVECTOR)
+  artist_show = db.relationship('Show', back_populates='artist')
+
+  __table_args__ = (
+    db.Index('ix_Artist_search_vector', 'search_vector', postgresql_using='gin'),
+  )
+
+#----------------------------------------------------------------------------#
+# Search vectors.
+#----------------------------------------------------------------------------#
+
+# Weighted full text document for venue and artist search (see search.py):
+# name (A), city and state (B), genres (C). Kept in a column filled by a
+# trigger because array_to_string is not immutable and so cannot be used in
+# an expression index. The same DDL ships in the full text search migration.
+search_vector_update = DDL("""
+CREATE OR REPLACE FUNCTION search_vector_update() RETURNS trigger AS $$
+BEGIN
+  NEW.search_vector :=
+    setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+    setweight(to_tsvector('simple', concat_ws(' ', NEW.city, NEW.state)), 'B') ||
+    setweight(to_tsvector('simple', coalesce(array_to_string(NEW.genres, ' '), '')), 'C');
+  RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+""")
+
+event.listen(db.Model.metadata, 'before_create', search_vector_update.execute_if(dialect='postgresql'))
+
+for table in (Venue.__table__, Artist.__table__):
+  event.listen(table, 'after_create', DDL(
+    "CREATE TRIGGER search_vector_update BEFORE INSERT OR UPDATE ON %(table)s "
+    "FOR EACH ROW EXECUTE PROCEDURE search_vector_update()"
+  ).execute_if(dialect='postgresql'))
@@ -0,0 +1,60 @@
+#----------------------------------------------------------------------------#
+# Venue and artist search.
+#----------------------------------------------------------------------------#
+
+import re
+
+from sqlalchemy import func
+
+from models import db
+
+SEARCH_RESULTS_PER_PAGE = 20
+
+'''
+to_tsquery(search_term)
+    turns free text into a prefix tsquery matching every word, e.g.
+    "rock sf" -> "rock:* & sf:*", so results narrow as the user types.
+    Returns None when the term has no words.
+'''
+def to_tsquery(search_term):
+  words = re.findall(r'\w+', search_term.lower())
+  if not words:
+    return None
+  return func.to_tsquery('simple', ' & '.join(w + ':*' for w in words))
+
+'''
+search(model, search_term, page=1, per_page=SEARCH_RESULTS_PER_PAGE)
+    searches Venue or Artist by name, city, state and genres through the
+    GIN indexed search_vector column, best ts_rank first, and returns
+    {"count": total matches, "page": page, "pages": number of pages,
+    "data": [{"id", "name"}, ...]} for one page. The total comes from a
+    window count over the same query. An empty term lists everything by
+    name.
+'''
+def search(model, search_term, page=1, per_page=SEARCH_RESULTS_PER_PAGE):
+  page = max(page, 1)
+  tsquery = to_tsquery(search_term)
+
+  query = db.session.query(model.id, model.name, func.count().over().label('total'))
+  if tsquery is None:
+    query = query.order_by(model.name, model.id)
+  else:
+    query = query.filter(model.search_vector.op('@@')(tsquery)) \
+      .order_by(func.ts_rank(model.search_vector, tsquery).desc(), model.id)
+
+  rows = query.limit(per_page).offset((page - 1) * per_page).all()
+
+  if rows:
+    count = rows[0].total
+  elif page > 1:
+    # past the last page, the window count has no row to ride on
+    count = query.order_by(None).count()
+  else:
+    count = 0
+
+  return {
+    "count": count,
+    "page": page,
+    "pages": (count + per_page - 1) // per_page,
+    "data": [{"id": r.id, "name": r.name} for r in rows]
+  }
@@ -0,0 +1,73 @@
+#----------------------------------------------------------------------------#
+# Shows feed.
+#----------------------------------------------------------------------------#
+
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+from models import db, Venue, Artist, Show
+
+SHOWS_PER_PAGE = 30
+
+'''
+encode_cursor(row) / decode_cursor(cursor)
+    the cursor is the (start_time, venue_id, artist_id) key of the last
+    show on a page, packed into an opaque url safe token. decode_cursor
+    raises ValueError on anything it did not produce.
+'''
+def encode_cursor(row):
+  key = [row.start_time.isoformat(), row.venue_id, row.artist_id]
+  return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+def decode_cursor(cursor):
+  try:
+    start_time, venue_id, artist_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return datetime.fromisoformat(start_time), int(venue_id), int(artist_id)
+  except (TypeError, ValueError):
+    raise ValueError('invalid cursor: %r' % cursor)
+
+'''
+shows_page(after=None, limit=SHOWS_PER_PAGE)
+    returns (shows, next_cursor) for the page of shows that follows the
+    cursor after, in (start_time, venue_id, artist_id) order. Pages are
+    found with a row comparison on that key instead of OFFSET, and the
+    venue / artist columns come from the same query, so every page costs
+    one round trip and only holds limit rows. next_cursor is None on the
+    last page.
+'''
+def shows_page(after=None, limit=SHOWS_PER_PAGE):
+  key = tuple_(Show.start_time, Show.venue_id, Show.artist_id)
+
+  query = db.session.query(
+      Show.start_time,
+      Show.venue_id,
+      Show.artist_id,
+      Venue.name.label('venue_name'),
+      Artist.name.label('artist_name'),
+      Artist.image_link.label('artist_image_link')
+    ).join(Venue, Show.venue_id == Venue.id) \
+    .join(Artist, Show.artist_id == Artist.id)
+
+  if after is not None:
+    query = query.filter(key > tuple_(*decode_cursor(after)))
+
+  # one extra row tells us whether there is a next page
+  rows = query.order_by(Show.start_time, Show.venue_id, Show.artist_id) \
+    .limit(limit + 1) \
+    .all()
+
+  next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+
+  shows = [{
+    "venue_id": r.venue_id,
+    "venue_name": r.venue_name,
+    "artist_id": r.artist_id,
+    "artist_name": r.artist_name,
+    "artist_image_link": r.artist_image_link,
+    "start_time": r.start_time
+  } for r in rows[:limit]]
+
+  return shows, next_cursor
@@ -0,0 +1,62 @@
+#----------------------------------------------------------------------------#
+# Bulk import tests.
+#
+#   $ export FYYUR_TEST_DATABASE_URL=postgresql://localhost:5432/fyyur_test
+#   $ python -m unittest test_bulk_import
+#
+# The test database is dropped and recreated, never point it at fyyurapp.
+#----------------------------------------------------------------------------#
+
+import os
+import unittest
+
+from app import app
+from bulk_import import import_rows
+from models import db, Venue
+
+database_path = os.environ.get(
+  'FYYUR_TEST_DATABASE_URL', 'postgresql://localhost:5432/fyyur_test')
+
+
+def venue(name, city='San Francisco'):
+  return {'name': name, 'city': city, 'state': 'CA', 'address': '1 Main St',
+          'phone': '123-123-1234', 'genres': ['Jazz'],
+          'facebook_link': 'https://www.facebook.com/venue'}
+
+
+class BulkImportTestCase(unittest.TestCase):
+  """Rows the database rejects are reported, the rest is imported"""
+
+  @classmethod
+  def setUpClass(cls):
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_path
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['WTF_CSRF_ENABLED'] = False
+    cls.ctx = app.app_context()
+    cls.ctx.push()
+
+  @classmethod
+  def tearDownClass(cls):
+    db.session.remove()
+    db.drop_all()
+    cls.ctx.pop()
+
+  def setUp(self):
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+
+  def test_over_long_value_rejects_only_its_row(self):
+    # city is a String(120): the form accepts it, Postgres raises DataError
+    rows = [venue('First'), venue('Second', city='x' * 121), venue('Third')]
+    report = import_rows('venues', iter(rows))
+
+    self.assertEqual(report.imported, 2)
+    self.assertEqual(report.rejected, 1)
+    self.assertEqual(report.errors[0]['row'], 2)
+    self.assertEqual(sorted(v.name for v in Venue.query), ['First', 'Third'])
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+  unittest.main()
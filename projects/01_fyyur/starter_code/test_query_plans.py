@@ -0,0 +1,181 @@
+#----------------------------------------------------------------------------#
+# Query plan regression tests.
+#
+# Every statement a hot route sends to the database is re-run under
+# EXPLAIN with sequential scans, hash joins and merge joins disabled. The
+# planner then only reads a table in full when no index can serve the query,
+# so the result does not depend on how many rows the test database holds.
+# Besides sequential scans that covers walking a whole index whose leading
+# column the query does not constrain (e.g. artist_id against the
+# (venue_id, artist_id, start_time) primary key).
+#
+#   $ export FYYUR_TEST_DATABASE_URL=postgresql://localhost:5432/fyyur_test
+#   $ python -m unittest test_query_plans
+#
+# The test database is dropped and recreated, never point it at fyyurapp.
+#----------------------------------------------------------------------------#
+
+import os
+import re
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app import app, cache
+from models import db, Venue, Artist, Show
+
+database_path = os.environ.get(
+  'FYYUR_TEST_DATABASE_URL', 'postgresql://localhost:5432/fyyur_test')
+
+# routes that list a whole table read all of it, anything else is a regression
+ALLOWED_FULL_SCANS = {
+  '/venues': {'Venue'},
+  '/artists': {'Artist'},
+}
+
+INDEX_SCANS = ('Index Scan', 'Index Only Scan', 'Bitmap Index Scan')
+# nodes that consume their whole input before returning a row
+BLOCKING = ('Sort', 'Hash', 'Aggregate', 'Materialize')
+
+LEADING_COLUMNS = """
+SELECT index.relname, tbl.relname, att.attname
+FROM pg_index i
+JOIN pg_class index ON index.oid = i.indexrelid
+JOIN pg_class tbl ON tbl.oid = i.indrelid
+JOIN pg_attribute att ON att.attrelid = i.indrelid AND att.attnum = i.indkey[0]
+WHERE tbl.relnamespace = 'public'::regnamespace
+"""
+
+'''
+full_scans(plan, indexes, limited=False)
+    returns the tables a plan reads in full. indexes maps index name ->
+    (table, leading column). An index scan without a condition is fine
+    below a Limit with nothing in between that reads all its input, it is
+    then an ordered walk that stops early.
+'''
+def full_scans(plan, indexes, limited=False):
+  found = set()
+  node = plan['Node Type']
+  if node == 'Seq Scan':
+    found.add(plan['Relation Name'])
+  elif node in INDEX_SCANS:
+    table, column = indexes[plan['Index Name']]
+    cond = plan.get('Index Cond')
+    if cond is None:
+      if node == 'Bitmap Index Scan' or not limited:
+        found.add(table)
+    elif not re.search(r'\b%s\b' % re.escape(column), cond):
+      found.add(table)
+
+  limited = (limited or node == 'Limit') and node not in BLOCKING
+  for child in plan.get('Plans', []):
+    found |= full_scans(child, indexes, limited)
+  return found
+
+
+class QueryPlanTestCase(unittest.TestCase):
+  """Hot routes must be served by index scans"""
+
+  @classmethod
+  def setUpClass(cls):
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_path
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['WTF_CSRF_ENABLED'] = False
+    cls.ctx = app.app_context()
+    cls.ctx.push()
+    db.drop_all()
+    db.create_all()
+
+    now = datetime.now()
+    for i in range(1, 21):
+      db.session.add(Venue(id=i, name='Venue %d' % i, city='City %d' % (i % 4),
+                           state='CA', genres=['Jazz']))
+      db.session.add(Artist(id=i, name='Artist %d' % i, city='City %d' % (i % 4),
+                            state='CA', genres=['Jazz']))
+    db.session.flush()
+    for i in range(1, 21):
+      for days in (-30, -1, 1, 30):
+        db.session.add(Show(venue_id=i, artist_id=(i % 20) + 1,
+                            start_time=now + timedelta(days=days)))
+    db.session.commit()
+    db.session.execute('ANALYZE')
+    db.session.commit()
+
+  @classmethod
+  def tearDownClass(cls):
+    db.session.remove()
+    db.drop_all()
+    cls.ctx.pop()
+
+  def setUp(self):
+    self.client = app.test_client()
+    cache.clear()
+
+  def statements(self, method, path, **kwargs):
+    """Runs a request and returns the (statement, parameters) it executed"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+      if statement.lstrip().upper().startswith('SELECT'):
+        executed.append((statement, parameters))
+
+    engine = db.get_engine()
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+      res = self.client.open(path, method=method, **kwargs)
+    finally:
+      event.remove(engine, 'before_cursor_execute', record)
+    self.assertEqual(res.status_code, 200)
+    return executed
+
+  def assertIndexed(self, method, path, **kwargs):
+    executed = self.statements(method, path, **kwargs)
+    self.assertTrue(executed)
+    allowed = ALLOWED_FULL_SCANS.get(path, set())
+
+    connection = db.engine.raw_connection()
+    try:
+      cursor = connection.cursor()
+      cursor.execute(LEADING_COLUMNS)
+      indexes = {index: (table, column) for index, table, column in cursor.fetchall()}
+      for setting in ('enable_seqscan', 'enable_hashjoin', 'enable_mergejoin'):
+        cursor.execute('SET %s = off' % setting)
+      for statement, parameters in executed:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + statement, parameters)
+        plan = cursor.fetchone()[0][0]['Plan']
+        scans = full_scans(plan, indexes) - allowed
+        self.assertFalse(scans, 'full scan of %s for %s %s:\n%s' % (
+          ', '.join(sorted(scans)), method, path, statement))
+    finally:
+      connection.rollback()
+      connection.close()
+
+  def test_venues(self):
+    self.assertIndexed('GET', '/venues')
+
+  def test_show_venue(self):
+    self.assertIndexed('GET', '/venues/1')
+
+  def test_search_venues(self):
+    self.assertIndexed('POST', '/venues/search', data={'search_term': 'venue'})
+
+  def test_artists(self):
+    self.assertIndexed('GET', '/artists')
+
+  def test_show_artist(self):
+    self.assertIndexed('GET', '/artists/1')
+
+  def test_search_artists(self):
+    self.assertIndexed('POST', '/artists/search', data={'search_term': 'artist'})
+
+  def test_shows(self):
+    self.assertIndexed('GET', '/shows')
+
+  def test_shows_feed(self):
+    self.assertIndexed('GET', '/shows/feed')
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+  unittest.main()
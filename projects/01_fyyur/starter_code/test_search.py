@@ -0,0 +1,77 @@
+#----------------------------------------------------------------------------#
+# Search paging tests.
+#
+#   $ export FYYUR_TEST_DATABASE_URL=postgresql://localhost:5432/fyyur_test
+#   $ python -m unittest test_search
+#
+# The test database is dropped and recreated, never point it at fyyurapp.
+#----------------------------------------------------------------------------#
+
+import os
+import re
+import unittest
+
+from app import app
+from models import db, Venue, Artist
+from search import SEARCH_RESULTS_PER_PAGE
+
+database_path = os.environ.get(
+  'FYYUR_TEST_DATABASE_URL', 'postgresql://localhost:5432/fyyur_test')
+
+# one full page and five results on the second
+MATCHES = SEARCH_RESULTS_PER_PAGE + 5
+
+
+class SearchPagingTestCase(unittest.TestCase):
+  """Every search result is reachable through the paging links"""
+
+  @classmethod
+  def setUpClass(cls):
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_path
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['WTF_CSRF_ENABLED'] = False
+    cls.ctx = app.app_context()
+    cls.ctx.push()
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+    for i in range(1, MATCHES + 1):
+      db.session.add(Venue(id=i, name='Hall %d' % i, city='Oakland', state='CA', genres=['Jazz']))
+      db.session.add(Artist(id=i, name='Band %d' % i, city='Oakland', state='CA', genres=['Jazz']))
+    db.session.commit()
+
+  @classmethod
+  def tearDownClass(cls):
+    db.session.remove()
+    db.drop_all()
+    cls.ctx.pop()
+
+  def setUp(self):
+    self.client = app.test_client()
+
+  def assertPaged(self, path, term, link):
+    first = self.client.post(path, data={'search_term': term}).get_data(as_text=True)
+    self.assertEqual(len(re.findall(link, first)), SEARCH_RESULTS_PER_PAGE)
+    self.assertIn('Page 1 of 2', first)
+
+    # follow the Next link, which carries the term
+    next_page = re.search(r'href="([^"]+)">Next<', first).group(1).replace('&amp;', '&')
+    second = self.client.get(next_page).get_data(as_text=True)
+    self.assertEqual(len(re.findall(link, second)), MATCHES - SEARCH_RESULTS_PER_PAGE)
+    self.assertIn('Page 2 of 2', second)
+    self.assertIn('Previous', second)
+    self.assertNotIn('>Next<', second)
+
+    ids = set(re.findall(link, first)) | set(re.findall(link, second))
+    self.assertEqual(len(ids), MATCHES)
+
+  def test_search_venues_page_2(self):
+    self.assertPaged('/venues/search', 'hall', r'href="/venues/(\d+)"')
+
+  def test_search_artists_page_2(self):
+    self.assertPaged('/artists/search', 'band oak', r'href="/artists/(\d+)"')
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,62 @@
+#----------------------------------------------------------------------------#
+# Show timelines.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime
+
+from models import db, Venue, Artist, Show
+
+'''
+venue_timeline(venue_id, now=None)
+    returns (past_shows, upcoming_shows) for a venue as the flat dicts
+    pages/show_venue.html renders
+'''
+def venue_timeline(venue_id, now=None):
+  return _timeline(Artist, Show.venue_id == venue_id, Show.artist_id == Artist.id, [
+      ("artist_id", Artist.id),
+      ("artist_name", Artist.name),
+      ("artist_image_link", Artist.image_link)
+    ], now)
+
+'''
+artist_timeline(artist_id, now=None)
+    returns (past_shows, upcoming_shows) for an artist as the flat dicts
+    pages/show_artist.html renders
+'''
+def artist_timeline(artist_id, now=None):
+  return _timeline(Venue, Show.artist_id == artist_id, Show.venue_id == Venue.id, [
+      ("venue_id", Venue.id),
+      ("venue_name", Venue.name),
+      ("venue_image_link", Venue.image_link)
+    ], now)
+
+'''
+_timeline(related, criterion, join_on, fields, now)
+    fetches the matching shows joined to the other side of the booking in
+    one query, selecting only the columns in fields. The past / upcoming
+    split is computed by the database as an extra column and the rows come
+    back already ordered by it, so the loop below only shapes them.
+'''
+def _timeline(related, criterion, join_on, fields, now):
+  if now is None:
+    now = datetime.now()
+
+  upcoming = (Show.start_time > now).label('upcoming')
+  columns = [column for _, column in fields]
+
+  rows = db.session.query(upcoming, Show.start_time, *columns) \
+    .select_from(Show) \
+    .join(related, join_on) \
+    .filter(criterion) \
+    .order_by(upcoming, Show.start_time) \
+    .all()
+
+  past_shows = []
+  upcoming_shows = []
+  for row in rows:
+    d = {"start_time": row.start_time}
+    for i, (name, _) in enumerate(fields):
+      d[name] = row[i + 2]
+    (upcoming_shows if row.upcoming else past_shows).append(d)
+
+  return past_shows, upcoming_shows
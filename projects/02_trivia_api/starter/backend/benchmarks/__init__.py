@@ -0,0 +1,50 @@
+'''
+Benchmark helpers.
+
+Run the benchmarks from the backend directory, e.g.
+    $ export TRIVIA_BENCH_DATABASE_URL=postgresql://localhost:5432/trivia_bench
+    $ python -m benchmarks.pagination
+
+The benchmark database is emptied on every run, never point it at the real
+trivia database.
+'''
+
+import os
+import time
+
+from flaskr import create_app
+from models import db, Category
+
+database_path = os.environ.get(
+  'TRIVIA_BENCH_DATABASE_URL', 'postgresql://localhost:5432/trivia_bench')
+
+CATEGORIES = ['Science', 'Art', 'Geography', 'History', 'Entertainment', 'Sports']
+
+'''
+setup_bench_db()
+    creates the app against the benchmark database, recreates the schema
+    with the six categories of trivia.psql, ids 1 to 6, and returns the app
+    with an app context pushed
+'''
+def setup_bench_db():
+  app = create_app({'SQLALCHEMY_DATABASE_URI': database_path})
+  app.app_context().push()
+  db.drop_all()
+  db.create_all()
+  db.session.add_all(Category(name) for name in CATEGORIES)
+  db.session.commit()
+  return app
+
+'''
+timed(fn, repeat=5)
+    calls fn repeat times and returns the best wall clock time in seconds
+'''
+def timed(fn, repeat=5):
+  best = None
+  for _ in range(repeat):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    if best is None or elapsed < best:
+      best = elapsed
+  return best
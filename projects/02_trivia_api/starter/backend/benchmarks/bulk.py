@@ -0,0 +1,56 @@
+'''
+Loading questions one Question.insert() (one commit) at a time against
+import_questions in bulk.py, and streaming them back out with
+export_questions. Per-row inserts are only timed for the smallest size,
+the larger sizes would take minutes. Both go through the full text search
+indexes of search.py, which roughly halve the import rate.
+
+    $ python -m benchmarks.bulk
+'''
+
+import json
+import time
+
+from benchmarks import setup_bench_db
+from bulk import export_questions, import_questions
+from models import db, Category, Question
+
+SIZES = [10000, 100000, 1000000]
+PER_ROW_SIZE = 10000
+
+def ndjson(size):
+  for i in range(size):
+    yield json.dumps({
+      'question': 'Question number {}?'.format(i),
+      'answer': 'Answer {}'.format(i),
+      'category': i % 6 + 1,
+      'difficulty': i % 5 + 1
+    }) + '\n'
+
+def clock(fn):
+  start = time.perf_counter()
+  fn()
+  return time.perf_counter() - start
+
+def main():
+  setup_bench_db()
+  categories = {category.id: category.type for category in Category.query}
+
+  def per_row():
+    for i in range(PER_ROW_SIZE):
+      Question('Question number {}?'.format(i), 'Answer {}'.format(i), i % 6 + 1, i % 5 + 1).insert()
+
+  per_row_rate = PER_ROW_SIZE / clock(per_row)
+  print("per row insert(): %d rows/s" % per_row_rate)
+
+  print("%10s %14s %10s %14s" % ("questions", "import rows/s", "speedup", "export rows/s"))
+  for size in SIZES:
+    Question.query.delete()
+    db.session.commit()
+    lines = list(ndjson(size))
+    rate = size / clock(lambda: import_questions(lines, categories))
+    export_rate = size / clock(lambda: sum(1 for _ in export_questions()))
+    print("%10d %14d %9.0fx %14d" % (size, rate, rate / per_row_rate, export_rate))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,50 @@
+'''
+GET /questions: OFFSET / LIMIT pages against the keyset Paginator in
+pagination.py, at the first, middle and last page of 100k and 1M questions.
+"cold" is a page number the Paginator has not seen, "warm" one it has.
+
+    $ python -m benchmarks.pagination
+'''
+
+from sqlalchemy import text
+
+from benchmarks import setup_bench_db, timed
+from models import db, Question
+from pagination import QUESTIONS_PER_PAGE, Paginator
+
+SIZES = [100000, 1000000]
+
+SEED = text("""
+INSERT INTO questions (question, answer, category, difficulty)
+SELECT 'Question number ' || g || '?', 'Answer ' || g, g % 6 + 1, g % 5 + 1
+FROM generate_series(:first, :last) AS g
+""")
+
+def offset_page(page):
+  query = Question.query.order_by(Question.id)
+  questions = query.offset((page - 1) * QUESTIONS_PER_PAGE).limit(QUESTIONS_PER_PAGE).all()
+  return questions, query.count()
+
+def main():
+  setup_bench_db()
+
+  print("%10s %8s %10s %10s %10s" % ("questions", "page", "offset ms", "cold ms", "warm ms"))
+  total = 0
+  for size in SIZES:
+    db.session.execute(SEED, {"first": total + 1, "last": size})
+    db.session.commit()
+    db.session.execute(text('ANALYZE questions'))
+    total = size
+
+    last = size // QUESTIONS_PER_PAGE
+    for page in (1, last // 2, last):
+      offset_ms = timed(lambda: offset_page(page), repeat=3) * 1000
+      # a fresh Paginator per call, so every call has to locate the page
+      cold_ms = timed(lambda: Paginator().page(Question.query, 'all', page=page), repeat=3) * 1000
+      paginator = Paginator()
+      paginator.page(Question.query, 'all', page=page)
+      warm_ms = timed(lambda: paginator.page(Question.query, 'all', page=page), repeat=3) * 1000
+      print("%10d %8d %10.1f %10.1f %10.1f" % (size, page, offset_ms, cold_ms, warm_ms))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,79 @@
+'''
+POST /quizzes load test: quiz turns per second through the app at 100k
+questions, for the QuizEngine in quiz.py against loading every candidate
+and filtering in Python, and against ORDER BY random(), with 0, 100 and
+5000 previous questions; then for quiz sessions, which deal without the
+client resending what it has seen.
+
+    $ python -m benchmarks.quizzes
+'''
+
+import json
+import random
+
+from sqlalchemy import func, text
+
+from benchmarks import setup_bench_db, timed
+from models import db, Question
+
+SIZE = 100000
+TURNS = 200
+PREVIOUS = [0, 100, 5000]
+
+SEED = text("""
+INSERT INTO questions (question, answer, category, difficulty)
+SELECT 'Question number ' || g || '?', 'Answer ' || g, g % 6 + 1, g % 5 + 1
+FROM generate_series(1, :size) AS g
+""")
+
+def load_and_filter(category_id, previous_questions):
+  candidates = [q for q in Question.query.filter(Question.category == category_id).all()
+                if q.id not in previous_questions]
+  return random.choice(candidates) if candidates else None
+
+def order_by_random(category_id, previous_questions):
+  return Question.query.filter(Question.category == category_id,
+                               ~Question.id.in_(previous_questions)) \
+    .order_by(func.random()) \
+    .first()
+
+def main():
+  app = setup_bench_db()
+  db.session.execute(SEED, {"size": SIZE})
+  db.session.commit()
+  db.session.execute(text('ANALYZE questions'))
+  ids = [row.id for row in Question.query.with_entities(Question.id).filter(Question.category == 1)]
+  client = app.test_client()
+
+  def engine_turns(previous):
+    body = json.dumps({"previous_questions": previous, "quiz_category": {"id": 1}})
+    for _ in range(TURNS):
+      res = client.post('/quizzes', data=body, content_type='application/json')
+      assert res.get_json()['question']['id'] not in previous
+
+  def naive_turns(select, previous, turns):
+    previous_set = set(previous)
+    for _ in range(turns):
+      select(1, previous if select is order_by_random else previous_set)
+      db.session.rollback()
+
+  print("%10s %10s %12s %12s %12s" % ("questions", "previous", "engine /s", "filter /s", "random /s"))
+  for n in PREVIOUS:
+    previous = random.sample(ids, n)
+    engine_turns(previous)  # reads the id pool once
+    engine = TURNS / timed(lambda: engine_turns(previous), repeat=3)
+    naive_filter = 10 / timed(lambda: naive_turns(load_and_filter, previous, 10), repeat=3)
+    naive_random = 10 / timed(lambda: naive_turns(order_by_random, previous, 10), repeat=3)
+    print("%10d %10d %12.0f %12.0f %12.0f" % (SIZE, n, engine, naive_filter, naive_random))
+
+  def session_turns():
+    token = client.post('/quizzes/sessions', json={"quiz_category": {"id": 1}}).get_json()['session']
+    for _ in range(TURNS - 1):
+      res = client.post('/quizzes/sessions/%s/next' % token)
+      assert res.get_json()['question'] is not None
+
+  print("%10s %10s %12s" % ("questions", "session", "turns /s"))
+  print("%10d %10s %12.0f" % (SIZE, "any", TURNS / timed(session_turns, repeat=3)))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,81 @@
+'''
+POST /questions with a searchTerm: the unindexed ILIKE '%term%' scan it
+replaced against QuestionSearch in search.py, on Postgres with and without
+the GIN indexes and with the in-memory inverted index used on SQLite, for a
+rare and a common term over 100k and 1M questions. Each search fetches the
+first page and the total, as the endpoint does.
+
+    $ python -m benchmarks.search
+'''
+
+import time
+
+from sqlalchemy import text
+
+from benchmarks import setup_bench_db, timed
+from models import db, Question
+from pagination import QUESTIONS_PER_PAGE
+from search import SEARCH_INDEXES, InMemorySearch, QuestionSearch
+
+SIZES = [100000, 1000000]
+
+WORDS = ['painter', 'river', 'planet', 'novel', 'battle', 'element', 'album', 'capital']
+
+# a made up word per question for the rare term, and a common word shared
+# by an eighth of the questions
+SEED = text("""
+INSERT INTO questions (question, answer, category, difficulty)
+SELECT 'Which ' || (:words)[g % 8 + 1] || ' is ' || substr(md5(g::text), 1, 8) || '?',
+       'Answer ' || g, g % 6 + 1, g % 5 + 1
+FROM generate_series(:first, :last) AS g
+""")
+
+DROP_INDEXES = [
+  'DROP INDEX IF EXISTS ix_questions_question_fts',
+  'DROP INDEX IF EXISTS ix_questions_document_fts',
+]
+
+def ilike_page(term):
+  query = Question.query.filter(Question.question.ilike('%{}%'.format(term)))
+  return query.order_by(Question.id).limit(QUESTIONS_PER_PAGE).all(), query.count()
+
+def execute(statements):
+  for statement in statements:
+    db.session.execute(text(statement))
+  db.session.commit()
+  db.session.execute(text('ANALYZE questions'))
+
+def main():
+  setup_bench_db()
+  search = QuestionSearch()
+  rare = db.session.execute(text("SELECT substr(md5('4242'), 1, 8)")).scalar()
+
+  print("%10s %8s %10s %12s %10s %12s %10s" % (
+    "questions", "term", "ilike ms", "no index ms", "gin ms", "in-memory ms", "build s"))
+  total = 0
+  for size in SIZES:
+    execute(DROP_INDEXES)
+    db.session.execute(SEED, {"words": WORDS, "first": total + 1, "last": size})
+    db.session.commit()
+    db.session.execute(text('ANALYZE questions'))
+    total = size
+
+    no_index = {}
+    for name, term in (('rare', rare), ('common', 'planet')):
+      no_index[name] = timed(lambda: search.page(term), repeat=3) * 1000
+    execute(SEARCH_INDEXES)
+
+    in_memory = InMemorySearch()
+    start = time.perf_counter()
+    in_memory.index()
+    build = time.perf_counter() - start
+
+    for name, term in (('rare', rare), ('common', 'planet')):
+      ilike_ms = timed(lambda: ilike_page(term), repeat=3) * 1000
+      gin_ms = timed(lambda: search.page(term), repeat=3) * 1000
+      memory_ms = timed(lambda: in_memory.search([term], False, 0, None, QUESTIONS_PER_PAGE + 1), repeat=3) * 1000
+      print("%10d %8s %10.1f %12.1f %10.1f %12.1f %10.1f" % (
+        size, name, ilike_ms, no_index[name], gin_ms, memory_ms, build))
+
+if __name__ == '__main__':
+  main()
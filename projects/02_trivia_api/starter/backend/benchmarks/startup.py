@@ -0,0 +1,82 @@
+'''
+Cold start of one worker: a fresh interpreter importing flaskr, running
+create_app() and serving its first request, GET /categories, as a
+preforking server's worker does after a restart. "create_all" is the
+startup before `flask migrate`, when setup_db() ran create_all() in every
+worker; "lazy" is the current one. "preload" is a worker forked from a
+parent that already imported flaskr, created the app and used its pool
+(gunicorn --preload), timed from the fork. Each row is the median of RUNS
+workers against the migrated benchmark database.
+
+    $ python -m benchmarks.startup
+'''
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks import database_path, setup_bench_db
+from models import db
+
+RUNS = 15
+
+WORKER = """
+import json, sys, time
+start = time.perf_counter()
+from flaskr import create_app
+from models import db
+imported = time.perf_counter()
+app = create_app({'SQLALCHEMY_DATABASE_URI': sys.argv[1]})
+if sys.argv[2] == 'create_all':
+  with app.app_context():
+    db.create_all()
+created = time.perf_counter()
+response = app.test_client().get('/categories')
+assert response.status_code == 200
+served = time.perf_counter()
+print(json.dumps([imported - start, created - imported, served - created, served - start]))
+"""
+
+def cold_start(mode):
+  backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+  output = subprocess.check_output([sys.executable, '-c', WORKER, database_path, mode], cwd=backend)
+  return json.loads(output)
+
+def forked_start(app):
+  read, write = os.pipe()
+  start = time.perf_counter()
+  pid = os.fork()
+  if pid == 0:
+    os.close(read)
+    forked = time.perf_counter()
+    response = app.test_client().get('/categories')
+    served = time.perf_counter()
+    os.write(write, json.dumps([forked - start, 0, served - forked, served - start]).encode())
+    os._exit(0 if response.status_code == 200 else 1)
+  os.close(write)
+  with os.fdopen(read) as pipe:
+    output = pipe.read()
+  _, status = os.waitpid(pid, 0)
+  assert status == 0
+  return json.loads(output)
+
+def print_row(mode, runs):
+  print("%10s %14.1f %14.1f %18.1f %10.1f" % ((mode,) + tuple(
+    statistics.median(run[i] for run in runs) * 1000 for i in range(4))))
+
+def main():
+  app = setup_bench_db()
+  # the parent holds a pooled connection, as a preloading master might
+  db.session.remove()
+  print("%10s %14s %14s %18s %10s" % (
+    "startup", "fork/import ms", "create_app ms", "first request ms", "total ms"))
+  for mode in ('create_all', 'lazy'):
+    runs = [cold_start(mode) for _ in range(RUNS)]
+    print_row(mode, runs)
+  print_row('preload', [forked_start(app) for _ in range(RUNS)])
+
+if __name__ == '__main__':
+  main()
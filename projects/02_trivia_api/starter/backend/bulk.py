@@ -0,0 +1,135 @@
+import json
+
+from psycopg2.extras import execute_values
+
+from models import db, Question, ALL_QUESTIONS, add_question_counts
+
+# rows sent per INSERT, each batch is committed on its own
+IMPORT_BATCH_SIZE = 500
+COLUMNS = ('question', 'answer', 'category', 'difficulty')
+# rows fetched per round trip from the server-side cursor when exporting
+EXPORT_BATCH_SIZE = 1000
+
+'''
+BulkImportError(line, message, imported=0)
+    a line of an import that is not a valid question. Batches before it
+    have been committed, imported says how many questions that was.
+'''
+class BulkImportError(ValueError):
+  def __init__(self, line, message, imported=0):
+    super(BulkImportError, self).__init__('line {}: {}'.format(line, message))
+    self.line = line
+    self.imported = imported
+
+'''
+parse_question(text, categories)
+    the questions row for one NDJSON line, {"question", "answer",
+    "category", "difficulty"} with category an id from categories. Raises
+    ValueError on anything else.
+'''
+def parse_question(text, categories):
+  try:
+    item = json.loads(text)
+  except ValueError:
+    raise ValueError('not JSON')
+  if not isinstance(item, dict):
+    raise ValueError('not an object')
+
+  question = item.get('question')
+  answer = item.get('answer')
+  if not isinstance(question, str) or not question.strip():
+    raise ValueError('question is missing')
+  if not isinstance(answer, str) or not answer.strip():
+    raise ValueError('answer is missing')
+  try:
+    category = int(item.get('category'))
+    difficulty = int(item.get('difficulty'))
+  except (TypeError, ValueError):
+    raise ValueError('category and difficulty must be integers')
+  if category not in categories:
+    raise ValueError('unknown category {}'.format(category))
+
+  return {
+    'question': question,
+    'answer': answer,
+    'category': category,
+    'difficulty': difficulty
+  }
+
+'''
+import_questions(lines, categories, batch_size=IMPORT_BATCH_SIZE)
+    inserts one question per non blank line of NDJSON and returns how many
+    it inserted. Lines are validated as they are read, categories being the
+    {id: type} map of the category catalog, and rows go in as one
+    multi-row INSERT and one commit per batch, instead of a commit per
+    Question.insert(). Raises BulkImportError at the first invalid line.
+'''
+def import_questions(lines, categories, batch_size=IMPORT_BATCH_SIZE):
+  table = Question.__table__
+  imported = 0
+  batch = []
+  for number, text in enumerate(lines, 1):
+    if isinstance(text, bytes):
+      text = text.decode('utf-8')
+    if not text.strip():
+      continue
+    try:
+      batch.append(parse_question(text, categories))
+    except ValueError as e:
+      raise BulkImportError(number, str(e), imported)
+
+    if len(batch) >= batch_size:
+      imported += _insert(table, batch)
+      batch = []
+  if batch:
+    imported += _insert(table, batch)
+  return imported
+
+# A multi-row INSERT built by SQLAlchemy is compiled anew for every batch,
+# which costs more than sending it. psycopg2 gets one prepared text with
+# execute_values, other drivers the statement once with executemany.
+def _insert(table, rows):
+  try:
+    connection = db.session.connection()
+    if connection.dialect.driver == 'psycopg2':
+      statement = 'INSERT INTO {} ({}) VALUES %s'.format(table.name, ', '.join(COLUMNS))
+      cursor = connection.connection.cursor()
+      execute_values(cursor, statement, [tuple(row[c] for c in COLUMNS) for row in rows], page_size=len(rows))
+    else:
+      connection.execute(table.insert(), rows)
+    counts = {ALL_QUESTIONS: len(rows)}
+    for row in rows:
+      key = str(row['category'])
+      counts[key] = counts.get(key, 0) + 1
+    add_question_counts(connection, counts)
+    db.session.commit()
+  except Exception:
+    db.session.rollback()
+    raise
+  return len(rows)
+
+'''
+export_questions(category_id=None, batch_size=EXPORT_BATCH_SIZE)
+    yields every question (of one category) as an NDJSON line, in id
+    order. Rows come from a server-side cursor, batch_size at a time, so
+    memory stays flat however many questions there are.
+'''
+def export_questions(category_id=None, batch_size=EXPORT_BATCH_SIZE):
+  table = Question.__table__
+  query = table.select().order_by(table.c.id)
+  if category_id is not None:
+    query = query.where(table.c.category == category_id)
+
+  result = db.session.connection().execution_options(stream_results=True).execute(query)
+  while True:
+    rows = result.fetchmany(batch_size)
+    if not rows:
+      break
+    for row in rows:
+      yield json.dumps({
+        'id': row.id,
+        'question': row.question,
+        'answer': row.answer,
+        'category': row.category,
+        'difficulty': row.difficulty
+      }) + '\n'
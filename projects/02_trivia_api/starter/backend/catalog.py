@@ -0,0 +1,78 @@
+import hashlib
+import json
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from models import Category
+
+# how long the catalog may be trusted when a category changed in another
+# worker process
+CATALOG_TTL = 300
+
+# bumped whenever a transaction writing categories commits in this process
+_generation = 0
+
+def _category_written(mapper, connection, target):
+  session = object_session(target)
+  if session is not None:
+    session.info['categories_written'] = True
+
+for _name in ('after_insert', 'after_update', 'after_delete'):
+  event.listen(Category, _name, _category_written)
+
+# a catalog reloaded between the flush and the commit would still read the
+# old rows, so catalogs are only told once the write is visible
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+  global _generation
+  if session.info.pop('categories_written', False):
+    _generation += 1
+
+@event.listens_for(Session, 'after_rollback')
+def _after_rollback(session):
+  session.info.pop('categories_written', None)
+
+'''
+Catalog(categories)
+    one immutable snapshot of the categories: the {id: type} dict, the
+    GET /categories body already serialized, and its ETag.
+'''
+class Catalog(object):
+  def __init__(self, categories, generation):
+    self.categories = categories
+    self.body = json.dumps({
+      'success': True,
+      'categories': categories
+    }).encode()
+    self.etag = hashlib.sha1(self.body).hexdigest()
+    self.generation = generation
+    self.expires = time.time() + CATALOG_TTL
+
+'''
+CategoryCatalog()
+    the category list, read once and kept in memory. Categories hardly
+    ever change, yet every listing and most page loads ask for them; get()
+    returns the current Catalog without touching the database, and a new
+    one is read after a committed category write or CATALOG_TTL.
+'''
+class CategoryCatalog(object):
+  def __init__(self):
+    self._catalog = None
+    self._lock = threading.Lock()
+
+  def invalidate(self):
+    self._catalog = None
+
+  def get(self):
+    catalog = self._catalog
+    if catalog is None or catalog.generation != _generation or catalog.expires < time.time():
+      with self._lock:
+        catalog = self._catalog
+        if catalog is None or catalog.generation != _generation or catalog.expires < time.time():
+          generation = _generation
+          categories = {category.id: category.type for category in Category.query.order_by(Category.id)}
+          catalog = self._catalog = Catalog(categories, generation)
+    return catalog
@@ -0,0 +1,58 @@
+from sqlalchemy import func
+
+from models import db, Question, QuestionCount, ALL_QUESTIONS
+
+'''
+question_count(category_id=None)
+    the number of questions in a category, or in all of them when None,
+    from the counters table: one primary key lookup.
+'''
+def question_count(category_id=None):
+  key = ALL_QUESTIONS if category_id is None else str(category_id)
+  row = db.session.query(QuestionCount.count).filter(QuestionCount.category == key).first()
+  return row.count if row is not None else 0
+
+def _counted():
+  counts = {str(category): count for category, count in db.session.query(
+    Question.category, func.count(Question.id)
+  ).filter(Question.category.isnot(None)).group_by(Question.category)}
+  counts[ALL_QUESTIONS] = Question.query.count()
+  return counts
+
+'''
+check_counts()
+    compares the counters with COUNT(*) over questions and returns
+    [(category, stored, actual)] for every counter that is wrong, an empty
+    list when they all agree. A missing counter reads as 0.
+'''
+def check_counts():
+  return _differences(_counted())
+
+def _differences(actual):
+  stored = {row.category: row.count for row in QuestionCount.query}
+  return [(category, stored.get(category, 0), actual.get(category, 0))
+          for category in sorted(set(actual) | set(stored))
+          if stored.get(category, 0) != actual.get(category, 0)]
+
+'''
+repair_counts()
+    recounts every counter from questions in one transaction and returns
+    what was wrong, like check_counts(). On Postgres writers are held off
+    while it counts, so no insert slips between the count and the
+    rewrite.
+'''
+def repair_counts():
+  try:
+    if db.engine.dialect.name == 'postgresql':
+      db.session.execute('LOCK TABLE questions IN SHARE MODE')
+    actual = _counted()
+    wrong = _differences(actual)
+    if wrong:
+      QuestionCount.query.delete()
+      db.session.add_all(QuestionCount(category=category, count=count)
+                         for category, count in actual.items())
+    db.session.commit()
+  except Exception:
+    db.session.rollback()
+    raise
+  return wrong
@@ -1,104 +1,448 @@
 import os
-from flask import Flask, request, abort, jsonify
+import click
+from flask import Flask, Response, request, abort, jsonify, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 import random
 
-from models import setup_db, Question, Category
-
-QUESTIONS_PER_PAGE = 10
+from bulk import BulkImportError, export_questions, import_questions
+from catalog import CategoryCatalog
+from counts import check_counts, question_count, repair_counts
+from models import setup_db, database_path, Question, Category
+from pagination import QUESTIONS_PER_PAGE, Paginator
+from flask_perf import Profiler
+from quiz import QuizEngine
+from schema import SchemaError, migrate, upgrade_categories
+from search import QuestionSearch, create_search_indexes
 
 def create_app(test_config=None):
   # create and configure the app
   app = Flask(__name__)
-  setup_db(app)
-  
+  if test_config is not None:
+    app.config.update(test_config)
+  setup_db(app, app.config.get('SQLALCHEMY_DATABASE_URI', database_path))
+  profiler = Profiler(app)
+  paginator = Paginator(QUESTIONS_PER_PAGE)
+  quiz = QuizEngine()
+  catalog = CategoryCatalog()
+  search = QuestionSearch(QUESTIONS_PER_PAGE)
+  # everything kept in memory between requests, see harness.py
+  app.extensions['caches'] = [paginator, quiz, catalog, search]
+
+  @app.cli.command('migrate')
+  def migrate_command():
+    '''Creates the missing tables and indexes, run before starting workers.'''
+    try:
+      steps = migrate()
+    except SchemaError as e:
+      raise click.ClickException(str(e))
+    for step in steps:
+      click.echo(step)
+    if not steps:
+      click.echo('the schema is up to date')
+
+  @app.cli.command('create-search-indexes')
+  def create_search_indexes_command():
+    '''Adds the full text search indexes to an existing database.'''
+    create_search_indexes()
+
+  def questions_changed():
+    paginator.invalidate()
+    quiz.invalidate()
+    search.invalidate()
+
+  @app.cli.command('import-questions')
+  @click.argument('source', type=click.File('r'))
+  def import_questions_command(source):
+    '''Imports questions from an NDJSON file, - for stdin.'''
+    try:
+      imported = import_questions(source, catalog.get().categories)
+    except BulkImportError as e:
+      raise click.ClickException('{} ({} questions imported before it)'.format(e, e.imported))
+    click.echo('imported {} questions'.format(imported))
+
+  @app.cli.command('export-questions')
+  @click.argument('target', type=click.File('w'), default='-')
+  @click.option('--category', type=int, help='only this category id')
+  def export_questions_command(target, category):
+    '''Exports questions as NDJSON, to stdout by default.'''
+    for line in export_questions(category):
+      target.write(line)
+
+  @app.cli.command('check-counts')
+  @click.option('--repair', is_flag=True, help='rewrite the counters that are wrong')
+  def check_counts_command(repair):
+    '''Compares the question counters with the questions table.'''
+    wrong = repair_counts() if repair else check_counts()
+    for category, stored, actual in wrong:
+      click.echo('{}: counter {}, actual {}'.format(category, stored, actual))
+    if not wrong:
+      click.echo('question counters are correct')
+    elif repair:
+      click.echo('repaired {} counters'.format(len(wrong)))
+    else:
+      raise click.ClickException('{} counters are wrong, run with --repair'.format(len(wrong)))
+
+  @app.cli.command('upgrade-categories')
+  @click.option('--dry-run', is_flag=True, help='report the steps, then roll them back')
+  def upgrade_categories_command(dry_run):
+    '''Makes questions.category an indexed foreign key to categories.'''
+    try:
+      steps = upgrade_categories(dry_run)
+    except SchemaError as e:
+      raise click.ClickException(str(e))
+    for step in steps:
+      click.echo(step)
+    if not steps:
+      click.echo('questions.category is up to date')
+    elif dry_run:
+      click.echo('dry run, nothing was changed')
+
+  # Set up CORS. Allow '*' for origins.
+  CORS(app, resources={r"/*": {"origins": "*"}})
+
+  @app.after_request
+  def after_request(response):
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,true')
+    response.headers.add('Access-Control-Allow-Methods', 'GET,POST,DELETE,OPTIONS')
+    return response
+
+  '''
+  questions_page(query, key, total=None, **extra)
+      the response body shared by every question listing. Pages are
+      selected with ?cursor=<next_cursor> or, for older clients, ?page=N,
+      see pagination.py. total comes from the question counters where the
+      listing has one.
   '''
-  @TODO: Set up CORS. Allow '*' for origins. Delete the sample route after completing the TODOs
+  def questions_page(query, key, total=None, **extra):
+    cursor = request.args.get('cursor')
+    page = request.args.get('page', 1, type=int)
+    try:
+      questions, total, next_cursor = paginator.page(query, key, page=page, cursor=cursor, total=total)
+    except ValueError:
+      abort(400)
+
+    if not questions and (cursor is not None or page > 1):
+      abort(404)
+
+    body = {
+      'success': True,
+      'questions': [question.format() for question in questions],
+      'total_questions': total,
+      'current_category': None,
+      'next_cursor': next_cursor
+    }
+    body.update(extra)
+    return jsonify(body)
+
   '''
+  GET /categories
+      returns {"success": True, "categories": {id: type}} from the catalog
+      kept in memory, see catalog.py. The response carries an ETag, a
+      request with a matching If-None-Match gets 304 Not Modified.
+  '''
+  @app.route('/categories')
+  def get_categories():
+    current = catalog.get()
+    response = Response(current.body, mimetype='application/json')
+    response.set_etag(current.etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
   '''
-  @TODO: Use the after_request decorator to set Access-Control-Allow
+  GET /questions?page=N or ?cursor=C
+      ten questions per page in id order, with the total and all categories
   '''
+  @app.route('/questions')
+  def get_questions():
+    return questions_page(Question.query, 'all', total=question_count(),
+                          categories=catalog.get().categories)
 
   '''
-  @TODO: 
-  Create an endpoint to handle GET requests 
-  for all available categories.
+  DELETE /questions/<question_id>
+      returns {"success": True, "deleted": question_id}
   '''
+  @app.route('/questions/<int:question_id>', methods=['DELETE'])
+  def delete_question(question_id):
+    question = Question.query.get(question_id)
+    if question is None:
+      abort(404)
 
+    try:
+      question.delete()
+    except Exception:
+      abort(422)
+    questions_changed()
 
-  '''
-  @TODO: 
-  Create an endpoint to handle GET requests for questions, 
-  including pagination (every 10 questions). 
-  This endpoint should return a list of questions, 
-  number of total questions, current category, categories. 
+    return jsonify({
+      'success': True,
+      'deleted': question_id
+    })
 
-  TEST: At this point, when you start the application
-  you should see questions and categories generated,
-  ten questions per page and pagination at the bottom of the screen for three pages.
-  Clicking on the page numbers should update the questions. 
   '''
-
+  POST /questions
+      with {"searchTerm": term}: the questions containing term, paged like
+      GET /questions
+      with {"question", "answer", "category", "difficulty"}: creates a
+      question and returns {"success": True, "created": id}
   '''
-  @TODO: 
-  Create an endpoint to DELETE question using a question ID. 
+  @app.route('/questions', methods=['POST'])
+  def post_question():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+      abort(400)
 
-  TEST: When you click the trash icon next to a question, the question will be removed.
-  This removal will persist in the database and when you refresh the page. 
-  '''
+    if 'searchTerm' in body:
+      search_term = body['searchTerm']
+      if search_term is not None and not isinstance(search_term, str):
+        abort(400)
+      return search_questions(search_term or '', bool(body.get('include_answers')))
+
+    question = body.get('question')
+    answer = body.get('answer')
+    category = body.get('category')
+    difficulty = body.get('difficulty')
+    if not question or not answer or category is None or difficulty is None:
+      abort(422)
+    # an id, as a number or a string of digits, of a known category
+    # isdecimal(), not isdigit(): int() refuses digits like '²'
+    if isinstance(category, str) and category.isdecimal():
+      category = int(category)
+    if type(category) is not int or category not in catalog.get().categories:
+      abort(422)
+
+    try:
+      question = Question(question, answer, category, int(difficulty))
+      question.insert()
+    except Exception:
+      abort(422)
+    questions_changed()
 
+    return jsonify({
+      'success': True,
+      'created': question.id
+    })
+
+  '''
+  POST /questions/import
+      takes NDJSON, one {"question", "answer", "category", "difficulty"}
+      object per line, and inserts the questions in batches, see bulk.py.
+      Returns {"success": True, "imported": n}, or a 422 naming the first
+      invalid line, with the questions of the batches before it imported.
   '''
-  @TODO: 
-  Create an endpoint to POST a new question, 
-  which will require the question and answer text, 
-  category, and difficulty score.
+  @app.route('/questions/import', methods=['POST'])
+  def import_questions_route():
+    try:
+      imported = import_questions(request.stream, catalog.get().categories)
+    except BulkImportError as e:
+      return jsonify({
+        'success': False,
+        'error': 422,
+        'message': str(e),
+        'line': e.line,
+        'imported': e.imported
+      }), 422
+    finally:
+      questions_changed()
+
+    return jsonify({
+      'success': True,
+      'imported': imported
+    })
 
-  TEST: When you submit a question on the "Add" tab, 
-  the form will clear and the question will appear at the end of the last page
-  of the questions list in the "List" tab.  
   '''
+  GET /questions/export?category=id
+      every question (of one category) as NDJSON, streamed in id order
+  '''
+  @app.route('/questions/export')
+  def export_questions_route():
+    category_id = request.args.get('category', type=int)
+    return Response(stream_with_context(export_questions(category_id)),
+                    mimetype='application/x-ndjson')
 
   '''
-  @TODO: 
-  Create a POST endpoint to get questions based on a search term. 
-  It should return any questions for whom the search term 
-  is a substring of the question. 
+  search_questions(search_term, include_answers)
+      the questions matching every word of search_term as a word prefix,
+      best match first, see search.py; a term without words lists every
+      question. Paged with ?cursor or ?page like GET /questions.
+  '''
+  def search_questions(search_term, include_answers):
+    cursor = request.args.get('cursor')
+    page = request.args.get('page', 1, type=int)
+    try:
+      result = search.page(search_term, include_answers, page=page, cursor=cursor)
+    except ValueError:
+      abort(400)
+    if result is None:
+      return questions_page(Question.query, 'all', total=question_count())
+
+    questions, total, next_cursor = result
+    if not questions and (cursor is not None or page > 1):
+      abort(404)
 
-  TEST: Search by any phrase. The questions list will update to include 
-  only question that include that string within their question. 
-  Try using the word "title" to start. 
+    return jsonify({
+      'success': True,
+      'questions': [question.format() for question in questions],
+      'total_questions': total,
+      'current_category': None,
+      'next_cursor': next_cursor
+    })
+
+  '''
+  GET /categories/<category_id>/questions?page=N or ?cursor=C
+      the questions of one category, paged like GET /questions
   '''
+  @app.route('/categories/<int:category_id>/questions')
+  def get_category_questions(category_id):
+    category_type = catalog.get().categories.get(category_id)
+    if category_type is None:
+      abort(404)
+
+    query = Question.query.filter(Question.category == category_id)
+    return questions_page(query, 'category:{}'.format(category_id),
+                          total=question_count(category_id),
+                          current_category=category_type)
 
+  def quiz_category_id(body):
+    quiz_category = body.get('quiz_category') or {}
+    if not isinstance(quiz_category, dict):
+      raise ValueError('quiz_category must be an object')
+    return int(quiz_category.get('id') or 0) or None
+
+  '''
+  POST /quizzes
+      takes {"previous_questions": [ids], "quiz_category": {"id": id}},
+      where a missing category or id 0 means all categories, and returns
+      {"success": True, "question": question} with a random question not
+      asked yet, or null when there is none left
   '''
-  @TODO: 
-  Create a GET endpoint to get questions based on category. 
+  @app.route('/quizzes', methods=['POST'])
+  def play_quiz():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+      abort(400)
+
+    previous_questions = body.get('previous_questions') or []
+    if not isinstance(previous_questions, list):
+      abort(400)
+    try:
+      previous_questions = [int(question_id) for question_id in previous_questions]
+      category_id = quiz_category_id(body)
+    except (TypeError, ValueError):
+      abort(400)
 
-  TEST: In the "List" tab / main screen, clicking on one of the 
-  categories in the left column will cause only questions of that 
-  category to be shown. 
+    question = quiz.next_question(category_id, previous_questions)
+
+    return jsonify({
+      'success': True,
+      'question': question.format() if question is not None else None
+    })
+
+  '''
+  POST /quizzes/sessions
+      takes {"quiz_category": {"id": id}} like POST /quizzes, starts a game
+      kept on the server and returns {"success": True, "session": token,
+      "question": question, "remaining": n} with its first question.
+      Further questions come from POST /quizzes/sessions/<token>/next, so
+      the client never sends the questions it has already seen.
   '''
+  @app.route('/quizzes/sessions', methods=['POST'])
+  def start_quiz_session():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+      abort(400)
+    try:
+      category_id = quiz_category_id(body)
+    except (TypeError, ValueError):
+      abort(400)
 
+    token = quiz.start_session(category_id)
+    return deal_quiz_question(token)
 
   '''
-  @TODO: 
-  Create a POST endpoint to get questions to play the quiz. 
-  This endpoint should take category and previous question parameters 
-  and return a random questions within the given category, 
-  if provided, and that is not one of the previous questions. 
+  POST /quizzes/sessions/<token>/next
+      returns {"success": True, "session": token, "question": question,
+      "remaining": n}, question is null once the session has run out;
+      404 for an unknown or expired session
+  '''
+  @app.route('/quizzes/sessions/<token>/next', methods=['POST'])
+  def deal_quiz_question(token):
+    session = quiz.session(token)
+    if session is None:
+      abort(404)
+
+    question, remaining = quiz.deal(session)
+    return jsonify({
+      'success': True,
+      'session': token,
+      'question': question.format() if question is not None else None,
+      'remaining': remaining
+    })
 
-  TEST: In the "Play" tab, after a user selects "All" or a category,
-  one question at a time is displayed, the user is allowed to answer
-  and shown whether they were correct or not. 
   '''
+  DELETE /quizzes/sessions/<token>
+      ends a session early, returns {"success": True, "deleted": token}
+  '''
+  @app.route('/quizzes/sessions/<token>', methods=['DELETE'])
+  def end_quiz_session(token):
+    if not quiz.end_session(token):
+      abort(404)
+
+    return jsonify({
+      'success': True,
+      'deleted': token
+    })
 
   '''
-  @TODO: 
-  Create error handlers for all expected errors 
-  including 404 and 422. 
+  GET /__perf
+      query counts and database time per endpoint, see flask_perf, only
+      while profiling is enabled
   '''
-  
-  return app
+  if profiler.enabled:
+    @app.route('/__perf')
+    def perf_stats():
+      return jsonify(profiler.stats())
+
+  # Error Handling
 
-    
\ No newline at end of file
+  @app.errorhandler(400)
+  def bad_request(error):
+    return jsonify({
+      'success': False,
+      'error': 400,
+      'message': 'bad request'
+    }), 400
+
+  @app.errorhandler(404)
+  def not_found(error):
+    return jsonify({
+      'success': False,
+      'error': 404,
+      'message': 'resource not found'
+    }), 404
+
+  @app.errorhandler(405)
+  def method_not_allowed(error):
+    return jsonify({
+      'success': False,
+      'error': 405,
+      'message': 'method not allowed'
+    }), 405
+
+  @app.errorhandler(422)
+  def unprocessable(error):
+    return jsonify({
+      'success': False,
+      'error': 422,
+      'message': 'unprocessable'
+    }), 422
+
+  @app.errorhandler(500)
+  def server_error(error):
+    return jsonify({
+      'success': False,
+      'error': 500,
+      'message': 'internal server error'
+    }), 500
+
+  return app
@@ -0,0 +1,313 @@
+'''
+Test harness for the backend.
+
+Every worker process gets its own database, created with the schema and
+the rows of trivia.psql once, and every test runs inside a transaction
+that is rolled back afterwards, so tests neither see each other's writes
+nor pay for recreating anything. Test modules end with harness.main():
+
+    $ python test_flaskr.py                     # one worker
+    $ python test_flaskr.py -j 4                # four worker processes
+    $ python test_flaskr.py --database sqlite   # in-memory SQLite
+    $ python test_flaskr.py --database ephemeral -j 4
+    $ python test_flaskr.py TriviaTestCase.test_get_categories
+
+--database (or TRIVIA_TEST_DATABASE_URL) is a Postgres URL whose database
+name is the prefix of the per-worker databases, trivia_test_0,
+trivia_test_1, ... by default; they are dropped when the worker is done.
+"ephemeral" runs a throwaway Postgres cluster in a temporary directory,
+which needs initdb and pg_ctl on the PATH.
+'''
+
+import argparse
+import io
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.orm import scoped_session
+
+DATABASE_URL = os.environ.get('TRIVIA_TEST_DATABASE_URL', 'postgresql://localhost:5432/trivia_test')
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trivia.psql')
+
+# pysqlite issues its own BEGIN and COMMIT around statements and ignores
+# SAVEPOINT; leave transactions to SQLAlchemy so the per-test ones work.
+@event.listens_for(Engine, 'connect')
+def _sqlite_connect(dbapi_connection, connection_record):
+  if isinstance(dbapi_connection, sqlite3.Connection):
+    dbapi_connection.isolation_level = None
+
+@event.listens_for(Engine, 'begin')
+def _sqlite_begin(connection):
+  if connection.dialect.name == 'sqlite':
+    connection.execute('BEGIN')
+
+#----------------------------------------------------------------------------#
+# Databases.
+#----------------------------------------------------------------------------#
+
+'''
+worker_database_url(url, worker)
+    the database of one worker: url itself for SQLite, where an in-memory
+    database is private to its process anyway, otherwise url with
+    _<worker> appended to the database name
+'''
+def worker_database_url(url, worker):
+  url = make_url(url)
+  if url.get_backend_name() == 'sqlite':
+    return str(url)
+  url.database = '{}_{}'.format(url.database, worker)
+  return str(url)
+
+def _maintenance_engine(url):
+  url = make_url(url)
+  url.database = 'postgres'
+  return create_engine(url, isolation_level='AUTOCOMMIT')
+
+def create_database(url):
+  if make_url(url).get_backend_name() == 'sqlite':
+    return
+  engine = _maintenance_engine(url)
+  name = make_url(url).database
+  engine.execute('DROP DATABASE IF EXISTS "{}"'.format(name))
+  engine.execute('CREATE DATABASE "{}"'.format(name))
+  engine.dispose()
+
+def drop_database(url):
+  if make_url(url).get_backend_name() == 'sqlite':
+    return
+  engine = _maintenance_engine(url)
+  engine.execute('DROP DATABASE IF EXISTS "{}"'.format(make_url(url).database))
+  engine.dispose()
+
+def _copy_blocks(path):
+  table, columns, rows = None, None, []
+  with open(path) as dump:
+    for line in dump:
+      line = line.rstrip('\n')
+      if table is None:
+        if line.startswith('COPY '):
+          name, rest = line[len('COPY '):].split(' ', 1)
+          table = name.split('.')[-1]
+          columns = [c.strip() for c in rest[rest.index('(') + 1:rest.index(')')].split(',')]
+      elif line == '\\.':
+        yield table, columns, rows
+        table, columns, rows = None, None, []
+      else:
+        rows.append([None if value == '\\N' else value for value in line.split('\t')])
+
+'''
+load_fixtures(path=FIXTURES)
+    inserts the rows of the COPY blocks of a pg_dump file, trivia.psql by
+    default, into the current database, whatever its dialect, then brings
+    sequences and question counters up to date
+'''
+def load_fixtures(path=FIXTURES):
+  from counts import repair_counts
+  from models import db
+
+  # categories first, questions point at them
+  blocks = sorted(_copy_blocks(path), key=lambda block: block[0] != 'categories')
+  for table, columns, rows in blocks:
+    table = db.metadata.tables[table]
+    db.session.execute(table.insert(), [
+      {c: table.c[c].type.python_type(v) if v is not None else None for c, v in zip(columns, row)}
+      for row in rows
+    ])
+    if db.engine.dialect.name == 'postgresql':
+      db.session.execute("SELECT setval(pg_get_serial_sequence('{0}', 'id'), max(id)) FROM {0}".format(table.name))
+  db.session.commit()
+  repair_counts()
+
+'''
+EphemeralPostgres()
+    a Postgres cluster in a temporary directory, reachable only through a
+    unix socket in that directory, removed again by stop()
+'''
+class EphemeralPostgres(object):
+  def __init__(self):
+    self.directory = tempfile.mkdtemp(prefix='trivia-test-')
+    self.data = os.path.join(self.directory, 'data')
+
+  @property
+  def url(self):
+    return 'postgresql://postgres@/trivia_test?host={}'.format(self.directory)
+
+  def start(self):
+    subprocess.check_call(['initdb', '-D', self.data, '-U', 'postgres', '--auth=trust'],
+                          stdout=subprocess.DEVNULL)
+    subprocess.check_call(['pg_ctl', '-D', self.data, '-w', '-l', os.path.join(self.directory, 'log'),
+                           '-o', "-k {} -c listen_addresses='' -c fsync=off".format(self.directory),
+                           'start'], stdout=subprocess.DEVNULL)
+    return self
+
+  def stop(self):
+    subprocess.call(['pg_ctl', '-D', self.data, '-m', 'immediate', 'stop'], stdout=subprocess.DEVNULL)
+    shutil.rmtree(self.directory, ignore_errors=True)
+
+#----------------------------------------------------------------------------#
+# Test cases.
+#----------------------------------------------------------------------------#
+
+_app = None
+
+'''
+worker_app()
+    the app of this worker process, created on first use against the
+    worker's database: TRIVIA_TEST_DATABASE_URL and TRIVIA_TEST_WORKER,
+    which main() sets for every worker. The app does not create tables,
+    so the database gets them here, then the fixtures.
+'''
+def worker_app():
+  global _app
+  if _app is None:
+    from flaskr import create_app
+    from models import db
+    url = worker_database_url(DATABASE_URL, os.environ.get('TRIVIA_TEST_WORKER', '0'))
+    create_database(url)
+    _app = create_app({'SQLALCHEMY_DATABASE_URI': url, 'TESTING': True})
+    with _app.app_context():
+      db.create_all()
+      load_fixtures()
+  return _app
+
+class _TestSession(scoped_session):
+  # Flask-SQLAlchemy removes the session after every request; a test's
+  # session lives until tearDown, which calls end().
+  def remove(self):
+    pass
+
+  def end(self):
+    super(_TestSession, self).remove()
+
+'''
+DatabaseTestCase
+    runs each test in a transaction on one connection that tearDown rolls
+    back. The session is bound to that connection and works in a
+    SAVEPOINT, started again after every commit or rollback, so code under
+    test commits and rolls back as usual without ending the transaction.
+    self.app is shared by the tests of a worker; its caches are emptied
+    before each test.
+'''
+class DatabaseTestCase(unittest.TestCase):
+  @classmethod
+  def setUpClass(cls):
+    cls.app = worker_app()
+
+  def setUp(self):
+    from models import db
+    self.db = db
+    self._context = self.app.app_context()
+    self._context.push()
+    self._connection = db.engine.connect()
+    self._transaction = self._connection.begin()
+
+    self._session = db.session
+    session = _TestSession(db.create_session(options={'bind': self._connection, 'binds': {}}))
+    db.session = session
+    session.begin_nested()
+
+    def restart_savepoint(s, transaction):
+      if transaction.nested and not transaction._parent.nested:
+        s.expire_all()
+        s.begin_nested()
+    self._restart_savepoint = restart_savepoint
+    event.listen(session(), 'after_transaction_end', restart_savepoint)
+
+    for cache in self.app.extensions['caches']:
+      cache.invalidate()
+
+  def tearDown(self):
+    event.remove(self.db.session(), 'after_transaction_end', self._restart_savepoint)
+    self.db.session.rollback()
+    self.db.session.end()
+    self.db.session = self._session
+    self._transaction.rollback()
+    self._connection.close()
+    self._context.pop()
+
+#----------------------------------------------------------------------------#
+# Runner.
+#----------------------------------------------------------------------------#
+
+def _test_ids(suite):
+  for test in suite:
+    if isinstance(test, unittest.TestSuite):
+      for test_id in _test_ids(test):
+        yield test_id
+    else:
+      yield test.id()
+
+def _run_worker(worker, database_url, test_ids, verbosity):
+  global DATABASE_URL, _app
+  os.environ['TRIVIA_TEST_WORKER'] = str(worker)
+  DATABASE_URL = database_url
+  _app = None
+  stream = io.StringIO()
+  try:
+    suite = unittest.defaultTestLoader.loadTestsFromNames(test_ids)
+    result = unittest.TextTestRunner(stream=stream, verbosity=verbosity).run(suite)
+  finally:
+    if _app is not None:
+      _app.extensions['sqlalchemy'].db.get_engine(_app).dispose()
+      drop_database(worker_database_url(database_url, worker))
+  return stream.getvalue(), result.testsRun, result.wasSuccessful()
+
+'''
+main(module='__main__', argv=None)
+    runs the tests of module, see the top of this file for the options
+'''
+def main(module='__main__', argv=None):
+  parser = argparse.ArgumentParser()
+  parser.add_argument('-j', '--workers', type=int, default=1, help='worker processes')
+  parser.add_argument('-v', '--verbose', action='store_const', const=2, default=1, dest='verbosity')
+  parser.add_argument('--database', default=DATABASE_URL,
+                      help='Postgres URL, "sqlite" or "ephemeral"')
+  parser.add_argument('tests', nargs='*', help='e.g. TriviaTestCase.test_get_categories')
+  args = parser.parse_args(argv)
+
+  # workers import the tests by module name, not as another __main__
+  name = module
+  if module == '__main__':
+    name = os.path.splitext(os.path.basename(sys.modules['__main__'].__file__))[0]
+  loader = unittest.defaultTestLoader
+  if args.tests:
+    suite = loader.loadTestsFromNames(['{}.{}'.format(name, test) for test in args.tests])
+  else:
+    suite = loader.loadTestsFromName(name)
+  test_ids = list(_test_ids(suite))
+
+  cluster = None
+  database_url = args.database
+  if database_url == 'sqlite':
+    database_url = 'sqlite://'
+  elif database_url == 'ephemeral':
+    cluster = EphemeralPostgres().start()
+    database_url = cluster.url
+
+  workers = max(1, min(args.workers, len(test_ids)))
+  chunks = [(worker, database_url, test_ids[worker::workers], args.verbosity) for worker in range(workers)]
+  try:
+    if workers == 1:
+      results = [_run_worker(*chunks[0])]
+    else:
+      with multiprocessing.get_context('spawn').Pool(workers) as pool:
+        results = pool.starmap(_run_worker, chunks)
+  finally:
+    if cluster is not None:
+      cluster.stop()
+
+  for output, _, _ in results:
+    sys.stderr.write(output)
+  ran = sum(tests for _, tests, _ in results)
+  ok = all(success for _, _, success in results)
+  sys.stderr.write('\n{} workers ran {} tests: {}\n'.format(workers, ran, 'OK' if ok else 'FAILED'))
+  sys.exit(0 if ok else 1)
@@ -1,5 +1,5 @@
 import os
-from sqlalchemy import Column, String, Integer, create_engine
+from sqlalchemy import Column, String, Integer, Float, Text, ForeignKey, Index, create_engine, event, exc, inspect, text
 from flask_sqlalchemy import SQLAlchemy
 import json
 
@@ -10,18 +10,41 @@ db = SQLAlchemy()
 
 '''
 setup_db(app)
-    binds a flask application and a SQLAlchemy service
+    binds a flask application and a SQLAlchemy service. Nothing is
+    connected or created here, the schema is provisioned once by
+    `flask migrate` (see schema.py), not by every worker that starts.
 '''
 def setup_db(app, database_path=database_path):
     app.config["SQLALCHEMY_DATABASE_URI"] = database_path
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     db.app = app
     db.init_app(app)
-    db.create_all()
+    # creating the engine does not connect
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'connect', _remember_pid)
+    event.listen(engine, 'checkout', _check_pid)
+
+# A preforking server (gunicorn --preload) forks workers from a process
+# that may already hold pooled connections. A worker never uses one of
+# those: it drops them without closing the parent's socket and connects
+# anew. setup_db() listens on the pool of the app's engine only.
+def _remember_pid(dbapi_connection, connection_record):
+    connection_record.info['pid'] = os.getpid()
+
+def _check_pid(dbapi_connection, connection_record, connection_proxy):
+    pid = os.getpid()
+    if connection_record.info['pid'] != pid:
+        connection_record.connection = connection_proxy.connection = None
+        raise exc.DisconnectionError(
+            'connection was opened by process {}, not {}'.format(connection_record.info['pid'], pid))
 
 '''
 Question
 
+    category is the id of a Category. (category, id) is indexed so that a
+    page of one category is a range scan in id order, see pagination.py;
+    schema.py upgrades databases made when it was a string.
 '''
 class Question(db.Model):  
   __tablename__ = 'questions'
@@ -29,9 +52,13 @@ class Question(db.Model):
   id = Column(Integer, primary_key=True)
   question = Column(String)
   answer = Column(String)
-  category = Column(String)
+  category = Column(Integer, ForeignKey('categories.id', onupdate='CASCADE', ondelete='SET NULL'))
   difficulty = Column(Integer)
 
+  __table_args__ = (
+    Index('ix_questions_category_id', 'category', 'id'),
+  )
+
   def __init__(self, question, answer, category, difficulty):
     self.question = question
     self.answer = answer
@@ -75,4 +102,85 @@ class Category(db.Model):
     return {
       'id': self.id,
       'type': self.type
-    }
\ No newline at end of file
+    }
+
+'''
+QuizSession
+
+    one game of POST /quizzes/sessions: the category played (None for all
+    of them), the ids dealt so far as a JSON list and when it expires. It
+    lives in the database, so any worker can deal the next question.
+'''
+class QuizSession(db.Model):
+  __tablename__ = 'quiz_sessions'
+
+  token = Column(String, primary_key=True)
+  category = Column(Integer)
+  dealt = Column(Text, nullable=False, default='[]')
+  expires = Column(Float, nullable=False, index=True)
+
+'''
+QuestionCount
+
+    how many questions each category has, plus the row ALL_QUESTIONS for
+    all of them, kept up to date in the same transaction as every insert,
+    delete or category change of a question, so listings read a total
+    with one primary key lookup instead of COUNT(*). counts.py checks and
+    repairs them.
+'''
+ALL_QUESTIONS = 'all'
+
+class QuestionCount(db.Model):
+  __tablename__ = 'question_counts'
+
+  category = Column(String, primary_key=True)
+  count = Column(Integer, nullable=False, default=0)
+
+'''
+add_question_counts(connection, deltas)
+    adds {category: delta} to the counters on connection, inside the
+    caller's transaction. Each key is one upsert, so a counter row that
+    two writers create at the same time is added to rather than inserted
+    twice. Keys are written in sorted order, so concurrent writers take
+    the row locks in the same order.
+'''
+def add_question_counts(connection, deltas):
+  upsert = text(
+    'INSERT INTO question_counts (category, count) VALUES (:category, :delta) '
+    'ON CONFLICT (category) DO UPDATE SET count = question_counts.count + excluded.count')
+  for category in sorted(deltas):
+    if deltas[category]:
+      connection.execute(upsert, category=category, delta=deltas[category])
+
+# a question without a category, set NULL when its category is deleted or
+# imported without one, only counts towards ALL_QUESTIONS
+def _category_deltas(category, delta):
+  return {} if category is None else {str(category): delta}
+
+@event.listens_for(Question, 'after_insert')
+def _question_inserted(mapper, connection, target):
+  add_question_counts(connection, dict(_category_deltas(target.category, 1), **{ALL_QUESTIONS: 1}))
+
+@event.listens_for(Question, 'after_delete')
+def _question_deleted(mapper, connection, target):
+  add_question_counts(connection, dict(_category_deltas(target.category, -1), **{ALL_QUESTIONS: -1}))
+
+@event.listens_for(Question, 'after_update')
+def _question_updated(mapper, connection, target):
+  history = inspect(target).attrs.category.history
+  if history.deleted and history.added and str(history.deleted[0]) != str(history.added[0]):
+    deltas = _category_deltas(history.deleted[0], -1)
+    deltas.update(_category_deltas(history.added[0], 1))
+    add_question_counts(connection, deltas)
+
+# a counters table created next to an existing questions table starts from
+# what is already there
+@event.listens_for(db.metadata, 'after_create')
+def _seed_question_counts(target, connection, tables=(), **kw):
+  if QuestionCount.__table__ in tables:
+    connection.execute(
+      'INSERT INTO question_counts (category, count) '
+      'SELECT CAST(category AS VARCHAR), COUNT(*) FROM questions '
+      'WHERE category IS NOT NULL GROUP BY category')
+    connection.execute(
+      "INSERT INTO question_counts (category, count) SELECT '{}', COUNT(*) FROM questions".format(ALL_QUESTIONS))
@@ -0,0 +1,143 @@
+import base64
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from models import Question
+
+QUESTIONS_PER_PAGE = 10
+# how long a cached total or page boundary may be trusted when the write
+# that changed it happened in another worker process
+PAGE_INDEX_TTL = 60
+# distinct listings (all, per category, per search term) kept at once
+PAGE_INDEX_SIZE = 256
+
+'''
+encode_cursor(question_id, rank=None) / decode_cursor(cursor)
+    a cursor is the id of the last question on a page, and for ranked
+    listings such as search results its rank, packed into an opaque url
+    safe token. decode_cursor returns the id, decode_ranked_cursor
+    (rank, id); both raise ValueError on anything they did not produce.
+'''
+def encode_cursor(question_id, rank=None):
+  key = {'after': question_id}
+  if rank is not None:
+    key['rank'] = rank
+  return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+def _decode(cursor):
+  try:
+    key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return int(key['after']), key.get('rank')
+  except (TypeError, ValueError, KeyError, AttributeError):
+    raise ValueError('invalid cursor: %r' % cursor)
+
+def decode_cursor(cursor):
+  return _decode(cursor)[0]
+
+def decode_ranked_cursor(cursor):
+  question_id, rank = _decode(cursor)
+  if not isinstance(rank, (int, float)):
+    raise ValueError('invalid cursor: %r' % cursor)
+  return float(rank), question_id
+
+'''
+PageIndex
+    what is known about one listing: its total and, for page numbers seen
+    so far, the id the page starts after.
+'''
+class PageIndex(object):
+  def __init__(self):
+    self.expires = time.time() + PAGE_INDEX_TTL
+    self.total = None
+    self.boundaries = {1: 0}
+
+'''
+Paginator(per_page=QUESTIONS_PER_PAGE)
+    serves pages of questions in id order with keyset queries
+    (WHERE id > :after ORDER BY id LIMIT n) instead of OFFSET, so page 500
+    costs the same as page 1. Old clients keep asking for ?page=N: the id
+    each page starts after is remembered per listing, and a page number not
+    seen yet is located with one index-only OFFSET walk from the nearest
+    known page, not from the start. Totals are counted once per listing and
+    reused until a write calls invalidate() or PAGE_INDEX_TTL runs out.
+'''
+class Paginator(object):
+  def __init__(self, per_page=QUESTIONS_PER_PAGE):
+    self.per_page = per_page
+    self._indexes = OrderedDict()
+    self._lock = threading.Lock()
+
+  def _index(self, key):
+    with self._lock:
+      index = self._indexes.get(key)
+      if index is None or index.expires < time.time():
+        index = self._indexes[key] = PageIndex()
+      self._indexes.move_to_end(key)
+      while len(self._indexes) > PAGE_INDEX_SIZE:
+        self._indexes.popitem(last=False)
+      return index
+
+  def invalidate(self):
+    with self._lock:
+      self._indexes.clear()
+
+  '''
+  page(query, key, page=1, cursor=None, total=None)
+      returns (questions, total, next_cursor) for one page of query, a
+      Question query carrying the listing's filters. key names the listing
+      for the caches, e.g. 'category:3'. A cursor wins over a page number.
+      next_cursor is None on the last page. A listing with a maintained
+      counter passes its total, others are counted once per listing.
+  '''
+  def page(self, query, key, page=1, cursor=None, total=None):
+    index = self._index(key)
+
+    if cursor is not None:
+      after = decode_cursor(cursor)
+      page = None
+    else:
+      if page < 1:
+        raise ValueError('invalid page: %r' % page)
+      after = self._boundary(query, index, page)
+
+    if total is None:
+      total = index.total
+    if total is None:
+      total = index.total = query.order_by(None).count()
+
+    if after is None:
+      return [], total, None
+
+    # one extra row tells us whether there is a next page
+    questions = query.filter(Question.id > after) \
+      .order_by(Question.id) \
+      .limit(self.per_page + 1) \
+      .all()
+
+    next_cursor = None
+    if len(questions) > self.per_page:
+      questions = questions[:self.per_page]
+      next_cursor = encode_cursor(questions[-1].id)
+      if page is not None:
+        index.boundaries[page + 1] = questions[-1].id
+
+    return questions, total, next_cursor
+
+  def _boundary(self, query, index, page):
+    if page in index.boundaries:
+      return index.boundaries[page]
+
+    known = max(p for p in index.boundaries if p < page)
+    skip = (page - known) * self.per_page - 1
+    row = query.with_entities(Question.id) \
+      .filter(Question.id > index.boundaries[known]) \
+      .order_by(Question.id) \
+      .offset(skip) \
+      .limit(1) \
+      .first()
+    if row is None:
+      return None
+    index.boundaries[page] = row.id
+    return row.id
@@ -0,0 +1,143 @@
+import json
+import random
+import secrets
+import threading
+import time
+from array import array
+
+from models import db, Question, QuizSession
+
+# how long an id pool may be trusted when the write that changed it
+# happened in another worker process
+POOL_TTL = 60
+# random draws tried before falling back to scanning the pool
+MAX_DRAWS = 8
+# an idle quiz session is dropped after this many seconds
+QUIZ_SESSION_TTL = 3600
+
+'''
+QuestionPool(ids)
+    the ids of every question in one category (or all of them), held as a
+    compact array so a random one can be picked by position.
+'''
+class QuestionPool(object):
+  def __init__(self, ids):
+    self.ids = array('l', ids)
+    self.expires = time.time() + POOL_TTL
+
+  '''
+  draw(exclude)
+      a random id not in the set exclude, or None when every id is in it.
+      While most of the pool is still unseen a few random draws find one,
+      so a turn costs O(1) however large the pool or exclude get; only a
+      game that has used up nearly the whole pool pays for one scan.
+  '''
+  def draw(self, exclude):
+    ids = self.ids
+    if not ids:
+      return None
+    for _ in range(MAX_DRAWS):
+      question_id = ids[random.randrange(len(ids))]
+      if question_id not in exclude:
+        return question_id
+    remaining = [question_id for question_id in ids if question_id not in exclude]
+    return random.choice(remaining) if remaining else None
+
+'''
+QuizEngine()
+    deals quiz questions. The question ids of a category are read once, in
+    one index-only query, and kept in memory; every turn then picks an id
+    from the pool and loads that one question by primary key, instead of
+    loading or sorting every candidate row. Writes call invalidate().
+'''
+class QuizEngine(object):
+  def __init__(self):
+    self._pools = {}
+    self._lock = threading.Lock()
+
+  def invalidate(self):
+    with self._lock:
+      self._pools.clear()
+
+  def pool(self, category_id=None):
+    pool = self._pools.get(category_id)
+    if pool is None or pool.expires < time.time():
+      query = Question.query.with_entities(Question.id)
+      if category_id is not None:
+        query = query.filter(Question.category == category_id)
+      pool = QuestionPool(row.id for row in query.order_by(Question.id))
+      with self._lock:
+        self._pools[category_id] = pool
+    return pool
+
+  '''
+  next_question(category_id=None, previous_questions=())
+      a random Question from the category (all categories when None) that
+      is not in previous_questions, or None when there is none left.
+  '''
+  def next_question(self, category_id=None, previous_questions=()):
+    exclude = set(previous_questions)
+    pool = self.pool(category_id)
+    while True:
+      question_id = pool.draw(exclude)
+      if question_id is None:
+        return None
+      question = Question.query.get(question_id)
+      if question is not None:
+        return question
+      # deleted by another worker since the pool was read
+      exclude.add(question_id)
+
+  '''
+  start_session(category_id=None)
+      starts a game over the category and returns its token. Sessions
+      live in the quiz_sessions table, so the next turn may be served by
+      any worker; expired ones are deleted here.
+  '''
+  def start_session(self, category_id=None):
+    token = secrets.token_urlsafe(16)
+    now = time.time()
+    QuizSession.query.filter(QuizSession.expires < now).delete(synchronize_session=False)
+    db.session.add(QuizSession(token=token, category=category_id, dealt='[]',
+                               expires=now + QUIZ_SESSION_TTL))
+    db.session.commit()
+    return token
+
+  '''
+  session(token)
+      the live QuizSession behind token, or None when it is unknown or has
+      expired. The row is locked until deal() commits, so two turns of one
+      session cannot deal the same question.
+  '''
+  def session(self, token):
+    session = QuizSession.query.filter(QuizSession.token == token).with_for_update().first()
+    if session is not None and session.expires < time.time():
+      db.session.delete(session)
+      db.session.commit()
+      return None
+    return session
+
+  def end_session(self, token):
+    deleted = QuizSession.query.filter(QuizSession.token == token).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted > 0
+
+  '''
+  deal(session)
+      (question, remaining): the next Question of a session, a random one
+      from the category's pool that it has not dealt, or None when it has
+      run out, and how many are left after it. Dealing keeps the session
+      alive for another TTL.
+  '''
+  def deal(self, session):
+    dealt = json.loads(session.dealt)
+    question = self.next_question(session.category, dealt)
+    if question is None:
+      remaining = 0
+    else:
+      dealt.append(question.id)
+      session.dealt = json.dumps(dealt)
+      remaining = max(len(self.pool(session.category).ids) - len(dealt), 0)
+    session.expires = time.time() + QUIZ_SESSION_TTL
+    db.session.commit()
+    return question, remaining
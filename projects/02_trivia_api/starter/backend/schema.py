@@ -0,0 +1,151 @@
+'''
+Provisions and upgrades the database schema. The app never creates
+tables itself, workers start without touching the database; run migrate
+once per deploy, before the workers, and again whenever it is unsure:
+every step is skipped when it is already done.
+
+    $ FLASK_APP=flaskr flask migrate
+
+upgrade_categories() brings the questions table of an existing Postgres
+database up to the current models: category an integer foreign key to
+categories, indexed together with id. Databases created by create_all()
+already have both, trivia.psql has the key but not the index, and
+databases created before the change have a string column that may hold
+category names instead of ids.
+
+    $ FLASK_APP=flaskr flask upgrade-categories --dry-run
+    $ FLASK_APP=flaskr flask upgrade-categories
+
+The changes run in one transaction, nothing changes when a step fails.
+'''
+
+from sqlalchemy import Integer, inspect
+
+from counts import repair_counts
+from models import db
+from search import OBSOLETE_SEARCH_INDEXES, SEARCH_INDEX_NAMES, create_search_indexes
+
+CATEGORY_INDEX = 'ix_questions_category_id'
+CATEGORY_FOREIGN_KEY = 'questions_category_fkey'
+
+class SchemaError(Exception):
+  pass
+
+'''
+backfill_categories()
+    rewrites string categories that name a category ("Science", any case)
+    to its id and returns how many rows it changed. Only needed while the
+    column is still a string.
+'''
+def backfill_categories():
+  result = db.session.execute(
+    'UPDATE questions SET category = CAST(categories.id AS VARCHAR) '
+    'FROM categories '
+    'WHERE lower(trim(questions.category)) = lower(categories.type)')
+  return result.rowcount
+
+'''
+unknown_categories(is_string)
+    [(question id, category)] of the questions whose category is not the
+    id of a category; the foreign key cannot be added while there are any.
+'''
+def unknown_categories(is_string):
+  category = "trim(q.category)" if is_string else "CAST(q.category AS VARCHAR)"
+  return [tuple(row) for row in db.session.execute(
+    'SELECT q.id, q.category FROM questions q '
+    'WHERE q.category IS NOT NULL AND NOT EXISTS ('
+    '  SELECT 1 FROM categories c WHERE CAST(c.id AS VARCHAR) = {})'
+    ' ORDER BY q.id'.format(category))]
+
+'''
+upgrade_categories(dry_run=False)
+    backfills, converts the column, adds the foreign key and the index,
+    skipping whatever is already in place, and returns the list of steps
+    taken. Raises SchemaError, leaving the database as it was, when a
+    question has a category that is not a category id.
+'''
+def upgrade_categories(dry_run=False):
+  if db.engine.dialect.name != 'postgresql':
+    raise SchemaError('only Postgres databases can be upgraded, recreate others with create_all()')
+
+  inspector = inspect(db.engine)
+  column = next(c for c in inspector.get_columns('questions') if c['name'] == 'category')
+  is_string = not isinstance(column['type'], Integer)
+  has_key = any(key['referred_table'] == 'categories' for key in inspector.get_foreign_keys('questions'))
+  # pg_indexes rather than the inspector, which warns about the expression
+  # indexes of search.py
+  has_index = db.session.execute(
+    'SELECT 1 FROM pg_indexes WHERE tablename = :table AND indexname = :index',
+    {'table': 'questions', 'index': CATEGORY_INDEX}).first() is not None
+
+  steps = []
+  backfilled = 0
+  try:
+    if is_string:
+      backfilled = backfill_categories()
+      steps.append('backfilled {} category names'.format(backfilled))
+
+    unknown = unknown_categories(is_string)
+    if unknown:
+      raise SchemaError('{} questions have an unknown category, e.g. {}'.format(
+        len(unknown), ', '.join('question {}: {!r}'.format(*row) for row in unknown[:5])))
+
+    if is_string:
+      db.session.execute(
+        'ALTER TABLE questions ALTER COLUMN category TYPE INTEGER USING CAST(trim(category) AS INTEGER)')
+      steps.append('converted questions.category to integer')
+    if not has_key:
+      db.session.execute(
+        'ALTER TABLE questions ADD CONSTRAINT {} '
+        'FOREIGN KEY (category) REFERENCES categories (id) '
+        'ON UPDATE CASCADE ON DELETE SET NULL'.format(CATEGORY_FOREIGN_KEY))
+      steps.append('added foreign key {}'.format(CATEGORY_FOREIGN_KEY))
+    if not has_index:
+      db.session.execute('CREATE INDEX {} ON questions (category, id)'.format(CATEGORY_INDEX))
+      steps.append('added index {}'.format(CATEGORY_INDEX))
+
+    if dry_run:
+      db.session.rollback()
+    else:
+      db.session.commit()
+  except Exception:
+    db.session.rollback()
+    raise
+
+  if not dry_run and steps:
+    db.session.execute('ANALYZE questions')
+    db.session.commit()
+    # the question counters were keyed by the names that were backfilled
+    if backfilled:
+      repair_counts()
+  return steps
+
+'''
+migrate()
+    creates the tables that are missing, then on Postgres upgrades the
+    categories, adds the search indexes and drops the ones they replaced,
+    and returns the list of steps
+    taken, empty when the schema was already current. Raises SchemaError
+    like upgrade_categories().
+'''
+def migrate():
+  existing = set(inspect(db.engine).get_table_names())
+  missing = [table.name for table in db.metadata.sorted_tables if table.name not in existing]
+  db.create_all()
+  steps = ['created table {}'.format(name) for name in missing]
+  if db.engine.dialect.name != 'postgresql':
+    return steps
+
+  steps += upgrade_categories()
+  present = {row.indexname for row in db.session.execute(
+    'SELECT indexname FROM pg_indexes WHERE tablename = :table', {'table': 'questions'})}
+  absent = [name for name in SEARCH_INDEX_NAMES if name not in present]
+  if absent:
+    create_search_indexes()
+    steps += ['added index {}'.format(name) for name in absent]
+  for name in OBSOLETE_SEARCH_INDEXES:
+    if name in present:
+      db.session.execute('DROP INDEX {}'.format(name))
+      db.session.commit()
+      steps.append('dropped index {}'.format(name))
+  return steps
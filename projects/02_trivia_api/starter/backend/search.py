@@ -0,0 +1,236 @@
+import bisect
+import re
+import threading
+import time
+
+from sqlalchemy import DDL, and_, cast, event, func, or_
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION
+from sqlalchemy.orm import aliased
+
+from models import db, Question
+from pagination import QUESTIONS_PER_PAGE, decode_ranked_cursor, encode_cursor
+
+# how long the in-memory index may be trusted when the write that changed
+# it happened in another worker process
+SEARCH_INDEX_TTL = 60
+# weight of a term found only in the answer, one in the question counts 1
+ANSWER_WEIGHT = 0.4
+
+'''
+search_words(text)
+    the lower cased words of text, as both backends index and query them
+'''
+def search_words(text):
+  return re.findall(r'\w+', (text or '').lower())
+
+#----------------------------------------------------------------------------#
+# Postgres: GIN indexes over to_tsvector('simple', ...) of the question, and
+# of question and answer as one document, so that with include_answers each
+# word may be found in either, as the in-memory index below does.
+#----------------------------------------------------------------------------#
+
+SEARCH_INDEXES = [
+  'CREATE INDEX IF NOT EXISTS ix_questions_question_fts ON questions '
+  "USING gin (to_tsvector('simple', coalesce(question, '')))",
+  'CREATE INDEX IF NOT EXISTS ix_questions_document_fts ON questions '
+  "USING gin ((setweight(to_tsvector('simple', coalesce(question, '')), 'A') || "
+  "setweight(to_tsvector('simple', coalesce(answer, '')), 'B')))",
+]
+# replaced by ix_questions_document_fts, dropped by `flask migrate`
+OBSOLETE_SEARCH_INDEXES = ['ix_questions_answer_fts']
+SEARCH_INDEX_NAMES = [statement.split()[5] for statement in SEARCH_INDEXES]
+
+for statement in SEARCH_INDEXES:
+  event.listen(Question.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+
+'''
+create_search_indexes()
+    adds the full text indexes to a database whose questions table existed
+    before them, e.g. one restored from trivia.psql
+'''
+def create_search_indexes():
+  for statement in SEARCH_INDEXES:
+    db.session.execute(statement)
+  db.session.commit()
+
+def _document(column):
+  # must match the indexed expressions above for the planner to use them
+  return func.to_tsvector('simple', func.coalesce(column, ''))
+
+def _question_and_answer():
+  return func.setweight(_document(Question.question), 'A').op('||')(
+    func.setweight(_document(Question.answer), 'B'))
+
+class PostgresSearch(object):
+  def invalidate(self):
+    pass
+
+  def search(self, words, include_answers, offset, after, limit):
+    tsquery = func.to_tsquery('simple', ' & '.join(w + ':*' for w in words))
+    if include_answers:
+      document = _question_and_answer()
+    else:
+      document = _document(Question.question)
+    match = document.op('@@')(tsquery)
+
+    # ranks are compared again in the next page's WHERE, as float4 they
+    # would not survive the round trip through the cursor exactly. The total
+    # is counted over every match, before the keyset filter outside.
+    ranked = db.session.query(
+        Question,
+        cast(func.ts_rank(document, tsquery), DOUBLE_PRECISION).label('rank'),
+        func.count().over().label('total')
+      ).filter(match) \
+      .subquery()
+    found = aliased(Question, ranked)
+
+    query = db.session.query(found, ranked.c.rank, ranked.c.total)
+    if after is not None:
+      rank, question_id = after
+      query = query.filter(or_(ranked.c.rank < rank,
+                               and_(ranked.c.rank == rank, ranked.c.id > question_id)))
+
+    rows = query.order_by(ranked.c.rank.desc(), ranked.c.id) \
+      .offset(offset) \
+      .limit(limit) \
+      .all()
+    total = rows[0].total if rows else 0
+    return [(row.rank, row[0]) for row in rows], total
+
+#----------------------------------------------------------------------------#
+# Anything else (SQLite): an inverted index held in memory.
+#----------------------------------------------------------------------------#
+
+'''
+InvertedIndex(rows)
+    word -> ids postings for the questions and answers of rows, (id,
+    question, answer) tuples, with a sorted vocabulary so that a prefix is
+    looked up with two bisections instead of a scan.
+'''
+class InvertedIndex(object):
+  def __init__(self, rows):
+    self.expires = time.time() + SEARCH_INDEX_TTL
+    self.questions = {}
+    self.answers = {}
+    for question_id, question, answer in rows:
+      for word in set(search_words(question)):
+        self.questions.setdefault(word, set()).add(question_id)
+      for word in set(search_words(answer)):
+        self.answers.setdefault(word, set()).add(question_id)
+    self.question_words = sorted(self.questions)
+    self.answer_words = sorted(self.answers)
+
+  def _prefixed(self, postings, vocabulary, prefix):
+    ids = set()
+    i = bisect.bisect_left(vocabulary, prefix)
+    while i < len(vocabulary) and vocabulary[i].startswith(prefix):
+      ids |= postings[vocabulary[i]]
+      i += 1
+    return ids
+
+  '''
+  ranked(words, include_answers)
+      [(rank, id)] of the questions matching every word as a prefix, best
+      first. A word found in the question scores 1, one found only in the
+      answer ANSWER_WEIGHT.
+  '''
+  def ranked(self, words, include_answers):
+    scores = None
+    for word in words:
+      in_question = self._prefixed(self.questions, self.question_words, word)
+      in_answer = self._prefixed(self.answers, self.answer_words, word) if include_answers else set()
+      word_scores = dict.fromkeys(in_answer, ANSWER_WEIGHT)
+      word_scores.update(dict.fromkeys(in_question, 1.0))
+      if scores is None:
+        scores = word_scores
+      else:
+        scores = {i: score + word_scores[i] for i, score in scores.items() if i in word_scores}
+      if not scores:
+        return []
+    return sorted(((score, i) for i, score in scores.items()), key=lambda r: (-r[0], r[1]))
+
+class InMemorySearch(object):
+  def __init__(self):
+    self._index = None
+    self._lock = threading.Lock()
+
+  def invalidate(self):
+    self._index = None
+
+  def index(self):
+    index = self._index
+    if index is None or index.expires < time.time():
+      with self._lock:
+        index = self._index
+        if index is None or index.expires < time.time():
+          rows = db.session.query(Question.id, Question.question, Question.answer).yield_per(10000)
+          index = self._index = InvertedIndex(rows)
+    return index
+
+  def search(self, words, include_answers, offset, after, limit):
+    ranked = self.index().ranked(words, include_answers)
+    total = len(ranked)
+    if after is not None:
+      rank, question_id = after
+      # ranked is ordered by (-rank, id), find the first entry past after
+      start = bisect.bisect_right([(-r, i) for r, i in ranked], (-rank, question_id))
+      ranked = ranked[start:]
+    ranked = ranked[offset:offset + limit]
+
+    questions = {q.id: q for q in Question.query.filter(Question.id.in_([i for _, i in ranked]))} if ranked else {}
+    return [(rank, questions[i]) for rank, i in ranked if i in questions], total
+
+'''
+QuestionSearch()
+    ranked search over question text, optionally answers too, matching
+    every word of the term as a word prefix ("cag bir" finds "Caged
+    Bird"). Runs on Postgres full text GIN indexes, or on an inverted index
+    kept in memory for other databases such as SQLite. Writes call
+    invalidate().
+'''
+class QuestionSearch(object):
+  def __init__(self, per_page=QUESTIONS_PER_PAGE):
+    self.per_page = per_page
+    self._backend = None
+
+  @property
+  def backend(self):
+    if self._backend is None:
+      if db.engine.dialect.name == 'postgresql':
+        self._backend = PostgresSearch()
+      else:
+        self._backend = InMemorySearch()
+    return self._backend
+
+  def invalidate(self):
+    self.backend.invalidate()
+
+  '''
+  page(search_term, include_answers=False, page=1, cursor=None)
+      returns (questions, total, next_cursor) like Paginator.page, best
+      rank first. A cursor carries the rank and id of the last result, so
+      following it is a keyset filter on (rank, id) rather than an OFFSET.
+      Returns None for a term without any words.
+  '''
+  def page(self, search_term, include_answers=False, page=1, cursor=None):
+    words = search_words(search_term)
+    if not words:
+      return None
+
+    if cursor is not None:
+      after, offset = decode_ranked_cursor(cursor), 0
+    else:
+      if page < 1:
+        raise ValueError('invalid page: %r' % page)
+      after, offset = None, (page - 1) * self.per_page
+
+    # one extra row tells us whether there is a next page
+    results, total = self.backend.search(words, include_answers, offset, after, self.per_page + 1)
+
+    next_cursor = None
+    if len(results) > self.per_page:
+      results = results[:self.per_page]
+      rank, question = results[-1]
+      next_cursor = encode_cursor(question.id, rank)
+
+    return [question for _, question in results], total, next_cursor
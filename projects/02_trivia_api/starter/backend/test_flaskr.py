@@ -1,40 +1,339 @@
 import os
 import unittest
 import json
-from flask_sqlalchemy import SQLAlchemy
 
-from flaskr import create_app
-from models import setup_db, Question, Category
+import harness
+from models import Question, Category, QuestionCount
+from counts import check_counts
+from quiz import QuizEngine
+from search import ANSWER_WEIGHT, InvertedIndex
 
 
-class TriviaTestCase(unittest.TestCase):
+class TriviaTestCase(harness.DatabaseTestCase):
     """This class represents the trivia test case"""
 
     def setUp(self):
         """Define test variables and initialize app."""
-        self.app = create_app()
+        # a database per worker process, each test in a rolled back
+        # transaction, see harness.py
+        super(TriviaTestCase, self).setUp()
         self.client = self.app.test_client
-        self.database_name = "trivia_test"
-        self.database_path = "postgres://{}/{}".format('localhost:5432', self.database_name)
-        setup_db(self.app, self.database_path)
-
-        # binds the app to the current context
-        with self.app.app_context():
-            self.db = SQLAlchemy()
-            self.db.init_app(self.app)
-            # create all tables
-            self.db.create_all()
-    
-    def tearDown(self):
-        """Executed after reach test"""
-        pass
 
     """
     TODO
     Write at least one test for each test for successful operation and for expected errors.
     """
 
+    def test_get_categories(self):
+        res = self.client().get('/categories')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['categories']['1'], 'Science')
+        self.assertTrue(res.headers['ETag'])
+
+    def test_304_sent_for_unchanged_categories(self):
+        etag = self.client().get('/categories').headers['ETag']
+        res = self.client().get('/categories', headers={'If-None-Match': etag})
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.data, b'')
+
+    def test_category_write_changes_the_catalog(self):
+        etag = self.client().get('/categories').headers['ETag']
+        with self.app.app_context():
+            category = Category('Cooking')
+            self.db.session.add(category)
+            self.db.session.commit()
+            res = self.client().get('/categories', headers={'If-None-Match': etag})
+            self.db.session.delete(category)
+            self.db.session.commit()
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('Cooking', json.loads(res.data)['categories'].values())
+
+    def test_get_paginated_questions(self):
+        res = self.client().get('/questions')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertTrue(data['total_questions'])
+        self.assertEqual(len(data['questions']), 10)
+        self.assertTrue(len(data['categories']))
+
+    def test_page_numbers_and_cursors_return_the_same_page(self):
+        first = json.loads(self.client().get('/questions').data)
+        by_cursor = json.loads(self.client().get('/questions?cursor={}'.format(first['next_cursor'])).data)
+        by_page = json.loads(self.client().get('/questions?page=2').data)
+
+        ids = [q['id'] for q in by_page['questions']]
+        self.assertEqual([q['id'] for q in by_cursor['questions']], ids)
+        self.assertTrue(min(ids) > max(q['id'] for q in first['questions']))
+
+    def test_404_sent_requesting_beyond_valid_page(self):
+        res = self.client().get('/questions?page=1000')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 404)
+        self.assertEqual(data['success'], False)
+        self.assertEqual(data['message'], 'resource not found')
+
+    def test_400_sent_for_invalid_cursor(self):
+        res = self.client().get('/questions?cursor=not-a-cursor')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(data['success'], False)
+
+    def test_get_questions_by_category(self):
+        res = self.client().get('/categories/1/questions')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['current_category'], 'Science')
+        self.assertTrue(data['total_questions'])
+        self.assertTrue(all(q['category'] == 1 for q in data['questions']))
+
+    def test_404_sent_for_missing_category(self):
+        res = self.client().get('/categories/1000/questions')
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_search_questions(self):
+        res = self.client().post('/questions', json={'searchTerm': 'title'})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        # words starting with the term: "title" but not "entitled"
+        self.assertEqual(data['total_questions'], 1)
+        self.assertTrue(all('title' in q['question'].lower() for q in data['questions']))
+
+        data = json.loads(self.client().post('/questions', json={'searchTerm': 'caged bi'}).data)
+        self.assertEqual([q['answer'] for q in data['questions']], ['Maya Angelou'])
+
+    def test_search_matches_word_prefixes_and_pages_by_cursor(self):
+        first = json.loads(self.client().post('/questions', json={'searchTerm': 'wh'}).data)
+        ids = [q['id'] for q in first['questions']]
+        self.assertTrue(first['total_questions'] > 10)
+        self.assertEqual(len(ids), 10)
+
+        res = self.client().post('/questions?cursor={}'.format(first['next_cursor']), json={'searchTerm': 'wh'})
+        rest = [q['id'] for q in json.loads(res.data)['questions']]
+        self.assertEqual(len(ids) + len(rest), first['total_questions'])
+        self.assertFalse(set(ids) & set(rest))
+
+    def test_search_answers_only_when_asked(self):
+        questions = json.loads(self.client().post('/questions', json={'searchTerm': 'Escher'}).data)
+        answers = json.loads(self.client().post('/questions', json={'searchTerm': 'Escher', 'include_answers': True}).data)
+
+        self.assertEqual(questions['total_questions'], 0)
+        self.assertTrue(any(q['answer'] == 'Escher' for q in answers['questions']))
+
+    def test_search_matches_words_across_question_and_answer(self):
+        term = {'searchTerm': 'caged angelou'}
+        questions = json.loads(self.client().post('/questions', json=term).data)
+        both = json.loads(self.client().post('/questions', json=dict(term, include_answers=True)).data)
+
+        self.assertEqual(questions['total_questions'], 0)
+        self.assertEqual([q['id'] for q in both['questions']], [5])
+
+    def test_400_sent_for_search_term_that_is_not_a_string(self):
+        for term in (42, ['title'], {'term': 'title'}):
+            res = self.client().post('/questions', json={'searchTerm': term})
+
+            self.assertEqual(res.status_code, 400, term)
+
+    def test_in_memory_search_ranks_question_matches_first(self):
+        index = InvertedIndex([(1, 'Who painted it?', 'Escher'), (2, 'Was Escher Dutch?', 'Yes'), (3, 'Why?', 'No')])
+
+        self.assertEqual(index.ranked(['esch'], True), [(1.0, 2), (ANSWER_WEIGHT, 1)])
+        self.assertEqual(index.ranked(['esch'], False), [(1.0, 2)])
+        self.assertEqual(index.ranked(['esch', 'dut'], True), [(2.0, 2)])
+
+    def test_create_and_delete_question(self):
+        res = self.client().post('/questions', json={
+            'question': 'Which planet is known as the red planet?',
+            'answer': 'Mars',
+            'category': '1',
+            'difficulty': 1
+        })
+        created = json.loads(res.data)['created']
+        total = json.loads(self.client().get('/questions').data)['total_questions']
+
+        res = self.client().delete('/questions/{}'.format(created))
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['deleted'], created)
+        self.assertEqual(json.loads(self.client().get('/questions').data)['total_questions'], total - 1)
+
+    def test_import_and_export_questions(self):
+        lines = [
+            json.dumps({'question': 'Bulk question {}?'.format(i), 'answer': 'Yes', 'category': 1, 'difficulty': 1})
+            for i in range(3)
+        ]
+        total = json.loads(self.client().get('/questions').data)['total_questions']
+
+        res = self.client().post('/questions/import', data='\n'.join(lines) + '\n', content_type='application/x-ndjson')
+        data = json.loads(res.data)
+        exported = [json.loads(line) for line in self.client().get('/questions/export?category=1').data.splitlines()]
+        imported = [q for q in exported if q['question'].startswith('Bulk question')]
+        for q in imported:
+            self.client().delete('/questions/{}'.format(q['id']))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['imported'], 3)
+        self.assertEqual(len(imported), 3)
+        self.assertTrue(all(q['category'] == 1 for q in exported))
+        self.assertEqual(json.loads(self.client().get('/questions').data)['total_questions'], total)
+
+    def test_422_sent_importing_unknown_category(self):
+        line = json.dumps({'question': 'Why?', 'answer': 'No', 'category': 1000, 'difficulty': 1})
+        res = self.client().post('/questions/import', data=line)
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(data['line'], 1)
+        self.assertEqual(data['imported'], 0)
+
+    def test_question_counters_follow_writes(self):
+        def total(category_id):
+            return json.loads(self.client().get('/categories/{}/questions'.format(category_id)).data)['total_questions']
+        science, art = total(1), total(2)
+
+        with self.app.app_context():
+            question = Question('Is this counted?', 'Yes', 1, 1)
+            question.insert()
+            counted = total(1)
+            question.category = 2
+            question.update()
+            moved = total(1), total(2)
+            question.delete()
+            self.assertEqual(check_counts(), [])
+
+        self.assertEqual(counted, science + 1)
+        self.assertEqual(moved, (science, art + 1))
+        self.assertEqual((total(1), total(2)), (science, art))
+
+    def test_uncategorized_question_counts_towards_all_only(self):
+        with self.app.app_context():
+            question = Question('Is this counted?', 'Yes', None, 1)
+            question.insert()
+            question.category = 1
+            question.update()
+            question.category = None
+            question.update()
+            wrong = check_counts()
+            keys = [row.category for row in QuestionCount.query]
+            question.delete()
+            self.assertEqual(check_counts(), [])
+
+        self.assertEqual(wrong, [])
+        self.assertNotIn('None', keys)
+
+    def test_question_counter_created_with_first_question(self):
+        with self.app.app_context():
+            category = Category('Cooking')
+            self.db.session.add(category)
+            self.db.session.commit()
+            for _ in range(2):
+                Question('Is this counted?', 'Yes', category.id, 1).insert()
+            res = self.client().get('/categories/{}/questions'.format(category.id))
+            self.assertEqual(check_counts(), [])
+
+        self.assertEqual(json.loads(res.data)['total_questions'], 2)
+
+    def test_422_sent_creating_question_without_answer(self):
+        res = self.client().post('/questions', json={'question': 'Why?', 'category': '1', 'difficulty': 1})
+
+        self.assertEqual(res.status_code, 422)
+
+    def test_422_sent_creating_question_in_unknown_category(self):
+        res = self.client().post('/questions', json={'question': 'Why?', 'answer': 'No', 'category': 1000, 'difficulty': 1})
+
+        self.assertEqual(res.status_code, 422)
+
+    def test_422_sent_creating_question_with_malformed_category(self):
+        for category in ('Science', '', '²', 1.5, True, [1], {'id': 1}):
+            res = self.client().post('/questions', json={'question': 'Why?', 'answer': 'No', 'category': category, 'difficulty': 1})
+
+            self.assertEqual(res.status_code, 422, category)
+
+    def test_404_sent_deleting_missing_question(self):
+        res = self.client().delete('/questions/100000')
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_play_quiz_in_category(self):
+        res = self.client().post('/quizzes', json={
+            'previous_questions': [20],
+            'quiz_category': {'type': 'Science', 'id': '1'}
+        })
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(str(data['question']['category']), '1')
+        self.assertNotEqual(data['question']['id'], 20)
+
+    def test_play_quiz_until_no_question_is_left(self):
+        previous = []
+        while True:
+            res = self.client().post('/quizzes', json={
+                'previous_questions': previous,
+                'quiz_category': {'type': 'click', 'id': 0}
+            })
+            question = json.loads(res.data)['question']
+            if question is None:
+                break
+            self.assertNotIn(question['id'], previous)
+            previous.append(question['id'])
+
+        total = json.loads(self.client().get('/questions').data)['total_questions']
+        self.assertEqual(len(previous), total)
+
+    def test_quiz_session_deals_every_question_once(self):
+        res = self.client().post('/quizzes/sessions', json={'quiz_category': {'type': 'Science', 'id': '1'}})
+        data = json.loads(res.data)
+        token = data['session']
+        dealt = [data['question']['id']]
+        while data['question'] is not None:
+            data = json.loads(self.client().post('/quizzes/sessions/{}/next'.format(token)).data)
+            if data['question'] is not None:
+                dealt.append(data['question']['id'])
+
+        total = json.loads(self.client().get('/categories/1/questions').data)['total_questions']
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(set(dealt)), total)
+        self.assertEqual(data['remaining'], 0)
+
+    def test_quiz_session_continues_in_another_worker(self):
+        data = json.loads(self.client().post('/quizzes/sessions', json={'quiz_category': {'id': 1}}).data)
+
+        # a worker that never saw the session, with its own pools
+        with self.app.app_context():
+            other = QuizEngine()
+            question, remaining = other.deal(other.session(data['session']))
+
+        self.assertIsNotNone(question)
+        self.assertNotEqual(question.id, data['question']['id'])
+        self.assertEqual(remaining, data['remaining'] - 1)
+
+    def test_404_sent_for_ended_quiz_session(self):
+        token = json.loads(self.client().post('/quizzes/sessions', json={}).data)['session']
+
+        res = self.client().delete('/quizzes/sessions/{}'.format(token))
+        self.assertEqual(res.status_code, 200)
+
+        res = self.client().post('/quizzes/sessions/{}/next'.format(token))
+        self.assertEqual(res.status_code, 404)
+
+    def test_400_sent_for_malformed_quiz(self):
+        res = self.client().post('/quizzes', json={'previous_questions': 'all'})
+
+        self.assertEqual(res.status_code, 400)
+
 
 # Make the tests conveniently executable
 if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+    harness.main()
\ No newline at end of file
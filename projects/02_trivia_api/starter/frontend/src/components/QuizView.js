@@ -10,6 +10,7 @@ class QuizView extends Component {
     super();
     this.state = {
         quizCategory: null,
+        quizSession: null,
         previousQuestions: [], 
         showAnswer: false,
         categories: {},
@@ -47,13 +48,15 @@ class QuizView extends Component {
     const previousQuestions = [...this.state.previousQuestions]
     if(this.state.currentQuestion.id) { previousQuestions.push(this.state.currentQuestion.id) }
 
+    // the server keeps the questions already dealt in the quiz session
     $.ajax({
-      url: '/quizzes', //TODO: update request URL
+      url: this.state.quizSession
+        ? `/quizzes/sessions/${this.state.quizSession}/next`
+        : '/quizzes/sessions',
       type: "POST",
       dataType: 'json',
       contentType: 'application/json',
       data: JSON.stringify({
-        previous_questions: previousQuestions,
         quiz_category: this.state.quizCategory
       }),
       xhrFields: {
@@ -62,6 +65,7 @@ class QuizView extends Component {
       crossDomain: true,
       success: (result) => {
         this.setState({
+          quizSession: result.session,
           showAnswer: false,
           previousQuestions: previousQuestions,
           currentQuestion: result.question,
@@ -88,8 +92,15 @@ class QuizView extends Component {
   }
 
   restartGame = () => {
+    if(this.state.quizSession) {
+      $.ajax({
+        url: `/quizzes/sessions/${this.state.quizSession}`,
+        type: "DELETE"
+      })
+    }
     this.setState({
       quizCategory: null,
+      quizSession: null,
       previousQuestions: [], 
       showAnswer: false,
       numCorrect: 0,
@@ -0,0 +1,137 @@
+'''
+Benchmark helpers.
+
+Run the benchmarks from the backend directory, e.g.
+    $ python -m benchmarks.auth
+
+They sign their own tokens with a throwaway RSA key, which needs the
+cryptography package, and serve its key set from a local stub server.
+The ones that need drinks use COFFEE_BENCH_DATABASE_URL, a SQLite file in
+the temporary directory by default, which is emptied on every run; never
+point it at src/database/database.db.
+'''
+
+import base64
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwt
+
+from src.api import app
+from src.auth.auth import ALGORITHMS, API_AUDIENCE, AUTH0_DOMAIN
+from src.database.models import db
+
+database_path = os.environ.get(
+    'COFFEE_BENCH_DATABASE_URL',
+    'sqlite:///' + os.path.join(tempfile.gettempdir(), 'coffee_bench.db'))
+
+KID = 'bench-key'
+
+# every permission of the coffee shop API, as a manager's token has them
+PERMISSIONS = ['get:drinks-detail', 'post:drinks',
+               'patch:drinks', 'delete:drinks']
+
+
+'''
+setup_bench_db()
+    points the app at the benchmark database, recreates the schema and
+    returns the app with an app context pushed
+'''
+
+
+def setup_bench_db():
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_path
+    app.app_context().push()
+    db.drop_all()
+    db.create_all()
+    return app
+
+
+def _base64url(number):
+    data = number.to_bytes((number.bit_length() + 7) // 8, 'big')
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+'''
+signing_key(kid=KID)
+    a new RSA key: (private key PEM, key set with its public half)
+'''
+
+
+def signing_key(kid=KID):
+    key = rsa.generate_private_key(65537, 2048, default_backend())
+    pem = key.private_bytes(serialization.Encoding.PEM,
+                            serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption())
+    numbers = key.public_key().public_numbers()
+    return pem, {'keys': [{
+        'kty': 'RSA', 'kid': kid, 'use': 'sig', 'alg': ALGORITHMS[0],
+        'n': _base64url(numbers.n), 'e': _base64url(numbers.e),
+    }]}
+
+
+'''
+make_token(pem, kid=KID, permissions=PERMISSIONS, lifetime=3600)
+    an access token as Auth0 issues them for this API
+'''
+
+
+def make_token(pem, kid=KID, permissions=PERMISSIONS, lifetime=3600):
+    now = int(time.time())
+    return jwt.encode({
+        'iss': 'https://' + AUTH0_DOMAIN + '/',
+        'sub': 'auth0|bench',
+        'aud': API_AUDIENCE,
+        'iat': now,
+        'exp': now + lifetime,
+        'permissions': permissions,
+    }, pem, algorithm=ALGORITHMS[0], headers={'kid': kid})
+
+
+'''
+serve_jwks(jwks, latency=0)
+    serves jwks from a stub server in a background thread, answering
+    after latency seconds, and returns its URL
+'''
+
+
+def serve_jwks(jwks, latency=0):
+    body = json.dumps(jwks).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return 'http://127.0.0.1:{}/.well-known/jwks.json'.format(
+        server.server_port)
+
+
+'''
+per_call(fn, calls)
+    calls fn calls times and returns the mean wall clock time per call in
+    seconds
+'''
+
+
+def per_call(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls
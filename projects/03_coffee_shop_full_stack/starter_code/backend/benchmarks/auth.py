@@ -0,0 +1,56 @@
+'''
+Authentication overhead per request: verify_decode_jwt() fetching the key
+set on every call, as it did, against the KeyStore of src/auth/keys.py,
+with the key set served by a stub identity provider that answers after
+0, 20 and 100 ms. "lookup" is the key store alone, "decode" the RSA
+signature check and claims validation that every request still pays.
+
+    $ python -m benchmarks.auth
+'''
+
+from jose import jwt
+
+from benchmarks import make_token, per_call, serve_jwks, signing_key
+from src.auth import auth
+from src.auth.keys import KeyStore
+
+LATENCIES = [0, 0.02, 0.1]
+
+
+def verify_fetching(token, url):
+    keys = KeyStore(url).fetch()
+    kid = jwt.get_unverified_header(token)['kid']
+    return jwt.decode(token, keys[kid], algorithms=auth.ALGORITHMS,
+                      audience=auth.API_AUDIENCE,
+                      issuer='https://' + auth.AUTH0_DOMAIN + '/')
+
+
+def main():
+    pem, jwks = signing_key()
+    token = make_token(pem)
+    kid = jwt.get_unverified_header(token)['kid']
+
+    print("%10s %18s %12s %12s %16s" % (
+        "idp ms", "fetch+verify ms", "lookup us", "decode ms",
+        "cached verify ms"))
+    for latency in LATENCIES:
+        url = serve_jwks(jwks, latency)
+        auth.key_store = KeyStore(url)
+        auth.verify_decode_jwt(token)
+        calls = 20 if latency else 200
+
+        fetching = per_call(lambda: verify_fetching(token, url), calls)
+        lookup = per_call(lambda: auth.key_store.get(kid), 100000)
+        key = auth.key_store.get(kid)
+        decode = per_call(lambda: jwt.decode(
+            token, key, algorithms=auth.ALGORITHMS,
+            audience=auth.API_AUDIENCE,
+            issuer='https://' + auth.AUTH0_DOMAIN + '/'), 1000)
+        cached = per_call(lambda: auth.verify_decode_jwt(token), 1000)
+        print("%10.0f %18.2f %12.2f %12.3f %16.3f" % (
+            latency * 1000, fetching * 1000, lookup * 1e6, decode * 1000,
+            cached * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+'''
+GET /drinks and /drinks-detail over 10k drinks. "before" loads every
+Drink and serializes it the way Drink.short() and long() did, parsing the
+recipe JSON on every call, twice in short(). "fragments" is
+drink_fragments(), which joins the JSON stored with each drink without
+loading Drink objects. "request" is the whole request through the test
+client.
+
+    $ python -m benchmarks.drinks
+'''
+
+import json
+import random
+
+from flask import jsonify
+
+from benchmarks import per_call, setup_bench_db
+from src.database.models import db, drink_fragments, Drink
+
+DRINKS = 10000
+COLORS = ['#4b2e1e', '#f5f0e6', '#c67c4e', '#ffffff', '#3b2414']
+NAMES = ['espresso', 'milk', 'foam', 'water', 'chocolate', 'caramel']
+
+
+def recipe(rng):
+    return [{'name': rng.choice(NAMES), 'color': rng.choice(COLORS),
+             'parts': rng.randint(1, 3)}
+            for _ in range(rng.randint(1, 3))]
+
+
+def short_before(drink):
+    json.loads(drink.recipe)
+    return {
+        'id': drink.id,
+        'title': drink.title,
+        'recipe': [{'color': r['color'], 'parts': r['parts']}
+                   for r in json.loads(drink.recipe)]
+    }
+
+
+def long_before(drink):
+    return {'id': drink.id, 'title': drink.title,
+            'recipe': json.loads(drink.recipe)}
+
+
+def serialize_before(form):
+    db.session.expunge_all()
+    drinks = Drink.query.all()
+    return jsonify({'success': True,
+                    'drinks': [form(drink) for drink in drinks]}).get_data()
+
+
+def main():
+    app = setup_bench_db()
+    rng = random.Random(42)
+    db.session.add_all(
+        Drink(title='drink {}'.format(i), recipe=json.dumps(recipe(rng)))
+        for i in range(DRINKS))
+    db.session.commit()
+    db.session.remove()
+
+    client = app.test_client()
+    print("%8s %12s %14s %12s" % (
+        "form", "before ms", "fragments ms", "request ms"))
+    for form, before, url in (('short', short_before, '/drinks'),
+                              ('long', long_before, '/drinks-detail')):
+        before_ms = per_call(lambda: serialize_before(before), 5) * 1000
+        fragments_ms = per_call(lambda: ', '.join(drink_fragments(form)),
+                                5) * 1000
+        request_ms = None
+        if form == 'short':
+            request_ms = per_call(lambda: client.get(url), 5) * 1000
+        print("%8s %12.1f %14.1f %12s" % (
+            form, before_ms, fragments_ms,
+            '%.1f' % request_ms if request_ms else '-'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+'''
+GET /drinks over 10k drinks: building the body from drink_fragments() on
+every request, as the route did, against the menu snapshot of menu.py,
+answered with the whole body or, for a client sending the ETag it has,
+with 304 Not Modified. "rebuild" is the cost of a new snapshot after a
+drink was written, both forms.
+
+    $ python -m benchmarks.menu
+'''
+
+import json
+import random
+
+from benchmarks import per_call, setup_bench_db
+from benchmarks.drinks import recipe
+from src.database.models import db, drink_fragments, Drink
+from src.menu import MenuSnapshot
+
+SIZES = [100, 10000]
+
+
+def main():
+    app = setup_bench_db()
+    client = app.test_client()
+    rng = random.Random(42)
+
+    print("%8s %14s %12s %12s %12s" % (
+        "drinks", "fragments ms", "snapshot ms", "304 ms", "rebuild ms"))
+    total = 0
+    for size in SIZES:
+        db.session.add_all(
+            Drink(title='drink {}'.format(i), recipe=json.dumps(recipe(rng)))
+            for i in range(total, size))
+        db.session.commit()
+        db.session.remove()
+        total = size
+
+        fragments_ms = per_call(lambda: (
+            '{"success": true, "drinks": [' +
+            ', '.join(drink_fragments('short')) + ']}').encode(), 5) * 1000
+        etag = client.get('/drinks').headers['ETag']
+        snapshot_ms = per_call(lambda: client.get('/drinks'), 1000) * 1000
+        not_modified_ms = per_call(lambda: client.get(
+            '/drinks', headers={'If-None-Match': etag}), 1000) * 1000
+        rebuild_ms = per_call(lambda: MenuSnapshot(0), 5) * 1000
+        print("%8d %14.2f %12.2f %12.2f %12.2f" % (
+            size, fragments_ms, snapshot_ms, not_modified_ms, rebuild_ms))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+'''
+Throughput of a view behind requires_auth('patch:drinks') when every call
+presents the same bearer token, as a client does between logins: with
+TokenCache verifying the token once, and with a cache of size 0, which
+verifies it on every call as requires_auth did before. The key set comes
+from a local file, so neither side pays for fetching it.
+
+    $ python -m benchmarks.tokens
+'''
+
+import json
+import os
+import tempfile
+
+from flask import Flask
+
+from benchmarks import make_token, per_call, signing_key
+from src.auth import auth
+from src.auth.keys import KeyStore
+from src.auth.tokens import TokenCache
+
+CALLS = 20000
+
+
+def main():
+    pem, jwks = signing_key()
+    fd, path = tempfile.mkstemp(suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(jwks, f)
+    auth.key_store = KeyStore(path)
+    token = make_token(pem)
+
+    @auth.requires_auth('patch:drinks')
+    def view(payload):
+        return payload
+
+    app = Flask(__name__)
+    headers = {'Authorization': 'Bearer ' + token}
+    print("%10s %10s %14s" % ("cache", "us/call", "calls/s"))
+    try:
+        with app.test_request_context(headers=headers):
+            for name, cache in (('off', TokenCache(size=0)),
+                                ('on', TokenCache())):
+                auth.token_cache = cache
+                calls = CALLS if cache.size else CALLS // 20
+                seconds = per_call(view, calls)
+                print("%10s %10.1f %14.0f" % (
+                    name, seconds * 1e6, 1 / seconds))
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+'''
+Concurrent POST /drinks: THREADS clients at once, first each creating its
+own drinks, then all of them racing to create the same titles. post_drink
+now relies on the unique index on title; "pre-check" is the handler as it
+was, counting drinks with the title before inserting, served from an
+extra route. Every title must be created exactly once and every other
+attempt answered with 409; the script fails otherwise.
+
+    $ python -m benchmarks.writes
+'''
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from flask import abort, jsonify, request
+
+from benchmarks import make_token, setup_bench_db, signing_key
+from src.auth import auth
+from src.auth.keys import KeyStore
+from src.database.models import db, Drink
+
+THREADS = 8
+DRINKS = 200
+RECIPE = [{'name': 'espresso', 'color': '#4b2e1e', 'parts': 1}]
+
+
+# the aborts are outside the try, where the old handler's bare except
+# turned every 409 into a 422; a 422 here is a race the pre-check lost
+@auth.requires_auth('post:drinks')
+def post_drink_precheck(jwt):
+    if "title" not in request.json:
+        abort(400)
+    title = request.json["title"]
+    existing_count = Drink.query.filter(Drink.title == title).count()
+    if existing_count > 0:
+        abort(409)
+    try:
+        new_drink = Drink(title=title,
+                          recipe=json.dumps(request.json["recipe"]))
+        new_drink.insert()
+        return (jsonify({"success": True,
+                         "drinks": [new_drink.long()]}), 200)
+    except:
+        db.session.rollback()
+        abort(422)
+
+
+def run(app, url, headers, titles):
+    statuses = [Counter() for _ in titles]
+
+    def client(n):
+        c = app.test_client()
+        for i, title in enumerate(titles[n]):
+            response = c.post(url, headers=headers,
+                              json={'title': title, 'recipe': RECIPE})
+            statuses[n][(title, response.status_code)] += 1
+
+    threads = [threading.Thread(target=client, args=(n,))
+               for n in range(len(titles))]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return sum(statuses, Counter()), elapsed
+
+
+def check(results, titles):
+    created = Counter(title for (title, status), n in results.items()
+                      if status == 200 for _ in range(n))
+    statuses = Counter()
+    for (_, status), n in results.items():
+        statuses[status] += n
+    stored = Counter(title for title, in db.session.query(Drink.title))
+    db.session.remove()
+    ok = (all(created[t] == 1 and stored[t] == 1 for t in titles) and
+          set(statuses) <= {200, 409})
+    return ok, statuses
+
+
+def main():
+    pem, jwks = signing_key()
+    fd, path = tempfile.mkstemp(suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(jwks, f)
+    auth.key_store = KeyStore(path)
+    headers = {'Authorization': 'Bearer ' + make_token(pem)}
+
+    app = setup_bench_db()
+    app.add_url_rule('/bench/drinks-precheck', 'post_drink_precheck',
+                     post_drink_precheck, methods=['POST'])
+
+    print("%10s %10s %12s %12s %8s  %s" % (
+        "handler", "titles", "requests", "requests/s", "correct",
+        "statuses"))
+    failed = False
+    try:
+        for handler, url in (('pre-check', '/bench/drinks-precheck'),
+                             ('index', '/drinks')):
+            for case in ('distinct', 'same'):
+                db.drop_all()
+                db.create_all()
+                db.session.remove()
+                if case == 'distinct':
+                    titles = [['{} {}'.format(n, i) for i in range(DRINKS)]
+                              for n in range(THREADS)]
+                else:
+                    titles = [['drink {}'.format(i) for i in range(DRINKS)]
+                              for n in range(THREADS)]
+                results, elapsed = run(app, url, headers, titles)
+                ok, statuses = check(
+                    results, set(t for ts in titles for t in ts))
+                failed = failed or (handler == 'index' and not ok)
+                requests = sum(statuses.values())
+                print("%10s %10s %12d %12.0f %8s  %s" % (
+                    handler, case, requests, requests / elapsed,
+                    'yes' if ok else 'NO', dict(statuses)))
+    finally:
+        os.remove(path)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,8 +4,10 @@ from sqlalchemy import exc
 import json
 from flask_cors import CORS
 import sys
-from .database.models import db_drop_and_create_all, setup_db, Drink
+from .database.models import db, db_drop_and_create_all, db_migrate, setup_db, Drink
 from .auth.auth import AuthError, requires_auth
+from .menu import DrinkMenu
+from flask_perf import Profiler
 
 app = Flask(__name__)
 setup_db(app)
@@ -13,12 +15,50 @@ setup_db(app)
 # Set up CORS. Allow '*' for origins.
 cors = CORS(app)
 
+# Query counts and timings per request, see flask_perf
+profiler = Profiler(app)
+
+# the menu served by GET /drinks and /drinks-detail, see menu.py
+menu = DrinkMenu()
+
+'''
+The schema is never touched when the app starts, so restarting the server
+or starting more workers keeps the drinks. Provision it explicitly:
+    flask migrate    creates the tables and columns that are missing
+    flask reset-db   !! DROPS ALL RECORDS AND STARTS YOUR DB FROM SCRATCH
+'''
+
+
+@app.cli.command("migrate")
+def migrate_command():
+    """Creates the missing tables and columns, run before starting the server."""
+    for step in db_migrate():
+        print(step)
+    print("the schema is up to date")
+
+
+@app.cli.command("reset-db")
+def reset_db_command():
+    """Drops all drinks and recreates the tables."""
+    db_drop_and_create_all()
+    print("the database was reset")
+
+
 '''
-!! NOTE THIS WILL DROP ALL RECORDS AND START YOUR DB FROM SCRATCH
-!! NOTE THIS MUST BE UNCOMMENTED ON FIRST RUN
+menu_response(form)
+    a response with status code 200 and the already encoded body of form, a
+    MenuBody, with its ETag; a request whose If-None-Match has the ETag
+    gets status code 304 and no body
 '''
 
-db_drop_and_create_all()
+
+def menu_response(form):
+    response = app.response_class(form.body, status=200,
+                                  mimetype='application/json')
+    response.set_etag(form.etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
 
 # ROUTES
 '''
@@ -26,17 +66,14 @@ GET /drinks
     A public endpoint
     Contains only the drink.short() data representation
     returns status code 200 and json {"success": True, "drinks": drinks} where drinks is the list of drinks
+        or status code 304 when If-None-Match has the ETag of the menu
 '''
 
 
 @app.route("/drinks")
 def get_drinks():
     try:
-
-        drink_selection = Drink.query.all()
-        drinks = [drink.short() for drink in drink_selection]
-        print(len(drinks))
-        return (jsonify({"success": True, "drinks": drinks}), 200)
+        return menu_response(menu.get().short)
     except:
         abort(422)
 
@@ -46,6 +83,7 @@ GET /drinks-detail
     requires the 'get:drinks-detail' permission
     contains the drink.long() data representation
     returns status code 200 and json {"success": True, "drinks": drinks} where drinks is the list of drinks
+        or status code 304 when If-None-Match has the ETag of the menu
 '''
 
 
@@ -54,11 +92,7 @@ GET /drinks-detail
 def get_drinks_detail(jwt):
 
     try:
-        drink_selection = Drink.query.all()
-        drinks = [drink.long() for drink in drink_selection]
-
-        return (jsonify({"success": True,
-                         "drinks": drinks}), 200)
+        return menu_response(menu.get().long)
     except:
         abort(422)
 
@@ -69,36 +103,37 @@ POST /drinks
     requires the 'post:drinks' permission
     contains the drink.long() data representation
     returns status code 200 and json {"success": True, "drinks": drink} where drink an array containing only the newly created drink
+    responds with a 409 error if a drink has the title, which the unique
+    index on title decides, so two concurrent requests cannot both win
 '''
 
 
 @app.route("/drinks", methods=["POST"])
 @requires_auth("post:drinks")
 def post_drink(jwt):
-    try:
-        if "title" not in request.json:
-            abort(400)
+    if "title" not in request.json:
+        abort(400)
 
+    try:
         title = request.json["title"]
-
-        existing_count = Drink.query.filter(Drink.title == title).count()
-
-        if existing_count > 0:
-            abort(409)
-
         recipe = request.json["recipe"]
 
         new_drink = Drink(title=title, recipe=json.dumps(recipe))
 
         new_drink.insert()
 
-        return (jsonify({"success": True,
-                         "drinks": [new_drink.long()]}), 200)
+    except exc.IntegrityError:
+        db.session.rollback()
+        abort(409)
 
     except:
+        db.session.rollback()
         print(sys.exc_info())
         abort(422)
 
+    return (jsonify({"success": True,
+                     "drinks": [new_drink.long()]}), 200)
+
 
 '''
 PATCH /drinks/<id>
@@ -108,6 +143,7 @@ PATCH /drinks/<id>
     requires the 'patch:drinks' permission
     contains the drink.long() data representation
     returns status code 200 and json {"success": True, "drinks": drink} where drink an array containing only the updated drink
+    responds with a 409 error if another drink has the new title
 '''
 
 
@@ -121,30 +157,27 @@ def update_drink(jwt, id=id):
         abort(404)
 
     if "title" in request.json:
-        title = request.json["title"]
-
-        existing_count = Drink.query.filter(
-            Drink.title == title, Drink.id != id).count()
-        if existing_count > 0:
-            print("Title repeated")
-            abort(409)
-
-        drink.title = title
+        drink.title = request.json["title"]
 
     if "recipe" in request.json:
         recipe = request.json["recipe"]
         drink.recipe = json.dumps(recipe)
 
     try:
-
         drink.update()
-        return (jsonify({"success": True,
-                         "drinks": [drink.long()]}), 200)
+
+    except exc.IntegrityError:
+        db.session.rollback()
+        abort(409)
 
     except:
+        db.session.rollback()
         print(sys.exc_info())
         abort(422)
 
+    return (jsonify({"success": True,
+                     "drinks": [drink.long()]}), 200)
+
 
 '''
 DELETE /drinks/<id>
@@ -174,6 +207,22 @@ def delete_drink(jwt, id=id):
         abort(422)
 
 
+'''
+GET /__perf
+    only served while profiling is enabled
+    requires the 'get:perf' permission
+    query count, database time and slowest statements per endpoint
+    returns status code 200 and json {"success": True, "endpoints": stats}
+'''
+
+
+if profiler.enabled:
+    @app.route("/__perf")
+    @requires_auth("get:perf")
+    def perf_stats(jwt):
+        return jsonify({"success": True, "endpoints": profiler.stats()})
+
+
 # Error Handling
 
 @app.errorhandler(422)
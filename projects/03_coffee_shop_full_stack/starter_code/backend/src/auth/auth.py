@@ -1,13 +1,23 @@
-import json
+import os
 from flask import request, _request_ctx_stack
 from functools import wraps
 from jose import jwt
-from urllib.request import urlopen
+
+from .keys import KeyStore, KeyStoreError
+from .tokens import TokenCache
 
 
 AUTH0_DOMAIN = 'dev-k257r4wo.us.auth0.com'
 ALGORITHMS = ['RS256']
 API_AUDIENCE = 'coffee'
+# a URL or file path, e.g. a local jwks.json to run without Auth0
+JWKS_URL = os.environ.get(
+    'JWKS_URL', f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
+
+# the signing keys, fetched once and refreshed in the background
+key_store = KeyStore(JWKS_URL)
+# tokens already verified, so a reused token skips the signature check
+token_cache = TokenCache()
 
 # AuthError Exception
 '''
@@ -70,6 +80,8 @@ def get_token_auth_header():
 @INPUTS
     permission: string permission (i.e. 'post:drink')
     payload: decoded jwt payload
+    permissions: the payload permissions as a frozenset, built from the
+        payload when not given
 
 Raises an AuthError if permissions are not included in the payload
     !!NOTE check RBAC settings in Auth0
@@ -78,14 +90,16 @@ returns true otherwise
 '''
 
 
-def check_permissions(permission, payload):
+def check_permissions(permission, payload, permissions=None):
     if 'permissions' not in payload:
         raise AuthError({
             'code': 'invalid_claims',
             'description': 'Permissions not included in JWT.'
         }, 400)
 
-    if permission not in payload['permissions']:
+    if permissions is None:
+        permissions = frozenset(payload['permissions'])
+    if permission not in permissions:
         raise AuthError({
             'code': 'unauthorized',
             'description': 'Permission not found.'
@@ -97,7 +111,7 @@ def check_permissions(permission, payload):
 @INPUTS
     token: a json web token (string)
 
-verifies the token using Auth0 /.well-known/jwks.json
+verifies the token using Auth0 /.well-known/jwks.json, from key_store
 decodes the payload from the token
 validates the claims
 returns the decoded payload
@@ -107,25 +121,20 @@ returns the decoded payload
 
 
 def verify_decode_jwt(token):
-    jsonurl = urlopen(f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
-    jwks = json.loads(jsonurl.read())
     unverified_header = jwt.get_unverified_header(token)
-    rsa_key = {}
     if 'kid' not in unverified_header:
         raise AuthError({
             'code': 'invalid_header',
             'description': 'Authorization malformed.'
         }, 401)
 
-    for key in jwks['keys']:
-        if key['kid'] == unverified_header['kid']:
-            rsa_key = {
-                'kty': key['kty'],
-                'kid': key['kid'],
-                'use': key['use'],
-                'n': key['n'],
-                'e': key['e']
-            }
+    try:
+        rsa_key = key_store.get(unverified_header['kid'])
+    except KeyStoreError:
+        raise AuthError({
+            'code': 'jwks_unavailable',
+            'description': 'Unable to fetch the signing keys.'
+        }, 503)
     if rsa_key:
         try:
             payload = jwt.decode(
@@ -165,7 +174,8 @@ def verify_decode_jwt(token):
     permission: string permission (i.e. 'post:drink')
 
 Uses the get_token_auth_header method to get the token
-Uses the verify_decode_jwt method to decode the jwt
+Uses the verify_decode_jwt method to decode the jwt, unless token_cache
+    has the token from an earlier request
 Uses the check_permissions method validate claims and check the requested permission
 returns the decorator which passes the decoded payload to the decorated method
 '''
@@ -176,9 +186,12 @@ def requires_auth(permission=''):
         @wraps(f)
         def wrapper(*args, **kwargs):
             token = get_token_auth_header()
-            payload = verify_decode_jwt(token)
-            check_permissions(permission, payload)
-            return f(payload, *args, **kwargs)
+            verified = token_cache.get(token)
+            if verified is None:
+                verified = token_cache.add(token, verify_decode_jwt(token))
+            check_permissions(permission, verified.payload,
+                              verified.permissions)
+            return f(verified.payload, *args, **kwargs)
 
         return wrapper
     return requires_auth_decorator
@@ -0,0 +1,155 @@
+# BasicFlaskAuth/keys.py is a copy of this file, copy it again after
+# changing it.
+import json
+import logging
+import threading
+import time
+from urllib.request import urlopen
+
+logger = logging.getLogger('auth')
+
+# keys are refetched in the background once they are this old
+JWKS_TTL = 600
+# after a failed background refetch the stale keys are served this long
+# before the next attempt
+RETRY_INTERVAL = 30
+# a token with an unknown kid refetches the keys at most this often, so
+# made up kids cannot turn every request into a fetch
+UNKNOWN_KID_INTERVAL = 30
+FETCH_TIMEOUT = 5
+# the members of a JWK that verify_decode_jwt passes on to jwt.decode
+KEY_FIELDS = ('kty', 'kid', 'use', 'n', 'e')
+
+'''
+KeyStoreError Exception
+The keys could not be fetched and none are cached
+'''
+
+
+class KeyStoreError(Exception):
+    pass
+
+
+'''
+KeyStore(source)
+    the RSA signing keys of a JSON Web Key Set, parsed once and looked up
+    by kid. source is the URL of the key set, such as
+    https://<domain>/.well-known/jwks.json or a stub server, or the path of
+    a local file.
+
+    The first lookup fetches the keys. Once they are older than ttl the
+    next lookup starts a refetch in a background thread and is answered
+    from the cached keys, which keep being served while the provider is
+    slow or down. A kid that is not cached triggers an immediate refetch,
+    key rotation, that concurrent requests share: one fetches while the
+    others wait for its result.
+'''
+
+
+class KeyStore(object):
+    def __init__(self, source, ttl=JWKS_TTL,
+                 unknown_kid_interval=UNKNOWN_KID_INTERVAL):
+        self.source = source
+        self.ttl = ttl
+        self.unknown_kid_interval = unknown_kid_interval
+        self._keys = None
+        self._attempted = 0.0
+        self._next_refresh = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        # held by the one request or thread that is fetching
+        self._fetch_lock = threading.Lock()
+
+    '''
+    fetch()
+        reads and parses the key set from source, returns {kid: jwk}
+    '''
+
+    def fetch(self):
+        if '://' in self.source:
+            with urlopen(self.source, timeout=FETCH_TIMEOUT) as response:
+                jwks = json.loads(response.read())
+        else:
+            with open(self.source) as f:
+                jwks = json.load(f)
+        return {
+            key['kid']: {field: key[field]
+                         for field in KEY_FIELDS if field in key}
+            for key in jwks['keys']
+            if key.get('kty') == 'RSA' and 'kid' in key
+        }
+
+    '''
+    get(kid)
+        the jwk with this kid, or None when the key set has no such key
+        raises KeyStoreError when there are no keys to look in
+    '''
+
+    def get(self, kid):
+        keys = self._keys
+        if keys is None:
+            keys = self._load(lambda: self._keys is None)
+        elif time.monotonic() >= self._next_refresh:
+            self._refresh_in_background()
+
+        key = keys.get(kid)
+        if key is None and self._may_refetch():
+            try:
+                keys = self._load(
+                    lambda: self._keys is None or
+                    kid not in self._keys and self._may_refetch())
+            except KeyStoreError as e:
+                logger.warning('unknown kid %s: %s', kid, e)
+            key = keys.get(kid)
+        return key
+
+    '''
+    invalidate()
+        forgets the keys, the next lookup fetches them again
+    '''
+
+    def invalidate(self):
+        with self._fetch_lock:
+            self._keys = None
+
+    def _may_refetch(self):
+        return (time.monotonic() - self._attempted >=
+                self.unknown_kid_interval)
+
+    # single flight: needed() is checked again under the lock, so callers
+    # that waited for another fetch use its keys instead of fetching again
+    def _load(self, needed):
+        with self._fetch_lock:
+            if needed():
+                self._attempted = time.monotonic()
+                try:
+                    self._store(self.fetch())
+                except Exception as e:
+                    raise KeyStoreError(
+                        'fetching {}: {}'.format(self.source, e))
+            return self._keys
+
+    def _store(self, keys):
+        self._keys = keys
+        self._next_refresh = time.monotonic() + self.ttl
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, name='jwks-refresh',
+                         daemon=True).start()
+
+    def _refresh(self):
+        try:
+            with self._fetch_lock:
+                try:
+                    self._store(self.fetch())
+                except Exception as e:
+                    self._next_refresh = time.monotonic() + RETRY_INTERVAL
+                    logger.warning('refreshing keys from %s: %s',
+                                   self.source, e)
+        finally:
+            with self._lock:
+                self._refreshing = False
@@ -0,0 +1,90 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+# verified tokens remembered, least recently used ones are dropped first
+TOKEN_CACHE_SIZE = 10000
+# a token is verified again after this long even if it expires later, so
+# rotated keys and changed permissions are picked up
+TOKEN_CACHE_TTL = 300
+
+'''
+VerifiedToken
+    the decoded payload of a token whose signature and claims were
+    checked, its permissions as a frozenset, None when the token has no
+    permissions claim, and when the entry stops being valid
+'''
+
+
+class VerifiedToken(object):
+    __slots__ = ('payload', 'permissions', 'expires')
+
+    def __init__(self, payload, expires):
+        self.payload = payload
+        permissions = payload.get('permissions')
+        self.permissions = (frozenset(permissions)
+                            if permissions is not None else None)
+        self.expires = expires
+
+
+'''
+TokenCache(size=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+    a bounded LRU of verified tokens, keyed by the SHA-256 digest of the
+    token so the bearer tokens themselves are not kept. An entry expires
+    at the token's exp claim, or ttl seconds after it was verified,
+    whichever comes first. Only tokens that passed verification are
+    added.
+'''
+
+
+class TokenCache(object):
+    def __init__(self, size=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(token):
+        return hashlib.sha256(token.encode()).digest()
+
+    '''
+    get(token)
+        the VerifiedToken of token, or None when it has to be verified
+    '''
+
+    def get(self, token):
+        digest = self._digest(token)
+        with self._lock:
+            entry = self._tokens.get(digest)
+            if entry is None:
+                return None
+            if entry.expires <= time.time():
+                del self._tokens[digest]
+                return None
+            self._tokens.move_to_end(digest)
+            return entry
+
+    '''
+    add(token, payload)
+        remembers the payload of a verified token and returns its
+        VerifiedToken
+    '''
+
+    def add(self, token, payload):
+        expires = time.time() + self.ttl
+        if 'exp' in payload:
+            expires = min(expires, payload['exp'])
+        entry = VerifiedToken(payload, expires)
+        digest = self._digest(token)
+        with self._lock:
+            self._tokens[digest] = entry
+            self._tokens.move_to_end(digest)
+            while len(self._tokens) > self.size:
+                self._tokens.popitem(last=False)
+        return entry
+
+    def invalidate(self):
+        with self._lock:
+            self._tokens.clear()
@@ -1,5 +1,5 @@
 import os
-from sqlalchemy import Column, String, Integer
+from sqlalchemy import Column, String, Integer, case, event, inspect
 from flask_sqlalchemy import SQLAlchemy
 import json
 
@@ -16,7 +16,7 @@ setup_db(app)
 '''
 
 
-def setup_db(app):
+def setup_db(app, database_path=database_path):
     app.config["SQLALCHEMY_DATABASE_URI"] = database_path
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     db.app = app
@@ -36,9 +36,59 @@ def db_drop_and_create_all():
     db.create_all()
 
 
+'''
+db_migrate()
+    creates the tables that do not exist yet, adds the columns that are
+    missing from existing ones, fills short_recipe where it is NULL and
+    keeps every record
+    returns the list of steps taken, empty when the schema was current
+'''
+
+
+def db_migrate():
+    existing = set(inspect(db.engine).get_table_names())
+    steps = ['created table {}'.format(table.name)
+             for table in db.metadata.sorted_tables
+             if table.name not in existing]
+    db.create_all()
+
+    columns = [c['name'] for c in inspect(db.engine).get_columns('drink')]
+    if 'short_recipe' not in columns:
+        # SQLite cannot add a NOT NULL column without a default, the
+        # drinks are filled below
+        db.session.execute(
+            'ALTER TABLE drink ADD COLUMN short_recipe VARCHAR(180)')
+        db.session.commit()
+        steps.append('added drink.short_recipe')
+
+    unfilled = Drink.query.filter(Drink.short_recipe.is_(None)).all()
+    for drink in unfilled:
+        drink.short_recipe = json.dumps(shorten_recipe(drink.recipe_data()))
+    db.session.commit()
+    if unfilled:
+        steps.append('filled drink.short_recipe of {} drinks'.format(
+            len(unfilled)))
+    return steps
+
+
+'''
+shorten_recipe(recipe)
+    the short form of a parsed recipe, colors and parts only
+'''
+
+
+def shorten_recipe(recipe):
+    return [{'color': r['color'], 'parts': r['parts']} for r in recipe]
+
+
 '''
 Drink
 a persistent drink entity, extends the base SQLAlchemy Model
+the recipe is parsed once per drink, not per serialization: the short
+and long forms are built when the drink is written, or first used after
+it was loaded, and kept until the title or the recipe changes or the
+drink is reloaded. The short recipe is stored as JSON next to the
+recipe, so drink_fragments() can list drinks without parsing either.
 '''
 
 
@@ -50,6 +100,19 @@ class Drink(db.Model):
     # the ingredients blob - this stores a lazy json blob
     # the required datatype is [{'color': string, 'name':string, 'parts':number}]
     recipe = Column(String(180), nullable=False)
+    # the recipe without names, as JSON, written with the recipe
+    short_recipe = Column(String(180), nullable=False)
+
+    '''
+    recipe_data()
+        the recipe parsed from its JSON text, once
+    '''
+
+    def recipe_data(self):
+        recipe = self.__dict__.get('_recipe_data')
+        if recipe is None:
+            recipe = self._recipe_data = json.loads(self.recipe)
+        return recipe
 
     '''
     short()
@@ -57,14 +120,14 @@ class Drink(db.Model):
     '''
 
     def short(self):
-        print(json.loads(self.recipe))
-        short_recipe = [{'color': r['color'], 'parts': r['parts']}
-                        for r in json.loads(self.recipe)]
-        return {
-            'id': self.id,
-            'title': self.title,
-            'recipe': short_recipe
-        }
+        short = self.__dict__.get('_short')
+        if short is None:
+            short = self._short = {
+                'id': self.id,
+                'title': self.title,
+                'recipe': shorten_recipe(self.recipe_data())
+            }
+        return short
 
     '''
     long()
@@ -72,11 +135,14 @@ class Drink(db.Model):
     '''
 
     def long(self):
-        return {
-            'id': self.id,
-            'title': self.title,
-            'recipe': json.loads(self.recipe)
-        }
+        long = self.__dict__.get('_long')
+        if long is None:
+            long = self._long = {
+                'id': self.id,
+                'title': self.title,
+                'recipe': self.recipe_data()
+            }
+        return long
 
     '''
     insert()
@@ -120,3 +186,63 @@ class Drink(db.Model):
 
     def __repr__(self):
         return json.dumps(self.short())
+
+
+'''
+drink_fragments(form)
+    every drink in the short or long form, each encoded as JSON, ready to
+    be joined into a response body. Reads the stored JSON texts without
+    loading Drink objects; nothing is parsed, except the recipe of a
+    drink whose short_recipe is NULL because it was written around the
+    ORM or not yet filled by db_migrate().
+'''
+
+
+def drink_fragments(form):
+    if form == 'short':
+        rows = [(id, title, short if short is not None else
+                 json.dumps(shorten_recipe(json.loads(recipe))))
+                for id, title, short, recipe in db.session.query(
+                    Drink.id, Drink.title, Drink.short_recipe,
+                    case([(Drink.short_recipe.is_(None), Drink.recipe)]))]
+    else:
+        rows = db.session.query(Drink.id, Drink.title, Drink.recipe)
+    return ['{"id": %d, "title": %s, "recipe": %s}' % (
+        id, json.dumps(title), recipe)
+        for id, title, recipe in rows]
+
+
+# the cached forms of a drink, dropped whenever they may be out of date
+_FORMS = ('_recipe_data', '_short', '_long')
+
+
+def _forget_forms(target):
+    for name in _FORMS:
+        target.__dict__.pop(name, None)
+
+
+@event.listens_for(Drink.title, 'set')
+@event.listens_for(Drink.recipe, 'set')
+def _drink_changed(target, value, oldvalue, initiator):
+    _forget_forms(target)
+
+
+@event.listens_for(Drink, 'refresh')
+def _drink_reloaded(target, context, attrs):
+    _forget_forms(target)
+
+
+@event.listens_for(Drink, 'before_insert')
+@event.listens_for(Drink, 'before_update')
+def _drink_writing(mapper, connection, target):
+    target.short_recipe = json.dumps(shorten_recipe(target.recipe_data()))
+
+
+# built before the commit expires the drink, so the response to the write
+# does not load it again
+@event.listens_for(Drink, 'after_insert')
+@event.listens_for(Drink, 'after_update')
+def _drink_written(mapper, connection, target):
+    _forget_forms(target)
+    target.short()
+    target.long()
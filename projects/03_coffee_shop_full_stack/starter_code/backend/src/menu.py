@@ -0,0 +1,99 @@
+import hashlib
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from .database.models import drink_fragments, Drink
+
+# how long a snapshot may be served when the drinks changed in another
+# worker process
+MENU_TTL = 30
+
+# bumped whenever a transaction writing drinks commits in this process
+_version = 0
+
+
+def _drink_written(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info['drinks_written'] = True
+
+
+for _name in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Drink, _name, _drink_written)
+
+
+# a snapshot rebuilt between the flush and the commit would still read the
+# old rows, so the version only changes once the write is visible
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    global _version
+    if session.info.pop('drinks_written', False):
+        _version += 1
+
+
+@event.listens_for(Session, 'after_rollback')
+def _after_rollback(session):
+    session.info.pop('drinks_written', None)
+
+
+'''
+MenuBody
+    one form of the menu: the {"success": True, "drinks": drinks} body
+    encoded as bytes, and its ETag
+'''
+
+
+class MenuBody(object):
+    def __init__(self, fragments):
+        self.body = ('{"success": true, "drinks": [' + ', '.join(fragments) +
+                     ']}').encode()
+        self.etag = hashlib.sha1(self.body).hexdigest()
+
+
+'''
+MenuSnapshot
+    the whole menu at one version, in the short and the long form
+'''
+
+
+class MenuSnapshot(object):
+    def __init__(self, version):
+        self.version = version
+        self.short = MenuBody(drink_fragments('short'))
+        self.long = MenuBody(drink_fragments('long'))
+        self.expires = time.time() + MENU_TTL
+
+
+'''
+DrinkMenu()
+    the drink menu, read once and kept in memory. Every GET /drinks and
+    /drinks-detail is answered from the current MenuSnapshot without
+    touching the database; a new one is read after a committed drink
+    write, which post_drink, update_drink and delete_drink make, or
+    after MENU_TTL.
+'''
+
+
+class DrinkMenu(object):
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def _current(self, snapshot):
+        return (snapshot is not None and snapshot.version == _version and
+                snapshot.expires >= time.time())
+
+    def get(self):
+        snapshot = self._snapshot
+        if not self._current(snapshot):
+            with self._lock:
+                snapshot = self._snapshot
+                if not self._current(snapshot):
+                    snapshot = self._snapshot = MenuSnapshot(_version)
+        return snapshot
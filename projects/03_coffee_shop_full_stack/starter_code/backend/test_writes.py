@@ -0,0 +1,77 @@
+'''
+Concurrent writer tests: the unique index on drink titles decides which of
+several simultaneous POST /drinks requests for a title wins.
+
+    $ python -m unittest test_writes
+
+Runs on a SQLite file in a temporary directory, without Auth0: the test
+token is put in the token cache as already verified.
+'''
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from collections import Counter
+
+from src.api import app
+from src.auth import auth
+from src.database.models import db, Drink
+
+THREADS = 8
+TITLES = 20
+TOKEN = 'test-token'
+RECIPE = [{'name': 'espresso', 'color': '#4b2e1e', 'parts': 1}]
+
+
+class ConcurrentWritesTestCase(unittest.TestCase):
+    """Every title is created once, every other attempt gets a 409"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(
+            self.directory, 'test.db')
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        auth.token_cache.add(TOKEN, {'permissions': ['post:drinks']})
+
+    def tearDown(self):
+        auth.token_cache.invalidate()
+        db.session.remove()
+        db.drop_all()
+        db.get_engine(app).dispose()
+        self.ctx.pop()
+        shutil.rmtree(self.directory)
+
+    def test_same_titles_created_once(self):
+        titles = ['drink {}'.format(i) for i in range(TITLES)]
+        statuses = Counter()
+        lock = threading.Lock()
+
+        def client():
+            c = app.test_client()
+            for title in titles:
+                response = c.post('/drinks', json={
+                    'title': title, 'recipe': RECIPE},
+                    headers={'Authorization': 'Bearer ' + TOKEN})
+                with lock:
+                    statuses[title, response.status_code] += 1
+
+        threads = [threading.Thread(target=client) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for title in titles:
+            self.assertEqual(statuses[title, 200], 1, title)
+            self.assertEqual(statuses[title, 409], THREADS - 1, title)
+        stored = Counter(title for title, in db.session.query(Drink.title))
+        self.assertEqual(stored, Counter(titles))
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,6 @@
 import os
 from flask import Flask
-from models import setup_db
+from models import setup_db, db
 
 def create_app(test_config=None):
 
@@ -8,6 +8,11 @@ def create_app(test_config=None):
     setup_db(app)
     CORS(app)
 
+    @app.cli.command('migrate')
+    def migrate_command():
+        '''Creates the missing tables, run once before starting the dynos.'''
+        db.create_all()
+
     @app.route('/')
     def get_greeting():
         excited = os.environ['EXCITED']
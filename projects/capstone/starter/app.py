@@ -3,10 +3,18 @@ from flask import Flask, request, abort, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 
+from flask_perf import Profiler
+
 def create_app(test_config=None):
   # create and configure the app
   app = Flask(__name__)
   CORS(app)
+  profiler = Profiler(app)
+
+  if profiler.enabled:
+    @app.route('/__perf')
+    def perf_stats():
+      return jsonify(profiler.stats())
 
   return app
 
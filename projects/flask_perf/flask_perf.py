@@ -0,0 +1,231 @@
+'''
+Per request query counts and timings for the Flask apps of this repo,
+shared by fyyur, the trivia API, the coffee shop and the capstone. Install
+it next to an app's requirements (each requirements.txt has
+`-e <path to>/flask_perf`) and attach it with `Profiler(app)`.
+'''
+
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+
+from flask import g, has_app_context, request
+from jinja2 import Template
+from sqlalchemy import event
+
+logger = logging.getLogger('perf')
+
+# statements are kept for the slowest lists only, and only this much of them
+STATEMENT_LENGTH = 500
+# distinct statements remembered per endpoint
+MAX_STATEMENTS = 100
+
+'''
+RequestProfile()
+    what one request did: statements sent, time spent waiting on the
+    database and rendering templates, and its slowest statements.
+'''
+class RequestProfile(object):
+  def __init__(self, slow_statements):
+    self.started = time.perf_counter()
+    self.queries = 0
+    self.db_time = 0.0
+    self.render_time = 0.0
+    self.slow_statements = slow_statements
+    self.slowest = []
+
+  def add_query(self, statement, elapsed):
+    self.queries += 1
+    self.db_time += elapsed
+    entry = (elapsed, statement[:STATEMENT_LENGTH])
+    if len(self.slowest) < self.slow_statements:
+      heapq.heappush(self.slowest, entry)
+    elif entry > self.slowest[0]:
+      heapq.heapreplace(self.slowest, entry)
+
+  def slowest_statements(self):
+    return [{"ms": _ms(elapsed), "statement": statement}
+            for elapsed, statement in sorted(self.slowest, reverse=True)]
+
+'''
+EndpointStats(slow_statements)
+    running totals over every profiled request of one endpoint. Statements
+    are grouped by their SQL text (parameters are not part of it), keeping
+    how often each ran and its worst time.
+'''
+class EndpointStats(object):
+  def __init__(self, slow_statements):
+    self.requests = 0
+    self.queries = 0
+    self.max_queries = 0
+    self.db_time = 0.0
+    self.render_time = 0.0
+    self.total_time = 0.0
+    self.slow_statements = slow_statements
+    self.statements = {}
+
+  def add(self, profile, total_time):
+    self.requests += 1
+    self.queries += profile.queries
+    self.max_queries = max(self.max_queries, profile.queries)
+    self.db_time += profile.db_time
+    self.render_time += profile.render_time
+    self.total_time += total_time
+    for elapsed, statement in profile.slowest:
+      count, worst = self.statements.get(statement, (0, 0.0))
+      if count or len(self.statements) < MAX_STATEMENTS:
+        self.statements[statement] = (count + 1, max(worst, elapsed))
+
+  def format(self):
+    n = self.requests
+    slowest = heapq.nlargest(self.slow_statements, self.statements.items(),
+                             key=lambda item: item[1][1])
+    return {
+      "requests": n,
+      "queries_per_request": round(self.queries / n, 2),
+      "max_queries": self.max_queries,
+      "db_ms_per_request": _ms(self.db_time / n),
+      "render_ms_per_request": _ms(self.render_time / n),
+      "total_ms_per_request": _ms(self.total_time / n),
+      "slowest_statements": [{"max_ms": _ms(worst), "count": count, "statement": statement}
+                             for statement, (count, worst) in slowest]
+    }
+
+def _ms(seconds):
+  return round(seconds * 1000, 3)
+
+def _current_profile():
+  return g.get('_perf') if has_app_context() else None
+
+# Registered by Profiler.init_app on the engine of a profiled app only. The
+# start time lives on the execution context, which is dropped with the
+# statement, so a statement that raises leaves nothing behind. Statements
+# run without one (sequence and default pre-execution) are not timed.
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+  if context is not None:
+    context._perf_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+  profile = _current_profile()
+  if profile is not None and context is not None:
+    profile.add_query(statement, time.perf_counter() - context._perf_started)
+
+'''
+TimedTemplate
+    a jinja2 Template that adds the time spent in render() to the current
+    request's profile.
+'''
+class TimedTemplate(Template):
+  def render(self, *args, **kwargs):
+    started = time.perf_counter()
+    try:
+      return super(TimedTemplate, self).render(*args, **kwargs)
+    finally:
+      profile = _current_profile()
+      if profile is not None:
+        profile.render_time += time.perf_counter() - started
+
+'''
+Profiler(app=None)
+    records, for every request, the number of statements sent to the
+    database, the time spent on them and on rendering templates, and the
+    slowest statements. Each response carries the numbers in X-Query-Count,
+    X-DB-Time and X-Render-Time headers (milliseconds) plus a Server-Timing
+    header browsers show next to the request, every request is logged as
+    one JSON line on the "perf" logger, and stats() aggregates them per
+    endpoint, e.g. for a /__perf route. A request sending more than
+    PERF_QUERY_WARNING statements is logged as a warning, which is how an
+    N+1 query loop shows up.
+
+    Create it after the app is bound to Flask-SQLAlchemy, so its engine
+    can be timed.
+
+    Config: PERF_ENABLED, PERF_HEADERS, PERF_SLOW_STATEMENTS (slowest
+    statements kept per request and per endpoint), PERF_QUERY_WARNING.
+    Profiling is off unless PERF_ENABLED is set, in the app's config or as
+    PERF_ENABLED=true in the environment. The stats show the SQL an app
+    sends, so an app serves them only while enabled, and never to
+    anonymous users of a public deployment.
+'''
+class Profiler(object):
+  def __init__(self, app=None):
+    self.enabled = False
+    self.headers = True
+    self.slow_statements = 5
+    self.query_warning = 20
+    self.endpoints = {}
+    self._lock = threading.Lock()
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    app.extensions['profiler'] = self
+    self.enabled = app.config.setdefault(
+      'PERF_ENABLED', os.environ.get('PERF_ENABLED', '').lower() == 'true')
+    self.headers = app.config.setdefault('PERF_HEADERS', True)
+    self.slow_statements = app.config.setdefault('PERF_SLOW_STATEMENTS', 5)
+    self.query_warning = app.config.setdefault('PERF_QUERY_WARNING', 20)
+    if not self.enabled:
+      return
+    # statements are timed on the Flask-SQLAlchemy engine of this app, an
+    # app without one only gets render and total times
+    sqlalchemy = app.extensions.get('sqlalchemy')
+    if sqlalchemy is not None:
+      engine = sqlalchemy.db.get_engine(app)
+      event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+      event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    app.jinja_env.template_class = TimedTemplate
+    app.before_request(self._start)
+    app.after_request(self._finish)
+
+  def _start(self):
+    g._perf = RequestProfile(self.slow_statements)
+
+  def _finish(self, response):
+    profile = g.pop('_perf', None)
+    if profile is None:
+      return response
+    total_time = time.perf_counter() - profile.started
+    endpoint = request.endpoint or '<unmatched>'
+
+    with self._lock:
+      stats = self.endpoints.get(endpoint)
+      if stats is None:
+        stats = self.endpoints[endpoint] = EndpointStats(self.slow_statements)
+      stats.add(profile, total_time)
+
+    if self.headers:
+      response.headers['X-Query-Count'] = str(profile.queries)
+      response.headers['X-DB-Time'] = str(_ms(profile.db_time))
+      response.headers['X-Render-Time'] = str(_ms(profile.render_time))
+      response.headers['Server-Timing'] = (
+        'db;dur=%.3f;desc="%d queries", render;dur=%.3f, total;dur=%.3f' % (
+          profile.db_time * 1000, profile.queries, profile.render_time * 1000,
+          total_time * 1000))
+
+    level = logging.WARNING if profile.queries > self.query_warning else logging.INFO
+    if logger.isEnabledFor(level):
+      logger.log(level, json.dumps({
+        "endpoint": endpoint,
+        "method": request.method,
+        "path": request.path,
+        "status": response.status_code,
+        "queries": profile.queries,
+        "db_ms": _ms(profile.db_time),
+        "render_ms": _ms(profile.render_time),
+        "total_ms": _ms(total_time),
+        "slowest_statements": profile.slowest_statements()
+      }))
+    return response
+
+  def stats(self):
+    with self._lock:
+      return {endpoint: stats.format()
+              for endpoint, stats in sorted(self.endpoints.items())}
+
+  def reset(self):
+    with self._lock:
+      self.endpoints.clear()
@@ -0,0 +1,9 @@
+from setuptools import setup
+
+setup(
+  name='flask_perf',
+  version='0.1.0',
+  description='Per request query counts and timings for Flask-SQLAlchemy apps',
+  py_modules=['flask_perf'],
+  install_requires=['Flask', 'SQLAlchemy'],
+)